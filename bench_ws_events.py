@@ -0,0 +1,53 @@
+import json
+import sys
+import time
+
+from ws_events import JSON_BACKEND, decode_frame
+
+# 录制的 Binance USDⓈ-M 合约推送（ETHUSDC），字段顺序与线上一致
+FRAMES = {
+    "bookTicker": '{"e":"bookTicker","u":8822354685703,"s":"ETHUSDC","b":"2456.37","B":"41.118","a":"2456.38","A":"13.562","T":1760601893262,"E":1760601893263}',
+    "ORDER_TRADE_UPDATE": '{"e":"ORDER_TRADE_UPDATE","T":1760601893310,"E":1760601893312,"o":{"s":"ETHUSDC","c":"AFLAc377027b9c6f","S":"BUY","o":"LIMIT","f":"GTX","q":"0.025","p":"2452.69","ap":"2452.69","sp":"0","x":"TRADE","X":"FILLED","i":8389765903344771235,"l":"0.025","z":"0.025","L":"2452.69","n":"0","N":"USDC","T":1760601893310,"t":412937741,"b":"0","a":"0","m":true,"R":false,"wt":"CONTRACT_PRICE","ot":"LIMIT","ps":"BOTH","cp":false,"rp":"0","pP":false,"si":0,"ss":0,"V":"EXPIRE_TAKER","pm":"NONE","gtd":0}}',
+    "ALGO_UPDATE": '{"e":"ALGO_UPDATE","T":1760601893400,"E":1760601893402,"o":{"caid":"AFHS51b7de2c90aa","aid":2146760,"at":"CONDITIONAL","o":"STOP_MARKET","s":"ETHUSDC","S":"SELL","ps":"BOTH","f":"GTE_GTC","q":"0","X":"NEW","ai":"","ap":"0","aq":"0","act":"0","tp":"2380.00","p":"0","V":"EXPIRE_MAKER","wt":"CONTRACT_PRICE","pm":"NONE","cp":true,"pP":false,"R":false,"tt":0,"gtd":0}}',
+    "ACCOUNT_UPDATE": '{"e":"ACCOUNT_UPDATE","T":1760601893310,"E":1760601893313,"a":{"B":[{"a":"USDC","wb":"512.33471800","cw":"512.33471800","bc":"0"}],"P":[{"s":"ETHUSDC","pa":"0.075","ep":"2453.12","cr":"3.11800000","up":"0.24000000","mt":"isolated","iw":"18.40212800","ps":"BOTH","ma":"USDC"}],"m":"ORDER"}}',
+}
+
+# 线上帧分布大致为 bookTicker 占绝大多数
+MIX = ["bookTicker"] * 96 + ["ORDER_TRADE_UPDATE"] * 2 + ["ALGO_UPDATE"] + ["ACCOUNT_UPDATE"]
+
+
+def legacy_decode(frame: str):
+    # 旧路径：接收循环 json.loads 分派，处理函数再 json.loads 一次
+    data = json.loads(frame)
+    e = data.get("e")
+    data2 = json.loads(frame)
+    if e == "bookTicker":
+        return float(data2.get("b")), float(data2.get("a"))
+    return data2.get("o") or data2
+
+
+def _cpu_us_per_frame(fn, frames, rounds: int) -> float:
+    n = 0
+    start = time.process_time()
+    for _ in range(rounds):
+        for f in frames:
+            fn(f)
+        n += len(frames)
+    return (time.process_time() - start) * 1e6 / float(n)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"JSON backend: {JSON_BACKEND}")
+    print(f"{'frame':<20}{'legacy us':>12}{'decode-once us':>16}{'speedup':>10}")
+    rows = [(k, [v]) for k, v in FRAMES.items()]
+    rows.append(("mix(96/2/1/1)", [FRAMES[k] for k in MIX]))
+    for name, frames in rows:
+        r = rounds if len(frames) == 1 else max(1, rounds // len(frames))
+        old = _cpu_us_per_frame(legacy_decode, frames, r)
+        new = _cpu_us_per_frame(decode_frame, frames, r)
+        print(f"{name:<20}{old:>12.3f}{new:>16.3f}{old / new if new > 0 else 0.0:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import math
+
+
+class PriceBand:
+    """风控/网格评估的免评估价格带。
+
+    每轮评估开始时 begin()，各评估器用 below()/above() 收紧决策不变的价格区间、
+    用 deadline() 登记与时间相关的下一次触发、在无法界定时 veto()；评估结束 commit() 后生效。
+    之后的行情只要 lo < bid 且 ask < hi、未到期且期间没有 mark_dirty()（成交、账户、配置变化），
+    即可跳过评估：每个 tick 只剩两次浮点比较。
+    """
+
+    __slots__ = ("lo", "hi", "until", "armed", "_veto", "_seq", "_pass_seq", "skipped", "evaluated", "vetoed")
+
+    def __init__(self):
+        self.lo = 0.0
+        self.hi = math.inf
+        self.until = math.inf
+        self.armed = False
+        self._veto = False
+        self._seq = 0
+        self._pass_seq = 0
+        self.skipped = 0
+        self.evaluated = 0
+        self.vetoed = 0
+
+    def begin(self):
+        """开始一轮评估：撤销现有价格带，重置约束"""
+        self.armed = False
+        self.lo = 0.0
+        self.hi = math.inf
+        self.until = math.inf
+        self._veto = False
+        self._pass_seq = self._seq
+        self.evaluated += 1
+
+    def below(self, price):
+        """价格跌到 price（含）即可能改变决策"""
+        p = float(price or 0.0)
+        if p > self.lo:
+            self.lo = p
+
+    def above(self, price):
+        """价格涨到 price（含）即可能改变决策"""
+        p = float(price or 0.0)
+        if p > 0 and p < self.hi:
+            self.hi = p
+
+    def deadline(self, ts):
+        """到 ts（time.time() 秒）即可能改变决策"""
+        t = float(ts or 0.0)
+        if t < self.until:
+            self.until = t
+
+    def veto(self):
+        """本轮无法给出价格带（有动作、冷却中、状态未就绪等），下个 tick 照常评估"""
+        self._veto = True
+
+    def commit(self, now: float, max_sec: float = 0.0):
+        """评估结束：未被否决且期间没有新事件时启用价格带"""
+        if max_sec and max_sec > 0:
+            self.deadline(now + max_sec)
+        if self._veto or self._pass_seq != self._seq or not (self.lo < self.hi) or self.until <= now:
+            if self._veto:
+                self.vetoed += 1
+            self.armed = False
+            return False
+        self.armed = True
+        return True
+
+    def mark_dirty(self):
+        """成交、账户或配置变化：作废价格带，下个 tick 必须评估"""
+        self._seq += 1
+        self.armed = False
+
+    def contains(self, bid: float, ask: float, now: float) -> bool:
+        """报价在带内可跳过本次评估（计入 skipped）"""
+        if self.armed and self.lo < bid and ask < self.hi and now < self.until:
+            self.skipped += 1
+            return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "armed": bool(self.armed),
+            "lo": float(self.lo),
+            "hi": float(self.hi) if self.hi != math.inf else None,
+            "until": float(self.until) if self.until != math.inf else None,
+            "skipped": int(self.skipped),
+            "evaluated": int(self.evaluated),
+            "vetoed": int(self.vetoed),
+        }
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from collections import deque
+
+
+class _Lane:
+    __slots__ = (
+        "name",
+        "items",
+        "waiters",
+        "coalesce",
+        "max_depth",
+        "enqueued",
+        "dequeued",
+        "coalesced",
+        "last_wait_ms",
+        "max_wait_ms",
+        "total_wait_ms",
+    )
+
+    def __init__(self, name: str, coalesce: bool):
+        self.name = name
+        self.items = deque()
+        self.waiters = set()
+        self.coalesce = bool(coalesce)
+        self.max_depth = 0
+        self.enqueued = 0
+        self.dequeued = 0
+        self.coalesced = 0
+        self.last_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_wait_ms = 0.0
+
+
+class PriorityLanes:
+    """按优先级分道的事件队列：靠前的道先出队，行情道只保留最新一条。"""
+
+    def __init__(self, lanes, coalesce=()):
+        self._order = [str(n) for n in lanes]
+        keep_latest = {str(n) for n in (coalesce or ())}
+        self._lanes = {n: _Lane(n, n in keep_latest) for n in self._order}
+
+    def put(self, name: str, item):
+        lane = self._lanes[name]
+        if lane.coalesce and lane.items:
+            # 保留首次入队时间：等待时长从该道变为非空时算起
+            ts, _ = lane.items[-1]
+            lane.items[-1] = (ts, item)
+            lane.coalesced += 1
+        else:
+            lane.items.append((time.perf_counter(), item))
+        lane.enqueued += 1
+        depth = len(lane.items)
+        if depth > lane.max_depth:
+            lane.max_depth = depth
+        for ev in list(lane.waiters):
+            ev.set()
+
+    def get_nowait(self, names=None):
+        """返回 (道名, 事件, 入队时间 perf_counter)，全部为空时返回 None。"""
+        for n in (names or self._order):
+            lane = self._lanes[n]
+            if lane.items:
+                ts, item = lane.items.popleft()
+                wait_ms = (time.perf_counter() - ts) * 1000.0
+                lane.dequeued += 1
+                lane.last_wait_ms = wait_ms
+                lane.total_wait_ms += wait_ms
+                if wait_ms > lane.max_wait_ms:
+                    lane.max_wait_ms = wait_ms
+                return n, item, ts
+        return None
+
+    async def get(self, names=None):
+        names = tuple(names or self._order)
+        while True:
+            got = self.get_nowait(names)
+            if got is not None:
+                return got
+            ev = asyncio.Event()
+            for n in names:
+                self._lanes[n].waiters.add(ev)
+            try:
+                await ev.wait()
+            finally:
+                for n in names:
+                    self._lanes[n].waiters.discard(ev)
+
+    def pending(self, names=None) -> int:
+        return sum(len(self._lanes[n].items) for n in (names or self._order))
+
+    def snapshot(self) -> dict:
+        out = {}
+        for n in self._order:
+            lane = self._lanes[n]
+            avg = (lane.total_wait_ms / lane.dequeued) if lane.dequeued else 0.0
+            out[n] = {
+                "depth": len(lane.items),
+                "max_depth": int(lane.max_depth),
+                "enqueued": int(lane.enqueued),
+                "dequeued": int(lane.dequeued),
+                "coalesced": int(lane.coalesced),
+                "last_wait_ms": round(float(lane.last_wait_ms), 3),
+                "avg_wait_ms": round(float(avg), 3),
+                "max_wait_ms": round(float(lane.max_wait_ms), 3),
+            }
+        return out
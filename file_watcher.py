@@ -0,0 +1,296 @@
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+# inotify 事件位（linux/inotify.h）
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+# 只关心写完（CLOSE_WRITE，避免读到写了一半的 JSON）、改名替换、创建/删除与 touch
+_DIR_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_ATTRIB | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT = struct.Struct("iIII")
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except Exception:
+        return None
+
+
+_libc = _load_libc()
+
+
+class FileWatcher:
+    """监视若干目录中的文件变化，返回发生变化的文件路径集合。
+
+    Linux 上使用 inotify（ctypes 调 libc，无额外依赖），空闲时既不占 CPU 也不读盘；
+    非 Linux 或 inotify 不可用（实例数/监视数耗尽）时退回每 poll_interval 秒比较一次 stat。
+    返回集合中出现被监视目录本身时，表示事件可能丢失（队列溢出、目录被替换），调用方应整体重扫。
+    """
+
+    def __init__(self, poll_interval: float = 1.0, use_inotify: bool = True):
+        self.poll_interval = float(poll_interval) if float(poll_interval or 0.0) > 0 else 1.0
+        self._dirs = {}
+        self._suffixes = {}
+        self._wds = {}
+        self._snapshots = {}
+        self._next_scan = 0.0
+        self._fd = None
+        if use_inotify and _libc is not None:
+            fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self._fd is not None else "poll"
+
+    def fileno(self):
+        return self._fd
+
+    def watch_file(self, path: str):
+        path = os.path.abspath(path)
+        self.watch_dir(os.path.dirname(path), {os.path.basename(path)})
+
+    def watch_dir(self, path: str, names=None, suffixes=None):
+        """监视目录；names 为只关心的文件名集合，suffixes 为只关心的文件名后缀，二者都为 None 表示目录下全部文件"""
+        path = os.path.abspath(path)
+        everything = names is None and not suffixes
+        if path in self._dirs:
+            cur = self._dirs[path]
+            self._dirs[path] = None if (cur is None or everything) else (cur | set(names or ()))
+        else:
+            self._dirs[path] = None if everything else set(names or ())
+        if self._dirs[path] is None:
+            self._suffixes.pop(path, None)
+        elif suffixes:
+            self._suffixes[path] = tuple(sorted(set(self._suffixes.get(path, ())) | set(suffixes)))
+        if self._fd is not None and not self._add_watch(path):
+            self._fallback_to_poll()
+        self._snapshots[path] = self._stat_dir(path)
+
+    def _add_watch(self, path: str) -> bool:
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(path), _DIR_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            # 目录暂不存在时先轮询等它出现；其它错误（ENOSPC 等）整体退回轮询
+            return err == errno.ENOENT
+        self._wds[wd] = path
+        return True
+
+    def _fallback_to_poll(self):
+        try:
+            os.close(self._fd)
+        except Exception:
+            pass
+        self._fd = None
+        self._wds = {}
+
+    def _wanted(self, path: str, name: str) -> bool:
+        names = self._dirs.get(path)
+        if names is None or name in names:
+            return True
+        suffixes = self._suffixes.get(path)
+        return bool(suffixes) and name.endswith(suffixes)
+
+    # ---------- 轮询后端 ----------
+    def _stat_dir(self, path: str) -> dict:
+        out = {}
+        names = self._dirs.get(path)
+        try:
+            if names is not None and not self._suffixes.get(path):
+                for name in names:
+                    try:
+                        st = os.stat(os.path.join(path, name))
+                    except OSError:
+                        continue
+                    out[name] = (st.st_mtime_ns, st.st_size, st.st_ino)
+            else:
+                with os.scandir(path) as it:
+                    for ent in it:
+                        if names is not None and not self._wanted(path, ent.name):
+                            continue
+                        try:
+                            st = ent.stat()
+                        except OSError:
+                            continue
+                        out[ent.name] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return {}
+        return out
+
+    def _scan(self) -> set:
+        changed = set()
+        for path in list(self._dirs.keys()):
+            cur = self._stat_dir(path)
+            prev = self._snapshots.get(path) or {}
+            for name in set(cur) | set(prev):
+                if cur.get(name) != prev.get(name):
+                    changed.add(os.path.join(path, name))
+            self._snapshots[path] = cur
+        self._next_scan = time.monotonic() + self.poll_interval
+        return changed
+
+    # ---------- inotify 后端 ----------
+    def _drain(self) -> set:
+        changed = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                break
+            if not buf:
+                break
+            off = 0
+            while off + _EVENT.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, off)
+                off += _EVENT.size
+                name = buf[off : off + length].split(b"\0", 1)[0]
+                off += length
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(self._dirs.keys())
+                    continue
+                path = self._wds.get(wd)
+                if path is None:
+                    continue
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    # 目录被删除/替换：watch 已失效，目录重新出现后再挂上
+                    self._wds.pop(wd, None)
+                    changed.add(path)
+                    continue
+                fname = os.fsdecode(name)
+                if fname and self._wanted(path, fname):
+                    changed.add(os.path.join(path, fname))
+        return changed
+
+    def _rewatch_missing(self) -> set:
+        changed = set()
+        watched = set(self._wds.values())
+        for path in self._dirs:
+            if path in watched or not os.path.isdir(path):
+                continue
+            if not self._add_watch(path):
+                self._fallback_to_poll()
+                return set(self._dirs.keys())
+            if path in set(self._wds.values()):
+                changed.add(path)
+        return changed
+
+    # ---------- 对外接口 ----------
+    def poll(self, timeout: float = 0.0) -> set:
+        """最多阻塞 timeout 秒（None 为一直等），返回期间发生变化的文件路径"""
+        deadline = None if timeout is None else time.monotonic() + max(0.0, float(timeout))
+        while True:
+            if self._fd is not None:
+                changed = self._drain() | self._rewatch_missing()
+                if changed:
+                    return changed
+                wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if len(self._wds) < len(self._dirs):
+                    # 有目录尚不存在，按轮询间隔检查它是否出现
+                    wait = self.poll_interval if wait is None else min(wait, self.poll_interval)
+                try:
+                    select.select([self._fd], [], [], wait)
+                except (OSError, ValueError):
+                    return set()
+            else:
+                now = time.monotonic()
+                if now >= self._next_scan:
+                    changed = self._scan()
+                    if changed:
+                        return changed
+                    now = time.monotonic()
+                wait = self._next_scan - now
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                if wait > 0:
+                    time.sleep(wait)
+            if deadline is not None and time.monotonic() >= deadline:
+                if self._fd is not None:
+                    return self._drain()
+                return self._scan() if time.monotonic() >= self._next_scan else set()
+
+    async def wait(self, timeout: float = None, stop_event: asyncio.Event = None) -> set:
+        """协程版 poll：有变化、超时或 stop_event 置位时返回"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + max(0.0, float(timeout))
+        while True:
+            changed = self.poll(0.0)
+            if changed or (stop_event is not None and stop_event.is_set()):
+                return changed
+            now = loop.time()
+            if deadline is not None and now >= deadline:
+                return set()
+            if self._fd is not None and len(self._wds) == len(self._dirs):
+                wait = None if deadline is None else deadline - now
+            else:
+                wait = max(0.0, self._next_scan - time.monotonic()) if self._fd is None else self.poll_interval
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+            await self._sleep(wait, stop_event)
+
+    async def _sleep(self, wait, stop_event):
+        loop = asyncio.get_running_loop()
+        waiters = []
+        readable = None
+        if self._fd is not None:
+            readable = loop.create_future()
+            fd = self._fd
+            try:
+                loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+            except (NotImplementedError, RuntimeError):
+                readable = None
+            else:
+                waiters.append(readable)
+        stop_task = None
+        if stop_event is not None:
+            stop_task = asyncio.ensure_future(stop_event.wait())
+            waiters.append(stop_task)
+        try:
+            if waiters:
+                await asyncio.wait(waiters, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                await asyncio.sleep(wait if wait is not None else self.poll_interval)
+        finally:
+            if readable is not None:
+                try:
+                    loop.remove_reader(fd)
+                except Exception:
+                    pass
+            if stop_task is not None and not stop_task.done():
+                stop_task.cancel()
+
+    def close(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except Exception:
+                pass
+        self._fd = None
+        self._wds = {}
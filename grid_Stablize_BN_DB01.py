@@ -12,8 +12,25 @@ import asyncio
 import uuid
 import signal
 import re
-
-from risk_manager import RiskEngine
+import contextvars
+import functools
+
+from risk_manager import ConfigChanges, RiskEngine, StrategyConfig
+from rest_gateway import RestGateway
+from rest_budget import PRIORITY_LOW, RestBudget, RestBudgetExceeded, account_key
+from position_book import PositionBook
+from order_store import OrderRecord, OrderStore
+from market_spec import MarketSpec
+from order_reconciler import DesiredOrder, match_live, reconcile
+from stop_manager import StopManager
+from timed_lock import TimedLock
+from eval_band import PriceBand
+from event_lanes import PriorityLanes
+from file_watcher import FileWatcher
+from market_data_hub import hub_addr_from_env, parse_quote_line
+from ws_events import AccountUpdate, AlgoUpdate, BookTicker, OrderUpdate, decode_frame
+from ws_order_api import WsApiError, WsApiUnavailable, WsApiUnconfirmed, WsOrderApi, ws_api_url_for
+from ws_redundant import EventDeduper
 
 # ==================== 配置 ====================
 try:
@@ -36,9 +53,22 @@ INITIAL_QUANTITY = float(os.getenv("INITIAL_QUANTITY", "0.007"))
 LEVERAGE = float(os.getenv("LEVERAGE", "20"))
 INITIAL_CAPITAL = float(os.getenv("INITIAL_CAPITAL", "0"))
 STATUS_LOG_INTERVAL_SEC = float(os.getenv("STATUS_LOG_INTERVAL_SEC", "60"))
+REST_GATEWAY_MAX_WORKERS = int(os.getenv("REST_GATEWAY_MAX_WORKERS", "4") or 4)
+# 同一出口 IP 所有进程共享的 REST 额度（Binance USDⓈ-M 默认上限）
+REST_WEIGHT_LIMIT_1M = int(os.getenv("REST_WEIGHT_LIMIT_1M", "2400") or 2400)
+REST_ORDER_LIMIT_10S = int(os.getenv("REST_ORDER_LIMIT_10S", "300") or 300)
+REST_ORDER_LIMIT_1M = int(os.getenv("REST_ORDER_LIMIT_1M", "1200") or 1200)
+# 事件分道优先级：成交/账户 > 条件单 > 行情
+USER_EVENT_LANES = ("user", "algo")
 
 WEBSOCKET_URL_REAL = "wss://fstream.binance.com/ws"
 WEBSOCKET_URL_TESTNET = "wss://stream.binancefuture.com/ws"
+# 行情中心超过该时长无报价视为失联，回退为直连订阅
+MARKET_HUB_STALE_SEC = float(os.getenv("MARKET_HUB_STALE_SEC", "30") or 30.0)
+# 单笔下单/撤单/改单改走 WebSocket API 常驻连接；超时或断线时退回 REST
+WS_ORDER_API_TIMEOUT_SEC = float(os.getenv("WS_ORDER_API_TIMEOUT_SEC", "2") or 2.0)
+# 行情+用户数据热备连接数：>1 时同时保持多条相同订阅的连接，事件先到者生效，单条断线不中断
+WS_STREAM_CONNECTIONS = max(1, int(os.getenv("WS_STREAM_CONNECTIONS", "1") or 1))
 
 # ==================== 日志配置 ====================
 # 获取当前脚本的文件名（不带扩展名）
@@ -60,11 +90,13 @@ logging.basicConfig(
     ],
 )
 logger = logging.getLogger()
+# 同一进程运行多个实例时，日志按当前任务所属实例标注
+_LOG_INSTANCE = contextvars.ContextVar("instance_id", default=None)
 
 class _InstanceLogFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
         try:
-            record.instance_id = str(os.getenv("INSTANCE_ID") or "").strip() or "main"
+            record.instance_id = _LOG_INSTANCE.get() or str(os.getenv("INSTANCE_ID") or "").strip() or "main"
         except Exception:
             record.instance_id = "main"
         return True
@@ -159,7 +191,7 @@ def _is_stop_like_ws_order(order: dict) -> bool:
     ot = str(order.get("o") or "").strip().upper()
     o2 = str(order.get("ot") or "").strip().upper()
     t = ot or o2
-    if t in {"STOP_MARKET", "TAKE_PROFIT_MARKET", "STOP", "TAKE_PROFIT"}:
+    if t in {"STOP_MARKET", "TAKE_PROFIT_MARKET", "STOP", "TAKE_PROFIT", "TRAILING_STOP_MARKET"}:
         return True
     sp = order.get("sp")
     try:
@@ -189,6 +221,19 @@ def _stop_reason_from_ws_order(order: dict):
         return "hard_stoploss"
     return None
 
+def _fill_key(order: dict):
+    """ORDER_TRADE_UPDATE 单笔成交的去重键：成交 id t，缺失时用订单 id 加累计成交量 z"""
+    if not isinstance(order, dict):
+        return None
+    oid = order.get("i")
+    tid = order.get("t")
+    if tid not in (None, "", 0, "0"):
+        return f"{oid}:t{tid}"
+    z = order.get("z")
+    if oid is None or z in (None, ""):
+        return None
+    return f"{oid}:z{z}"
+
 def _normalize_account_mode(value) -> str:
     s = str(value or "").strip().lower()
     if s in {"testnet", "paper", "sim", "sandbox", "测试网", "测试", "模拟", "仿真", "测试网络", "测试网路"}:
@@ -258,19 +303,121 @@ def _parse_env_bool(value, default: bool = False):
 
 
 class CustomGate(ccxt.binanceusdm):
+    rest_budget = None
+    ws_order_api = None
+
     def fetch(self, url, method='GET', headers=None, body=None):
         if headers is None:
             headers = {}
         # headers['X-Gate-Channel-Id'] = 'laohuoji'
         # headers['Accept'] = 'application/json'
         # headers['Content-Type'] = 'application/json'
+        if self.rest_budget is not None:
+            # 额度不足时抛 RestBudgetExceeded，请求不发出
+            self.rest_budget.acquire(url, method)
         return super().fetch(url, method, headers, body)
 
+    def on_rest_response(self, code, reason, url, method, response_headers, response_body, request_headers, request_body):
+        if self.rest_budget is not None:
+            try:
+                self.rest_budget.observe(code, response_headers)
+            except Exception:
+                pass
+        return super().on_rest_response(code, reason, url, method, response_headers, response_body, request_headers, request_body)
+
+
+def websocket_url_for(account_mode: str) -> str:
+    return WEBSOCKET_URL_TESTNET if str(account_mode or "").strip().lower() in {"testnet", "paper", "sim"} else WEBSOCKET_URL_REAL
+
+
+def create_exchange(api_key, api_secret, account_mode: str):
+    """初始化交易所 API（多实例运行时同一账户共享）"""
+    account_mode = str(account_mode or "").strip().lower()
+    exchange = CustomGate({
+        "apiKey": api_key,
+        "secret": api_secret,
+        "timeout": 15000,
+        "enableRateLimit": True,
+        "options": {
+            "defaultType": "future",  # 使用永续合约
+            "fetchCurrencies": False,
+            "adjustForTimeDifference": True,
+            "recvWindow": 10000,
+        },
+    })
+    if account_mode in {"testnet", "paper", "sim"}:
+        testnet_base = "https://testnet.binancefuture.com"
+        try:
+            api_urls = exchange.urls.get("api") or {}
+            for k in list(api_urls.keys()):
+                if not str(k).lower().startswith("fapi"):
+                    continue
+                v = api_urls.get(k)
+                if not v:
+                    continue
+                s = str(v)
+                if "/fapi/" in s:
+                    tail = s.split("/fapi/", 1)[1]
+                    api_urls[k] = f"{testnet_base}/fapi/{tail}"
+                elif "/fapi" in s:
+                    tail = s.split("/fapi", 1)[1]
+                    api_urls[k] = f"{testnet_base}/fapi{tail}"
+                else:
+                    api_urls[k] = f"{testnet_base}/fapi"
+            exchange.urls["api"] = api_urls
+        except Exception:
+            pass
+    exchange.rest_budget = RestBudget(
+        os.path.join(_script_dir, "status", "rest_budget.json"),
+        account_key(api_key),
+        REST_WEIGHT_LIMIT_1M,
+        REST_ORDER_LIMIT_10S,
+        REST_ORDER_LIMIT_1M,
+    )
+    if _parse_env_bool(os.getenv("WS_ORDER_API"), False):
+        exchange.ws_order_api = WsOrderApi(
+            str(os.getenv("WS_ORDER_API_URL") or "").strip() or ws_api_url_for(account_mode),
+            api_key,
+            api_secret,
+            WS_ORDER_API_TIMEOUT_SEC,
+            clock=exchange.nonce,
+            budget=exchange.rest_budget,
+        )
+    try:
+        exchange.load_time_difference()
+    except Exception:
+        pass
+    # 加载市场数据
+    exchange.load_markets(reload=False)
+    return exchange
+
 
 # ==================== 网格交易机器人 ====================
 class GridTradingBot:
-    def __init__(self, api_key, api_secret, coin_name, contract_type, grid_spacing, initial_quantity, leverage, account_mode: str, rest_sync_interval_sec: float, order_first_time_sec: float):
-        self.lock = asyncio.Lock()  # 初始化线程锁
+    def __init__(
+        self,
+        api_key,
+        api_secret,
+        coin_name,
+        contract_type,
+        grid_spacing,
+        initial_quantity,
+        leverage,
+        account_mode: str,
+        rest_sync_interval_sec: float,
+        order_first_time_sec: float,
+        exchange=None,
+        strategy_config_path: str = None,
+        instance_id: str = None,
+        direction: str = None,
+        external_streams: bool = False,
+    ):
+        # exchange/strategy_config_path/instance_id/direction 由多实例运行时注入，单进程模式沿用环境变量
+        # external_streams=True 时不自建 WebSocket 与 listenKey，事件由运行时通过 dispatch_event 投递
+        # 状态锁只包住状态计算与回写（持有时长按区段统计）；交易所请求在锁外执行，由 _io_lock 串行
+        self.lock = TimedLock()
+        self._io_lock = asyncio.Lock()
+        self.rest = RestGateway(REST_GATEWAY_MAX_WORKERS, name="rest")  # REST 调用走线程池，不阻塞事件循环
         self.api_key = api_key
         self.api_secret = api_secret
         self.coin_name = coin_name
@@ -285,20 +432,32 @@ class GridTradingBot:
         if self.order_first_time_sec < 0:
             self.order_first_time_sec = 0.0
         self.account_mode = str(account_mode or "").strip().lower()
-        self.websocket_url = WEBSOCKET_URL_TESTNET if self.account_mode in {"testnet", "paper", "sim"} else WEBSOCKET_URL_REAL
-        self.exchange = self._initialize_exchange()  # 初始化交易所
+        self.websocket_url = websocket_url_for(self.account_mode)
+        self.external_streams = bool(external_streams)
+        self._direction_override = str(direction or "").strip()
+        self.exchange = exchange if exchange is not None else self._initialize_exchange()  # 初始化交易所
         self.ccxt_symbol = f"{coin_name}/{contract_type}:{contract_type}"  # 动态生成交易对
         self.contract_size = 1.0
         self.min_order_cost = None
+        self.market_spec = None
         self._get_price_precision()
+        self.position_book = PositionBook(self._raw_market_id(), self.contract_size)
+        self.order_store = OrderStore(self._raw_market_id(), self.price_precision, self.market_spec)
 
-        self.strategy_config_path = os.getenv("STRATEGY_CONFIG_PATH", os.path.join(_script_dir, "config.json"))
+        self.strategy_config_path = strategy_config_path or os.getenv("STRATEGY_CONFIG_PATH", os.path.join(_script_dir, "config.json"))
         self.risk_engine = RiskEngine(self, self.strategy_config_path)
-        self.instance_id = str(os.getenv("INSTANCE_ID") or os.path.splitext(os.path.basename(self.strategy_config_path))[0] or "instance").strip()
+        self.instance_id = str(instance_id or os.getenv("INSTANCE_ID") or os.path.splitext(os.path.basename(self.strategy_config_path))[0] or "instance").strip()
         self._status_dir = os.path.join(_script_dir, "status")
         self._status_file_path = os.path.join(self._status_dir, f"{self.instance_id}.json")
         self._stop_flag_path = os.path.join(self._status_dir, f"{self.instance_id}.stop")
+        self._instance_enabled = True
+        self.stop_manager = StopManager(self.order_store)
         self._last_ws_msg_ts = 0.0
+        self.market_hub_addr = hub_addr_from_env()
+        self._market_hub_live = False
+        self._market_hub_quotes = 0
+        # 已直连订阅 bookTicker 的连接
+        self._direct_ticker_wss = set()
         self._rest_ban_until_ts = 0.0
         self._rest_next_allowed_ts = 0.0
         self._rest_backoff_sec = 0.0
@@ -326,7 +485,7 @@ class GridTradingBot:
         self.buy_short_orders = 0.0  # 空头买入剩余挂单数量
         self.last_position_update_time = 0  # 上次持仓更新时间
         self.last_orders_update_time = 0  # 上次订单更新时间
-        self.last_ticker_update_time = 0  # ticker 时间限速
+        self.last_ticker_update_time = 0  # 最近一次 ticker 时间
         self.latest_price = 0  # 最新价格
         self.best_bid_price = None  # 最佳买价
         self.best_ask_price = None  # 最佳卖价
@@ -338,11 +497,47 @@ class GridTradingBot:
         self.lower_price_short = 0  # short 网格上
         self.upper_price_short = 0  # short 网格下
         self._order_event_eval_task = None
-        self.listenKey = self.get_listen_key()  # 获取初始 listenKey
+        self._risk_eval_pending = False
+        self._risk_eval_pending_rest_sync = False
+        self.event_lanes = PriorityLanes(USER_EVENT_LANES + ("market",), coalesce=("market",))
+        self._user_lanes_idle = asyncio.Event()
+        self._user_lanes_idle.set()
+        self._fill_requote_since = None
+        self._fill_requote_count = 0
+        self._fill_requote_last_ms = 0.0
+        self._fill_requote_max_ms = 0.0
+        self._fill_requote_total_ms = 0.0
+        # 成交快速补单：按当前挂单 order_id 预备好成交后的下一笔订单，成交事件到达即发出
+        self._fill_templates = {}
+        self._fill_fast_count = 0
+        self._fill_fast_miss = 0
+        self._fill_fast_last_ms = 0.0
+        self._fill_fast_max_ms = 0.0
+        self._fill_fast_total_ms = 0.0
+        self._amend_ok = 0
+        self._amend_fallback = 0
+        self._amend_last_ms = 0.0
+        self._amend_max_ms = 0.0
+        self._amend_total_ms = 0.0
+        self._ws_api_fallback_log_ts = 0.0
+        # 持仓/成交/配置变化时递增；锁外执行期间版本变化即为冲突，结果回写后补评估一轮
+        self._state_seq = 0
+        self._grid_exec_passes = 0
+        self._grid_conflicts = 0
+        self._fill_fast_inflight = 0
+        # 评估后预先算出决策不变的价格带，行情停留在带内且无新事件时跳过评估
+        self.eval_band = PriceBand()
+        self._quote_seq = 0
+        self._eval_quote_seq = 0
+        self._last_ticker_eval_ts = 0.0
+        self._ticker_task = None
+        self._user_event_task = None
+        self.listenKey = None if self.external_streams else self.get_listen_key()  # 获取初始 listenKey
         self.shutdown_event = asyncio.Event()
-        self._ws = None
-        self._open_orders_cache = None
-        self._open_orders_cache_ts = 0.0
+        self._shutdown_done = asyncio.Event()
+        # 在线连接：编号 -> websocket；热备模式下有多条
+        self._ws_links = {}
+        self.ws_dedup = EventDeduper() if WS_STREAM_CONNECTIONS > 1 else None
         self._last_long_grid_action_ts = 0.0
         self._last_short_grid_action_ts = 0.0
         self._grid_action_cooldown_sec = 1.2
@@ -377,6 +572,9 @@ class GridTradingBot:
         self._trail_anchor_entry_short = None
         self._trail_stop_price_long = None
         self._trail_stop_price_short = None
+        # 交易所托管移动止损当前挂单对应的 (数量 lots, 回调百分比, 激活价 tick)，按方向记录
+        self._native_trail_key = {}
+        self._last_native_trail_ts = 0.0
         self._last_error_msg = None
         self._last_error_ts = 0.0
         self._err_rl = {}
@@ -406,19 +604,15 @@ class GridTradingBot:
                 return "{}"
 
     def _build_status_payload(self):
-        cfg = {}
-        try:
-            cfg = self.risk_engine.get_config() or {}
-        except Exception:
-            cfg = {}
-        allocated = self._safe_float(cfg.get("ALLOCATED_CAPITAL_USDC", cfg.get("ALLOCATED_CAPITAL_USDT", 0.0))) or 0.0
+        sc = self.risk_engine.get_strategy_config()
+        allocated = float(sc.allocated_capital_usdc or 0.0)
         active = str(self.direction or "long").strip().lower()
         if active not in {"long", "short"}:
             active = "long"
 
         snap = None
         try:
-            snap = self.get_position_snapshot()
+            snap = self._local_position_snapshot()
         except Exception:
             snap = None
 
@@ -444,16 +638,15 @@ class GridTradingBot:
             state = s or "shutdown"
         else:
             try:
-                pending_enabled = bool(cfg.get("PENDING_ENTRY_ENABLED", False))
-                pending_price = self._pending_entry_price(cfg)
-                if pending_enabled and pending_price is not None and float(pos_amt or 0.0) <= 0:
+                pending_price = self._pending_entry_price(sc)
+                if self._pending_entry_enabled(sc) and pending_price is not None and float(pos_amt or 0.0) <= 0:
                     state = "pending_entry"
             except Exception:
                 pass
 
         stop_price = None
         try:
-            stop_price = self._compute_trailing_stop_price(active, float(entry or 0.0), float(self.latest_price or 0.0), cfg)
+            stop_price = self._compute_trailing_stop_price(active, float(entry or 0.0), float(self.latest_price or 0.0), sc, native=self._native_trailing_enabled(sc))
         except Exception:
             stop_price = None
 
@@ -468,6 +661,54 @@ class GridTradingBot:
                 "last_ticker_ts": float(self.last_ticker_update_time or 0.0),
                 "last_rest_pos_sync_ts": float(self.last_position_update_time or 0.0),
                 "last_rest_orders_sync_ts": float(self.last_orders_update_time or 0.0),
+                "position_book": self.position_book.stats(),
+                "order_store": self.order_store.stats(),
+                "rest_budget": self.exchange.rest_budget.snapshot() if getattr(self.exchange, "rest_budget", None) is not None else None,
+                "ticker": {
+                    "quotes": int(self._quote_seq),
+                    "evaluated_quote_seq": int(self._eval_quote_seq),
+                    "last_eval_ts": float(self._last_ticker_eval_ts or 0.0),
+                },
+                "event_lanes": self.event_lanes.snapshot(),
+                "market_hub": {
+                    "enabled": self.market_hub_addr is not None,
+                    "live": bool(self._market_hub_live),
+                    "quotes": int(self._market_hub_quotes),
+                },
+                "ws_links": {
+                    "configured": int(WS_STREAM_CONNECTIONS),
+                    "connected": sorted(self._ws_links),
+                    "dedup": self.ws_dedup.stats() if self.ws_dedup is not None else None,
+                },
+                "fill_to_requote_ms": {
+                    "count": int(self._fill_requote_count),
+                    "last": round(float(self._fill_requote_last_ms), 3),
+                    "avg": round(float(self._fill_requote_total_ms / self._fill_requote_count), 3) if self._fill_requote_count else 0.0,
+                    "max": round(float(self._fill_requote_max_ms), 3),
+                },
+                "fill_to_order_ms": {
+                    "count": int(self._fill_fast_count),
+                    "miss": int(self._fill_fast_miss),
+                    "templates": len(self._fill_templates),
+                    "last": round(float(self._fill_fast_last_ms), 3),
+                    "avg": round(float(self._fill_fast_total_ms / self._fill_fast_count), 3) if self._fill_fast_count else 0.0,
+                    "max": round(float(self._fill_fast_max_ms), 3),
+                },
+                "stops": self.stop_manager.stats(),
+                "lock_hold_us": self.lock.snapshot(),
+                "grid_exec": {
+                    "passes": int(self._grid_exec_passes),
+                    "conflicts": int(self._grid_conflicts),
+                },
+                "eval_band": self.eval_band.stats(),
+                "ws_order_api": self.exchange.ws_order_api.stats() if getattr(self.exchange, "ws_order_api", None) is not None else None,
+                "amend": {
+                    "ok": int(self._amend_ok),
+                    "fallback": int(self._amend_fallback),
+                    "last_ms": round(float(self._amend_last_ms), 3),
+                    "avg_ms": round(float(self._amend_total_ms / self._amend_ok), 3) if self._amend_ok else 0.0,
+                    "max_ms": round(float(self._amend_max_ms), 3),
+                },
             },
             "config_digest": {
                 "config_path": str(self.strategy_config_path),
@@ -475,8 +716,8 @@ class GridTradingBot:
                 "direction": active,
                 "symbol": str(self.ccxt_symbol),
                 "account_mode": str(self.account_mode),
-                "maker_only": bool(cfg.get("MAKER_ONLY", False)),
-                "enabled": bool(((_safe_read_json(self.strategy_config_path) or {}).get("实例") or {}).get("启用", True)),
+                "maker_only": bool(sc.maker_only),
+                "enabled": bool(getattr(self, "_instance_enabled", True)),
             },
             "accounting": {
                 "allocated_usdt": float(allocated),
@@ -500,10 +741,11 @@ class GridTradingBot:
                 "buy_short": float(self.buy_short_orders or 0.0),
             },
             "risk": {
-                "hard_stop_price": float(self._safe_float(cfg.get("HARD_STOPLOSS_PRICE", 0.0)) or 0.0),
-                "trailing_stop_enabled": bool(cfg.get("TRAILING_STOP_ENABLED", False)),
+                "hard_stop_price": float(sc.hard_stoploss_price or 0.0),
+                "trailing_stop_enabled": bool(sc.trailing_stop_enabled),
                 "current_stop_price": stop_price,
             },
+            "rest": self.rest.snapshot(),
         }
 
     def _write_status_file(self):
@@ -528,29 +770,49 @@ class GridTradingBot:
     async def status_file_loop(self):
         while not self.shutdown_event.is_set():
             try:
-                try:
-                    if os.path.exists(self._stop_flag_path) and (not getattr(self, "_shutting_down", False)):
-                        if not bool(getattr(self, "_stop_flag_seen", False)):
-                            self._stop_flag_seen = True
-                            logger.info("检测到停止标记，开始优雅退出")
-                        await self.shutdown("stop_flag")
-                        break
-                except Exception:
-                    pass
-                cfg_raw = _safe_read_json(self.strategy_config_path) or {}
-                inst = cfg_raw.get("实例") if isinstance(cfg_raw.get("实例"), dict) else {}
-                enabled = inst.get("启用", True) if isinstance(inst, dict) else True
-                if enabled is False and (not getattr(self, "_shutting_down", False)):
-                    if not bool(getattr(self, "_disabled_seen", False)):
-                        self._disabled_seen = True
-                        logger.info("检测到实例停用，开始优雅退出")
-                    await self.shutdown("disabled")
-                    break
-                self._write_status_file()
+                await self.rest.call("status_file", self._write_status_file)
             except Exception:
                 pass
             await asyncio.sleep(1.0)
 
+    def _refresh_instance_enabled(self):
+        cfg_raw = _safe_read_json(self.strategy_config_path) or {}
+        inst = cfg_raw.get("实例") if isinstance(cfg_raw.get("实例"), dict) else {}
+        self._instance_enabled = inst.get("启用", True) if isinstance(inst, dict) else True
+        return self._instance_enabled
+
+    async def control_watch_loop(self):
+        """停止标记与实例停用由文件监视器推送，变化后立即响应，空闲时不读盘"""
+        stop_path = os.path.abspath(self._stop_flag_path)
+        cfg_path = os.path.abspath(self.strategy_config_path)
+        watcher = FileWatcher()
+        watcher.watch_file(stop_path)
+        watcher.watch_file(cfg_path)
+        # None 表示首次检查或事件可能丢失，需全部重读
+        changes = None
+        try:
+            while not self.shutdown_event.is_set() and not getattr(self, "_shutting_down", False):
+                try:
+                    if changes is None or stop_path in changes or os.path.dirname(stop_path) in changes:
+                        if os.path.exists(stop_path):
+                            if not bool(getattr(self, "_stop_flag_seen", False)):
+                                self._stop_flag_seen = True
+                                logger.info("检测到停止标记，开始优雅退出")
+                            await self.shutdown("stop_flag")
+                            break
+                    if changes is None or cfg_path in changes or os.path.dirname(cfg_path) in changes:
+                        if self._refresh_instance_enabled() is False:
+                            if not bool(getattr(self, "_disabled_seen", False)):
+                                self._disabled_seen = True
+                                logger.info("检测到实例停用，开始优雅退出")
+                            await self.shutdown("disabled")
+                            break
+                except Exception:
+                    pass
+                changes = await watcher.wait(stop_event=self.shutdown_event)
+        finally:
+            watcher.close()
+
     def _normalize_direction(self, value):
         s = str(value or "").strip().lower()
         if s in {"做多", "多", "long", "l", "buy"}:
@@ -566,57 +828,95 @@ class GridTradingBot:
         except Exception:
             self._hedge_mode = None
 
-    def _apply_runtime_settings_from_config(self):
-        cfg = {}
-        try:
-            cfg = self.risk_engine.get_config() or {}
-        except Exception:
-            cfg = {}
-
-        env_override = os.getenv("STRATEGY_DIRECTION", "").strip()
-        d = self._normalize_direction(env_override) or self._normalize_direction(cfg.get("DIRECTION")) or self._normalize_direction(cfg.get("方向"))
-        if d is None:
-            d = "long"
-        if self.direction != d:
-            self.direction = d
+    def _on_config_changed(self, changes: ConfigChanges):
+        """热更新后按变更分类只重同步受影响的子系统（调用方持有 self.lock）"""
+        self._state_seq += 1
+        self.eval_band.mark_dirty()
+        if changes.grid:
             self._force_orders_resync = True
+        if "rest_sync_interval_sec" in changes.fields:
+            _old, itv = changes.fields["rest_sync_interval_sec"]
+            if itv > 0:
+                self.rest_sync_interval_sec = float(itv)
+        if changes.risk:
+            # 止损阶梯/比例变化后按新参数重算，不沿用旧棘轮价；立即重新评估风控
+            self._trail_stop_price_long = None
+            self._trail_stop_price_short = None
+            self._last_risk_eval_ts = 0.0
 
-        try:
-            cd = float(cfg.get("GRID_ACTION_COOLDOWN_SEC", getattr(self, "_grid_action_cooldown_sec", 1.2)) or 0.0)
-        except Exception:
-            cd = getattr(self, "_grid_action_cooldown_sec", 1.2)
-        self._grid_action_cooldown_sec = max(0.0, float(cd))
+    def _apply_runtime_settings_from_config(self):
+        sc = self.risk_engine.get_strategy_config()
+        # 方向/冷却/日志间隔只在配置快照更新后重新应用
+        if getattr(self, "_runtime_settings_version", None) != sc.version:
+            self._runtime_settings_version = sc.version
+            env_override = self._direction_override or os.getenv("STRATEGY_DIRECTION", "").strip()
+            d = self._normalize_direction(env_override) or self._normalize_direction(sc.direction)
+            if d is None:
+                d = "long"
+            if self.direction != d:
+                self.direction = d
+                self._force_orders_resync = True
 
-        try:
-            itv = float(cfg.get("STATUS_LOG_INTERVAL_SEC", getattr(self, "_status_log_interval_sec", 60.0)) or 60.0)
-        except Exception:
-            itv = getattr(self, "_status_log_interval_sec", 60.0)
-        if itv > 0:
-            self._status_log_interval_sec = float(itv)
+            self._grid_action_cooldown_sec = max(0.0, float(sc.grid_action_cooldown_sec))
+            if sc.status_log_interval_sec > 0:
+                self._status_log_interval_sec = float(sc.status_log_interval_sec)
+
+        # 杠杆与保证金模式未生效（不含失败退避中）时才会真正发请求
+        self._kick_account_settings()
 
+    def _kick_account_settings(self):
+        """杠杆/保证金模式需要设置时放到后台任务经 REST 网关执行，行情与风控评估不等待"""
+        if not (self._leverage_pending() or self._margin_mode_pending()):
+            return
+        task = getattr(self, "_account_settings_task", None)
+        if task is not None and (not task.done()):
+            return
         try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # 构造阶段尚无事件循环，直接设置
             self._apply_leverage_from_config()
-        except Exception:
-            pass
-        try:
             self._apply_margin_mode_from_config()
-        except Exception:
-            pass
+            return
+        self._account_settings_task = asyncio.create_task(self._apply_account_settings())
 
-    def _apply_margin_mode_from_config(self, force: bool = False):
+    async def _apply_account_settings(self):
+        try:
+            if self._leverage_pending():
+                await self.rest.call("set_leverage", self._apply_leverage_from_config)
+            if self._margin_mode_pending():
+                await self.rest.call("set_margin_mode", self._apply_margin_mode_from_config)
+        except Exception as e:
+            logger.error(f"设置杠杆/保证金模式失败: {e}")
+
+    def _margin_mode_pending(self, force: bool = False) -> bool:
+        if getattr(self, "_shutting_down", False) or self.shutdown_event.is_set():
+            return False
+        if force:
+            return True
+        if time.time() < float(getattr(self, "_margin_mode_backoff_until_ts", 0.0) or 0.0):
+            return False
+        desired = self.risk_engine.get_strategy_config().margin_mode
+        return str(getattr(self, "_applied_margin_mode", "") or "").strip().lower() != desired
+
+    def _leverage_pending(self, force: bool = False) -> bool:
         if getattr(self, "_shutting_down", False) or self.shutdown_event.is_set():
+            return False
+        lev_i = self.risk_engine.get_strategy_config().leverage
+        if lev_i is None:
+            return False
+        if force:
+            return True
+        if time.time() < float(getattr(self, "_leverage_backoff_until_ts", 0.0) or 0.0):
+            return False
+        return int(getattr(self, "_applied_leverage", 0) or 0) != lev_i
+
+    def _apply_margin_mode_from_config(self, force: bool = False):
+        if not self._margin_mode_pending(force):
             return
         now = time.time()
-        backoff_until = float(getattr(self, "_margin_mode_backoff_until_ts", 0.0) or 0.0)
-        if not force and now < backoff_until:
-            return
-        cfg_raw = _safe_read_json(self.strategy_config_path) or {}
-        mm = str(cfg_raw.get("保证金模式") or "").strip()
-        if mm not in {"逐仓", "全仓"}:
-            mm = "逐仓"
-        desired = "isolated" if mm == "逐仓" else "cross"
-        if (not force) and str(getattr(self, "_applied_margin_mode", "") or "").strip().lower() == desired:
-            return
+        desired = self.risk_engine.get_strategy_config().margin_mode
+        mm = "逐仓" if desired == "isolated" else "全仓"
         market_id = self._raw_market_id()
         if not market_id:
             return
@@ -645,29 +945,10 @@ class GridTradingBot:
             logger.error(f"设置保证金模式失败: {e}")
 
     def _apply_leverage_from_config(self, force: bool = False):
-        if getattr(self, "_shutting_down", False) or self.shutdown_event.is_set():
+        if not self._leverage_pending(force):
             return
         now = time.time()
-        backoff_until = float(getattr(self, "_leverage_backoff_until_ts", 0.0) or 0.0)
-        if not force and now < backoff_until:
-            return
-        cfg_raw = _safe_read_json(self.strategy_config_path) or {}
-        grid = cfg_raw.get("网格") if isinstance(cfg_raw.get("网格"), dict) else {}
-        lev = None
-        if isinstance(grid, dict):
-            lev = grid.get("杠杆倍数")
-        if lev is None:
-            return
-        try:
-            lev_i = int(float(lev))
-        except Exception:
-            return
-        if lev_i <= 0:
-            return
-        if lev_i > 125:
-            lev_i = 125
-        if (not force) and int(getattr(self, "_applied_leverage", 0) or 0) == lev_i:
-            return
+        lev_i = self.risk_engine.get_strategy_config().leverage
         market_id = self._raw_market_id()
         if not market_id:
             return
@@ -798,10 +1079,18 @@ class GridTradingBot:
             return False
         if float(self._rest_next_allowed_ts or 0.0) > 0 and now < float(self._rest_next_allowed_ts):
             return False
+        # 同步类请求优先级最低：共享额度紧张或其它进程已触发封禁时让路
+        budget = getattr(self.exchange, "rest_budget", None)
+        if budget is not None and budget.blocked_until(PRIORITY_LOW) > now:
+            return False
         return True
 
     def _note_rest_error(self, err, label: str = "rest") -> None:
         now = time.time()
+        if isinstance(err, RestBudgetExceeded):
+            # 主动让路而非请求失败：等到额度窗口恢复，不累加退避
+            self._rest_next_allowed_ts = max(float(self._rest_next_allowed_ts or 0.0), float(err.retry_at))
+            return
         ban_until = self._extract_rest_ban_until_ts(err)
         if ban_until > 0:
             self._rest_ban_until_ts = max(float(self._rest_ban_until_ts or 0.0), float(ban_until))
@@ -823,26 +1112,16 @@ class GridTradingBot:
         q = self._safe_float(quantity)
         if q is None:
             return None
-        try:
-            q = round(float(q), int(self.amount_precision or 0))
-        except Exception:
-            q = float(q)
-        return float(q)
+        return self.market_spec.round_qty(q)
 
     def round_amount_down(self, quantity: float):
         q = self._safe_float(quantity)
         if q is None:
             return None
-        prec = int(self.amount_precision or 0)
-        if prec <= 0:
-            return float(math.floor(float(q)))
-        scale = 10 ** prec
-        v = float(q) * float(scale)
-        v2 = math.floor(v + 1e-12)
-        out = float(v2) / float(scale)
-        if out <= 0:
+        lots = self.market_spec.qty_to_lots(q, "down")
+        if lots <= 0:
             return None
-        return float(out)
+        return self.market_spec.lots_to_qty(lots)
 
     def _safe_bool(self, v, default: bool = False):
         if v is None:
@@ -857,53 +1136,29 @@ class GridTradingBot:
         return default
 
     def _maker_only_enabled(self) -> bool:
-        try:
-            cfg = self.risk_engine.get_config()
-        except Exception:
-            cfg = {}
-        return self._safe_bool((cfg or {}).get("MAKER_ONLY"), False)
+        return bool(self.risk_engine.get_strategy_config().maker_only)
 
     def _post_only_price(self, side: str, price: float):
         p = self._safe_float(price)
         if p is None or p <= 0:
             return None
-        prec = int(self.price_precision or 0)
-        scale = 10 ** max(0, prec)
-        tick = 1.0 / float(scale) if scale > 0 else 1e-8
-        if tick <= 0:
-            tick = 1e-8
+        spec = self.market_spec
         bid = self._safe_float(getattr(self, "best_bid_price", None)) or 0.0
         ask = self._safe_float(getattr(self, "best_ask_price", None)) or 0.0
         s = str(side or "").strip().lower()
         if s == "buy":
-            if ask > 0 and p >= ask:
-                p = float(ask) - float(tick)
-            v = float(p) * float(scale)
-            v2 = math.floor(v + 1e-12)
-            p = float(v2) / float(scale)
-            if ask > 0 and p >= ask:
-                p = float(ask) - float(tick)
-                v = float(p) * float(scale)
-                v2 = math.floor(v + 1e-12)
-                p = float(v2) / float(scale)
-            if p <= 0:
-                return None
+            t = spec.price_to_ticks(p, "down")
+            if ask > 0:
+                t = min(t, spec.price_to_ticks(ask, "up") - 1)
         elif s == "sell":
-            if bid > 0 and p <= bid:
-                p = float(bid) + float(tick)
-            v = float(p) * float(scale)
-            v2 = math.ceil(v - 1e-12)
-            p = float(v2) / float(scale)
-            if bid > 0 and p <= bid:
-                p = float(bid) + float(tick)
-                v = float(p) * float(scale)
-                v2 = math.ceil(v - 1e-12)
-                p = float(v2) / float(scale)
-            if p <= 0:
-                return None
+            t = spec.price_to_ticks(p, "up")
+            if bid > 0:
+                t = max(t, spec.price_to_ticks(bid, "down") + 1)
         else:
             return None
-        return float(p)
+        if t <= 0:
+            return None
+        return spec.ticks_to_price(t)
 
     def _update_anchor_after_fill(self, position_side: str, fill_price: float):
         ps = str(position_side or "").strip().upper()
@@ -1007,32 +1262,104 @@ class GridTradingBot:
             return ts_f
         return None
 
-    def _get_open_orders_cached(self, max_age_sec: float = 1.0):
-        now = time.time()
-        cached = getattr(self, "_open_orders_cache", None)
-        ts = float(getattr(self, "_open_orders_cache_ts", 0.0) or 0.0)
-        if cached is not None and (now - ts) <= float(max_age_sec or 0.0):
-            return cached
-        if not self._rest_allowed():
-            if cached is not None:
-                return cached
-            return []
-        orders = self.exchange.fetch_open_orders(self.ccxt_symbol)
-        self._open_orders_cache = orders
-        self._open_orders_cache_ts = now
-        return orders
+    def _order_record_from_ccxt(self, order: dict):
+        if not isinstance(order, dict):
+            return None
+        oid = order.get("id")
+        if oid is None:
+            return None
+        info = order.get("info") or {}
+        rec = OrderRecord()
+        rec.order_id = str(oid)
+        rec.client_id = self._get_order_client_id(order)
+        rec.side = str(order.get("side") or info.get("side") or info.get("S") or "").strip().lower()
+        rec.position_side = self._get_order_position_side(order)
+        rec.order_type = str(order.get("type") or info.get("type") or "").strip().upper()
+        rec.is_stop = self._is_stop_order(order)
+        rec.reduce_only = self._get_order_reduce_only(order)
+        price = self._safe_float(order.get("price"))
+        if price is None:
+            price = self._safe_float(info.get("price"))
+        rec.price = float(price or 0.0)
+        rec.price_tick = self.order_store.to_tick(rec.price)
+        sp = self._safe_float(info.get("stopPrice"))
+        if sp is None:
+            sp = self._safe_float(order.get("stopPrice"))
+        rec.stop_price = float(sp or 0.0)
+        rec.stop_tick = self.order_store.to_tick(rec.stop_price)
+        qty = self._safe_float(order.get("amount"))
+        if qty is None:
+            qty = self._safe_float(info.get("origQty"))
+        rec.qty = abs(float(qty or 0.0))
+        remaining = self._safe_float(order.get("remaining"))
+        if remaining is None:
+            remaining = rec.qty - abs(float(self._safe_float(order.get("filled")) or 0.0))
+        rec.remaining = max(0.0, float(remaining))
+        rec.status = str(info.get("status") or "NEW").strip().upper()
+        rec.ts = self._get_order_timestamp_sec(order)
+        return rec
+
+    def _order_record_from_algo(self, raw: dict):
+        if not isinstance(raw, dict):
+            return None
+        aid = raw.get("algoId")
+        if aid is None:
+            return None
+        trigger = self._safe_float(raw.get("triggerPrice"))
+        if trigger is None:
+            trigger = self._safe_float(raw.get("stopPrice"))
+        if trigger is None:
+            trigger = self._safe_float(raw.get("price"))
+        reduce_only = _parse_env_bool(raw.get("reduceOnly"), False) or _parse_env_bool(raw.get("closePosition"), False)
+        rec = self.order_store.algo_record(
+            aid,
+            raw.get("clientAlgoId") or raw.get("clientOrderId"),
+            raw.get("side"),
+            raw.get("positionSide"),
+            raw.get("orderType") or raw.get("type"),
+            trigger,
+            raw.get("quantity"),
+            reduce_only,
+            raw.get("algoStatus") or raw.get("status") or "NEW",
+        )
+        rec.ts = self._get_order_timestamp_sec({"timestamp": raw.get("createTime") or raw.get("updateTime")})
+        return rec
 
-    def _refresh_open_orders_cache(self):
+    def _record_order_ack(self, order):
+        """下单回执立即写入挂单簿，避免等待 WS 事件期间重复下单。"""
+        try:
+            status = str((order or {}).get("status") or "open").strip().lower()
+            if status not in {"open", "new"}:
+                return
+            rec = self._order_record_from_ccxt(order)
+            if rec is None or rec.is_stop:
+                return
+            self.order_store.add_ack(rec)
+            self._sync_order_counters_from_store()
+        except Exception:
+            pass
+
+    def _sync_order_counters_from_store(self):
+        bl, sl, ss, bs = self.order_store.totals()
+        self.buy_long_orders = bl
+        self.sell_long_orders = sl
+        self.sell_short_orders = ss
+        self.buy_short_orders = bs
+
+    def _ensure_order_store_synced(self):
+        """挂单簿断档（启动、WS 重连、批量撤单）时才走 REST 全量对账。"""
+        if not self.order_store.stale:
+            return
         if not self._rest_allowed():
-            self._open_orders_cache_ts = time.time()
             return
         try:
-            orders = self.exchange.fetch_open_orders(self.ccxt_symbol)
-            self._open_orders_cache = orders
-            self._open_orders_cache_ts = time.time()
-        except Exception:
-            self._open_orders_cache = None
-            self._open_orders_cache_ts = time.time()
+            self.check_orders_status()
+        except Exception as e:
+            self._note_rest_error(e, "orders_sync")
+
+    def _open_order_records(self):
+        self._ensure_order_store_synced()
+        return self.order_store.records()
 
     def _get_order_position_side(self, order: dict):
         info = (order or {}).get("info") or {}
@@ -1096,41 +1423,16 @@ class GridTradingBot:
                     desired_ps = desired_ps.upper()
                 else:
                     return False
-            desired_price = round(float(price), int(self.price_precision or 0))
+            tick = self.market_spec.price_to_ticks(float(price))
         except Exception:
             return False
 
         try:
-            orders = self._get_open_orders_cached(max_age_sec=0.8)
+            self._ensure_order_store_synced()
+            return self.order_store.has_order_at(desired_side, desired_ps if hedged else None, False, tick)
         except Exception:
             return False
 
-        for o in orders or []:
-            try:
-                if self._is_stop_order(o):
-                    continue
-                o_side = str((o or {}).get("side") or "").strip().lower()
-                if o_side != desired_side:
-                    continue
-                if bool(getattr(self, "_hedge_mode", False)):
-                    o_ps = self._get_order_position_side(o)
-                    if o_ps != desired_ps:
-                        continue
-                if self._get_order_reduce_only(o):
-                    continue
-                o_price = o.get("price")
-                if o_price is None:
-                    o_price = (o.get("info") or {}).get("price")
-                if o_price is None:
-                    continue
-                o_price_f = round(float(o_price), int(self.price_precision or 0))
-                if o_price_f != desired_price:
-                    continue
-                return True
-            except Exception:
-                continue
-        return False
-
     def _in_grid_action_cooldown(self, side: str):
         now = time.time()
         cd = float(getattr(self, "_grid_action_cooldown_sec", 0.0) or 0.0)
@@ -1345,15 +1647,10 @@ class GridTradingBot:
             now = time.time()
             equity = None
             instance_equity = None
-            cfg = {}
-            try:
-                cfg = self.risk_engine.get_config() or {}
-            except Exception:
-                cfg = {}
-            allocated = self._safe_float(cfg.get("ALLOCATED_CAPITAL_USDC", cfg.get("ALLOCATED_CAPITAL_USDT", 0.0)))
+            allocated = float(self.risk_engine.get_strategy_config().allocated_capital_usdc or 0.0)
             if allocated is not None and float(allocated) > 0:
                 try:
-                    snap = self.get_position_snapshot()
+                    snap = self._local_position_snapshot()
                     active = str(self.direction or "long").strip().lower()
                     if active not in {"long", "short"}:
                         active = "long"
@@ -1467,63 +1764,28 @@ class GridTradingBot:
                 keep = {str(x) for x in (keep_client_ids or []) if str(x)}
         except Exception:
             keep = set()
-        required_ps = None
-        if bool(getattr(self, "_hedge_mode", False)):
-            required_ps = "LONG" if s == "long" else "SHORT"
+        hedge = bool(getattr(self, "_hedge_mode", False))
+        market_id = self._raw_market_id()
         try:
-            orders = self._get_open_orders_cached(max_age_sec=0.0) or []
+            self._ensure_order_store_synced()
         except Exception:
-            orders = []
-        for o in orders:
+            pass
+        recs = self.stop_manager.side_stops(s, hedge) + self.stop_manager.side_stops(s, hedge, trailing=True)
+        for rec in recs:
             try:
-                if not self._is_stop_order(o):
+                if (not rec.is_algo) and (not rec.reduce_only):
                     continue
-                if not self._get_order_reduce_only(o):
+                if keep and rec.client_id and rec.client_id in keep:
                     continue
-                if keep:
-                    cid = str(self._get_order_client_id(o) or "")
-                    if cid and cid in keep:
-                        continue
-                if required_ps is not None:
-                    ps = self._get_order_position_side(o)
-                    if ps != required_ps:
-                        continue
-                oid = (o or {}).get("id")
-                if oid:
-                    self.cancel_order(oid)
+                if rec.is_algo:
+                    self._cancel_algo_order(rec.algo_id, market_id)
+                else:
+                    self.cancel_order(rec.order_id)
+                self.stop_manager.note_cancelled()
             except Exception:
                 continue
-        market_id = self._raw_market_id()
-        if market_id:
-            desired_o_side = "sell" if s == "long" else "buy"
-            algo_orders = self._fetch_open_algo_orders(market_id)
-            for ao in (algo_orders or []):
-                try:
-                    raw = ao or {}
-                    status = str(raw.get("algoStatus") or raw.get("status") or "").strip().upper()
-                    if status and status not in {"NEW"}:
-                        continue
-                    ot = str(raw.get("orderType") or raw.get("type") or "").strip().upper()
-                    if ("STOP" not in ot) and ("TAKE_PROFIT" not in ot) and ("TRAILING" not in ot):
-                        continue
-                    a_side = str(raw.get("side") or "").strip().lower()
-                    if a_side != desired_o_side:
-                        continue
-                    if keep:
-                        cid = str(raw.get("clientAlgoId") or raw.get("clientOrderId") or raw.get("clientOrderID") or "").strip()
-                        if cid and cid in keep:
-                            continue
-                    if required_ps is not None:
-                        ps = str(raw.get("positionSide") or "").strip().upper()
-                        if ps and ps not in {required_ps, "BOTH"}:
-                            continue
-                    aid = raw.get("algoId")
-                    if aid is not None:
-                        self._cancel_algo_order(aid, market_id)
-                except Exception:
-                    continue
+        self._native_trail_key.pop(s, None)
         self._stop_order_id = None
-        self._refresh_open_orders_cache()
 
     def _raw_market_id(self):
         try:
@@ -1620,6 +1882,8 @@ class GridTradingBot:
                         cancelled += 1
                 except Exception:
                     continue
+        if cancelled:
+            self.order_store.stale = True
         return cancelled
 
     def _raw_cancel_all_open_orders_for_symbol(self):
@@ -1629,6 +1893,7 @@ class GridTradingBot:
         if hasattr(self.exchange, "fapiPrivateDeleteAllOpenOrders"):
             try:
                 self.exchange.fapiPrivateDeleteAllOpenOrders({"symbol": market_id})
+                self.order_store.stale = True
                 return True
             except Exception:
                 return False
@@ -1652,7 +1917,7 @@ class GridTradingBot:
             return self._fapi_private_request(str(request_path), str(http_method).upper(), params or {})
         raise AttributeError("No suitable fapiPrivate method")
 
-    def _fetch_open_algo_orders(self, market_id: str = None):
+    def _fetch_open_algo_orders(self, market_id: str = None, raise_errors: bool = False):
         mid = str(market_id or "").strip() or self._raw_market_id()
         if not mid:
             return []
@@ -1664,6 +1929,8 @@ class GridTradingBot:
                 {"symbol": mid},
             )
         except Exception:
+            if raise_errors:
+                raise
             return []
         if isinstance(res, list):
             return res
@@ -1688,6 +1955,7 @@ class GridTradingBot:
                 "DELETE",
                 {"symbol": mid, "algoId": aid},
             )
+            self.order_store.remove_algo(aid)
             return True
         except Exception:
             return False
@@ -1716,6 +1984,9 @@ class GridTradingBot:
         close_position: bool = True,
         quantity: float = None,
         client_algo_id: str = None,
+        callback_rate: float = None,
+        activation_price: float = None,
+        reduce_only: bool = False,
     ):
         mid = self._raw_market_id()
         if not mid:
@@ -1726,18 +1997,30 @@ class GridTradingBot:
         sd = str(side or "").strip().upper()
         if sd not in {"BUY", "SELL"}:
             raise ValueError("invalid side")
+        trailing = ot == "TRAILING_STOP_MARKET"
         tp = self._safe_float(trigger_price)
-        if tp is None or float(tp) <= 0:
+        if trailing:
+            # 移动止损没有触发价：由 callbackRate 回调比例触发，activatePrice 为空表示立即开始跟踪
+            tp = self._safe_float(activation_price)
+            cr = self._safe_float(callback_rate)
+            if cr is None or cr <= 0:
+                raise ValueError("invalid callback rate")
+        elif tp is None or float(tp) <= 0:
             raise ValueError("invalid trigger price")
         params = {
             "symbol": mid,
             "side": sd,
             "algoType": "CONDITIONAL",
             "type": ot,
-            "triggerPrice": float(tp),
             "workingType": "CONTRACT_PRICE",
             "priceProtect": False,
         }
+        if trailing:
+            params["callbackRate"] = f"{float(cr):.1f}"
+            if tp is not None and float(tp) > 0:
+                params["activatePrice"] = self.market_spec.format_price(tp)
+        else:
+            params["triggerPrice"] = self.market_spec.format_price(tp)
         if ot in {"STOP", "TAKE_PROFIT"}:
             params["timeInForce"] = "GTC"
         if client_algo_id:
@@ -1752,19 +2035,38 @@ class GridTradingBot:
             q = self._safe_float(quantity)
             if q is None or q <= 0:
                 raise ValueError("invalid quantity")
-            params["quantity"] = float(q)
+            params["quantity"] = self.market_spec.format_qty(q)
+            if bool(reduce_only) and "positionSide" not in params:
+                params["reduceOnly"] = "true"
         if ot in {"STOP", "TAKE_PROFIT"}:
             if bool(close_position):
                 raise ValueError(f"invalid order type for closePosition: {ot}")
-            params["price"] = float(tp)
-        return self._fapi_private_call(
+            params["price"] = self.market_spec.format_price(tp)
+        res = self._fapi_private_call(
             ["fapiPrivatePostAlgoOrder", "fapiPrivatePostAlgoorder"],
             "algoOrder",
             "POST",
             params,
         )
+        try:
+            aid = (res or {}).get("algoId")
+            if aid is not None:
+                self.order_store.add_algo_ack(
+                    int(aid),
+                    (res or {}).get("clientAlgoId") or client_algo_id,
+                    sd,
+                    params.get("positionSide"),
+                    ot,
+                    float(tp or 0.0),
+                    params.get("quantity"),
+                    bool(close_position) or bool(reduce_only),
+                )
+        except Exception:
+            pass
+        return res
 
-    def _compute_trailing_stop_price(self, side: str, entry_price: float, current_price: float, cfg: dict):
+    def _compute_trailing_stop_price(self, side: str, entry_price: float, current_price: float, sc: StrategyConfig, native: bool = False):
+        """本地止损价；native 时初始比例与回撤阶梯交给交易所移动止损单，这里只算固定的阶梯/硬止损价"""
         s = str(side or "").strip().lower()
         ep = self._safe_float(entry_price)
         cp = self._safe_float(current_price)
@@ -1795,59 +2097,41 @@ class GridTradingBot:
                 setattr(self, "_trail_trough_price_short", float(trough))
 
         candidates = []
-        base_ratio = self._safe_float(cfg.get("TRAILING_STOP_BASE_STOP_RATIO", 0.0))
-        if base_ratio is not None and base_ratio > 0:
+        base_ratio = sc.trailing_stop_base_stop_ratio
+        if base_ratio > 0 and not native:
             if s == "long":
                 candidates.append(float(peak) * (1.0 - float(base_ratio)))
             else:
                 candidates.append(float(trough) * (1.0 + float(base_ratio)))
 
-        ladder = cfg.get("TRAILING_STOP_LADDER") or []
-        if isinstance(ladder, list):
+        ladder = sc.trailing_stop_ladder
+        if ladder:
             if s == "long":
                 profit_ratio = (float(peak) / ep) - 1.0
             else:
                 profit_ratio = (ep / float(trough)) - 1.0
-            best = None
-            for item in ladder:
-                if not isinstance(item, dict):
-                    continue
-                tr = self._safe_float(item.get("trigger_ratio"))
-                sr = self._safe_float(item.get("stop_ratio"))
-                if tr is None or sr is None:
-                    continue
-                if profit_ratio >= float(tr):
-                    best = float(sr) if best is None else max(float(best), float(sr))
+            best = ladder.lookup(profit_ratio)
             if best is not None:
                 if s == "long":
                     candidates.append(ep * (1.0 + float(best)))
                 else:
                     candidates.append(ep * (1.0 - float(best)))
 
-        pb_ladder = cfg.get("TRAILING_PULLBACK_LADDER") or []
-        if isinstance(pb_ladder, list) and pb_ladder:
+        pb_ladder = sc.trailing_pullback_ladder
+        if pb_ladder and not native:
             if s == "long":
                 pr = (float(peak) / float(ep)) - 1.0
             else:
                 pr = (float(ep) / float(trough)) - 1.0
-            best_pb = None
-            for item in pb_ladder:
-                if not isinstance(item, dict):
-                    continue
-                tr = self._safe_float(item.get("trigger_ratio"))
-                pb = self._safe_float(item.get("pullback_ratio"))
-                if tr is None or pb is None:
-                    continue
-                if pr >= float(tr):
-                    best_pb = float(pb) if best_pb is None else min(float(best_pb), float(pb))
+            best_pb = pb_ladder.lookup(pr)
             if best_pb is not None and float(best_pb) > 0:
                 if s == "long":
                     candidates.append(float(peak) * (1.0 - float(best_pb)))
                 else:
                     candidates.append(float(trough) * (1.0 + float(best_pb)))
 
-        hs_price = self._safe_float(cfg.get("HARD_STOPLOSS_PRICE", 0.0))
-        if hs_price is not None and hs_price > 0:
+        hs_price = sc.hard_stoploss_price
+        if hs_price > 0:
             candidates.append(float(hs_price))
 
         if not candidates:
@@ -1858,19 +2142,22 @@ class GridTradingBot:
         else:
             stop_price = min(float(x) for x in candidates if x is not None and float(x) > 0)
 
-        stop_price = round(float(stop_price), int(self.price_precision or 0))
-        if stop_price <= 0:
+        spec = self.market_spec
+        stop_tick = spec.price_to_ticks(stop_price)
+        if stop_tick <= 0:
             return None
         prev = None
         if s == "long":
             prev = self._safe_float(getattr(self, "_trail_stop_price_long", None))
             if prev is not None and prev > 0:
-                stop_price = max(float(stop_price), float(prev))
+                stop_tick = max(stop_tick, spec.price_to_ticks(prev))
+            stop_price = spec.ticks_to_price(stop_tick)
             setattr(self, "_trail_stop_price_long", float(stop_price))
         else:
             prev = self._safe_float(getattr(self, "_trail_stop_price_short", None))
             if prev is not None and prev > 0:
-                stop_price = min(float(stop_price), float(prev))
+                stop_tick = min(stop_tick, spec.price_to_ticks(prev))
+            stop_price = spec.ticks_to_price(stop_tick)
             setattr(self, "_trail_stop_price_short", float(stop_price))
         return float(stop_price)
 
@@ -1882,95 +2169,47 @@ class GridTradingBot:
             return "invalid"
         if q <= 0 or sp <= 0:
             return "invalid"
-        now = time.time()
-        if (now - float(getattr(self, "_last_stop_update_ts", 0.0) or 0.0)) < 1.0:
-            return "throttled"
-        self._last_stop_update_ts = now
-
         required_ps = None
         if bool(getattr(self, "_hedge_mode", False)):
             required_ps = "LONG" if s == "long" else "SHORT"
 
         market_id = self._raw_market_id()
         try:
-            orders = self._get_open_orders_cached(max_age_sec=0.0) or []
+            self._ensure_order_store_synced()
         except Exception:
-            orders = []
+            pass
         desired_o_side = "sell" if s == "long" else "buy"
-        desired_stop = round(float(sp), int(self.price_precision or 0))
-        candidates = []
-        for o in orders:
-            try:
-                if not self._is_stop_order(o):
-                    continue
-                o_side = str((o or {}).get("side") or "").strip().lower()
-                if o_side != desired_o_side:
-                    continue
-                if required_ps is not None:
-                    ps = self._get_order_position_side(o)
-                    if ps not in {required_ps, None, "BOTH"}:
-                        continue
-                info = (o or {}).get("info") or {}
-                ex_stop = self._safe_float(info.get("stopPrice")) or self._safe_float(info.get("sp"))
-                ex_stop = round(float(ex_stop or 0.0), int(self.price_precision or 0))
-                candidates.append({"kind": "order", "order": o, "stop": ex_stop})
-            except Exception:
-                continue
-
-        algo_orders = []
-        try:
-            if market_id:
-                algo_orders = self._fetch_open_algo_orders(market_id)
-        except Exception:
-            algo_orders = []
-        for ao in (algo_orders or []):
-            try:
-                raw = ao or {}
-                status = str(raw.get("algoStatus") or raw.get("status") or "").strip().upper()
-                if status and status not in {"NEW"}:
-                    continue
-                ot = str(raw.get("orderType") or raw.get("type") or "").strip().upper()
-                if ("STOP" not in ot) and ("TAKE_PROFIT" not in ot) and ("TRAILING" not in ot):
-                    continue
-                a_side = str(raw.get("side") or "").strip().lower()
-                if a_side != desired_o_side:
-                    continue
-                if required_ps is not None:
-                    ps = str(raw.get("positionSide") or "").strip().upper()
-                    if ps and ps not in {required_ps, "BOTH"}:
-                        continue
-                ex_stop = self._safe_float(raw.get("triggerPrice"))
-                if ex_stop is None:
-                    ex_stop = self._safe_float(raw.get("stopPrice"))
-                if ex_stop is None:
-                    ex_stop = self._safe_float(raw.get("price"))
-                ex_stop = round(float(ex_stop or 0.0), int(self.price_precision or 0))
-                candidates.append({"kind": "algo", "algo": raw, "stop": ex_stop})
-            except Exception:
-                continue
-
-        if len(candidates) == 1 and float(candidates[0]["stop"] or 0.0) == float(desired_stop):
+        desired_stop_tick = self.market_spec.price_to_ticks(sp)
+        sm = self.stop_manager
+        sm.min_improve_ticks = max(1, int(self.risk_engine.get_strategy_config().stop_replace_min_ticks))
+        live = sm.side_stops(s, bool(getattr(self, "_hedge_mode", False)))
+        # 现存止损来自本地挂单簿，不拉取挂单；改善不足 N 格时保留原单，不消耗请求
+        if sm.decide(s, desired_stop_tick, live) == "keep":
             return "ok"
+        candidates = [{"kind": "algo" if rec.is_algo else "order", "record": rec, "stop_tick": int(rec.stop_tick or 0)} for rec in live]
+
+        now = time.time()
+        if (now - float(getattr(self, "_last_stop_update_ts", 0.0) or 0.0)) < 1.0:
+            return "throttled"
+        self._last_stop_update_ts = now
 
-        last_purge = float(getattr(self, "_last_stop_purge_ts", 0.0) or 0.0)
-        if (now - last_purge) >= 3.0 and candidates:
-            setattr(self, "_last_stop_purge_ts", now)
+        # 替换前先撤掉本地挂单簿中的旧止损（无需再拉取挂单，不再按 3 秒节流清理）
+        if candidates:
             cancelled = 0
             for it in candidates:
                 if cancelled >= 60:
                     break
                 try:
+                    rec = it.get("record")
                     if str(it.get("kind") or "") == "algo":
-                        aid = (it.get("algo") or {}).get("algoId")
-                        if aid is not None and self._cancel_algo_order(aid, market_id):
+                        if self._cancel_algo_order(rec.algo_id, market_id):
                             cancelled += 1
                     else:
-                        oid = (it.get("order") or {}).get("id")
-                        if oid:
-                            self.cancel_order(oid)
-                            cancelled += 1
+                        self.cancel_order(rec.order_id)
+                        cancelled += 1
                 except Exception:
                     continue
+            sm.note_cancelled(cancelled)
 
         try:
             algo_side = "SELL" if desired_o_side == "sell" else "BUY"
@@ -1982,7 +2221,8 @@ class GridTradingBot:
                 position_side=(required_ps if bool(getattr(self, "_hedge_mode", False)) else None),
                 close_position=True,
             )
-            self._refresh_open_orders_cache()
+            sm.note_placed(bool(live))
+            self._ensure_order_store_synced()
             return "ok"
         except Exception as e:
             msg = str(e)
@@ -2001,7 +2241,7 @@ class GridTradingBot:
                         retry_stop = min(float(sp), float(px) * 0.995)
                     else:
                         retry_stop = max(float(sp), float(px) * 1.005)
-                    retry_stop = round(float(retry_stop), int(self.price_precision or 0))
+                    retry_stop = self.market_spec.round_price(retry_stop)
                     if retry_stop <= 0:
                         return "immediate_trigger"
                     algo_side = "SELL" if desired_o_side == "sell" else "BUY"
@@ -2013,7 +2253,8 @@ class GridTradingBot:
                         position_side=(required_ps if bool(getattr(self, "_hedge_mode", False)) else None),
                         close_position=True,
                     )
-                    self._refresh_open_orders_cache()
+                    sm.note_placed(bool(live))
+                    self._ensure_order_store_synced()
                     return "ok"
                 except Exception:
                     return "immediate_trigger"
@@ -2031,7 +2272,7 @@ class GridTradingBot:
                         required_position_side=required_ps,
                         limit=300,
                     )
-                    self._refresh_open_orders_cache()
+                    self._ensure_order_store_synced()
                 except Exception:
                     pass
                 try:
@@ -2044,7 +2285,8 @@ class GridTradingBot:
                         position_side=(required_ps if bool(getattr(self, "_hedge_mode", False)) else None),
                         close_position=True,
                     )
-                    self._refresh_open_orders_cache()
+                    sm.note_placed(bool(live))
+                    self._ensure_order_store_synced()
                     return "ok"
                 except Exception as e2:
                     msg2 = str(e2)
@@ -2063,7 +2305,7 @@ class GridTradingBot:
                                 retry_stop = min(float(sp), float(px) * 0.995)
                             else:
                                 retry_stop = max(float(sp), float(px) * 1.005)
-                            retry_stop = round(float(retry_stop), int(self.price_precision or 0))
+                            retry_stop = self.market_spec.round_price(retry_stop)
                             if retry_stop <= 0:
                                 return "immediate_trigger"
                             algo_side = "SELL" if desired_o_side == "sell" else "BUY"
@@ -2075,7 +2317,8 @@ class GridTradingBot:
                                 position_side=(required_ps if bool(getattr(self, "_hedge_mode", False)) else None),
                                 close_position=True,
                             )
-                            self._refresh_open_orders_cache()
+                            sm.note_placed(bool(live))
+                            self._ensure_order_store_synced()
                             return "ok"
                         except Exception:
                             return "immediate_trigger"
@@ -2088,27 +2331,154 @@ class GridTradingBot:
                     logger.error(f"更新止损单失败: {e} ({algo_debug})")
                 except Exception:
                     pass
-        self._refresh_open_orders_cache()
+        self._ensure_order_store_synced()
         return "error"
 
+    def _native_trailing_enabled(self, sc: StrategyConfig) -> bool:
+        return bool(sc.trailing_stop_native) and bool(sc.trailing_pullback_ladder)
+
+    def _native_trailing_plan(self, side: str, entry_price: float, sc: StrategyConfig):
+        """当前生效档位映射为 (回调百分比, 激活价)；激活价为 None 表示立即开始跟踪。
+
+        回调比例取已触发回撤档与初始止损比例中较小者（二者都以峰值为基准）；一档都未触发且
+        没有初始比例时预挂第一档，激活价为该档触发价。交易所回调范围 0.1%~10%，超出按边界挂单。
+        """
+        s = str(side or "").strip().lower()
+        ep = self._safe_float(entry_price)
+        if ep is None or ep <= 0:
+            return None
+        pb = sc.trailing_pullback_ladder
+        if s == "long":
+            peak = self._safe_float(getattr(self, "_trail_peak_price_long", None))
+            pr = (float(peak) / ep - 1.0) if peak else 0.0
+        else:
+            trough = self._safe_float(getattr(self, "_trail_trough_price_short", None))
+            pr = (ep / float(trough) - 1.0) if trough else 0.0
+        tier = pb.tier(pr)
+        rates = []
+        if tier > 0:
+            rates.append(float(pb.values[tier - 1]))
+        if sc.trailing_stop_base_stop_ratio > 0:
+            rates.append(float(sc.trailing_stop_base_stop_ratio))
+        activation = None
+        if not rates:
+            rates.append(float(pb.values[0]))
+            tr = float(pb.triggers[0])
+            activation = ep * (1.0 + tr) if s == "long" else ep / (1.0 + tr)
+            activation = self.market_spec.round_price(activation, "up" if s == "long" else "down")
+        pct = round(min(10.0, max(0.1, min(rates) * 100.0)), 1)
+        return pct, activation
+
+    def _cancel_native_trailing(self, side: str, recs=None):
+        """撤该方向的交易所移动止损；recs 给出时只撤这些（新单已挂好后撤旧单）"""
+        s = str(side or "").strip().lower()
+        if recs is None:
+            self._native_trail_key.pop(s, None)
+            recs = self.stop_manager.side_stops(s, bool(getattr(self, "_hedge_mode", False)), trailing=True)
+        market_id = self._raw_market_id()
+        for rec in recs:
+            try:
+                if rec.is_algo:
+                    self._cancel_algo_order(rec.algo_id, market_id)
+                else:
+                    self.cancel_order(rec.order_id)
+                self.stop_manager.note_cancelled()
+            except Exception:
+                continue
+
+    def _upsert_native_trailing(self, side: str, qty: float, callback_pct: float, activation_price=None) -> str:
+        """按 (数量, 回调, 激活价) 维护唯一一笔交易所移动止损单；档位未变且单子仍在时不发任何请求。
+
+        重挂会重置交易所侧的峰值，因此只在档位（回调、激活价）变化或仓位增加到超出挂单数量时重挂；
+        仓位减少时 reduceOnly 单成交时不会超过持仓，原单保留。重挂先挂新单、成功后再撤旧单，期间仓位始终有保护。
+        """
+        s = str(side or "").strip().lower()
+        q = self._safe_float(qty)
+        if s not in {"long", "short"} or q is None or q <= 0:
+            return "invalid"
+        spec = self.market_spec
+        key = (
+            spec.qty_to_lots(q),
+            f"{float(callback_pct):.1f}",
+            None if activation_price is None else spec.price_to_ticks(activation_price),
+        )
+        try:
+            self._ensure_order_store_synced()
+        except Exception:
+            pass
+        live = self.stop_manager.side_stops(s, bool(getattr(self, "_hedge_mode", False)), trailing=True)
+        prev = self._native_trail_key.get(s)
+        if prev is not None and len(live) == 1 and prev[0] >= key[0]:
+            if prev[1:] == key[1:]:
+                if prev[0] != key[0]:
+                    self.stop_manager.avoided += 1
+                return "ok"
+            # 预挂的第一档已被交易所激活，与“立即跟踪”的同回调单等价，不重挂以保留交易所侧的峰值
+            if key[2] is None and prev[1] == key[1]:
+                self.stop_manager.avoided += 1
+                return "ok"
+        now = time.time()
+        if (now - float(getattr(self, "_last_native_trail_ts", 0.0) or 0.0)) < 1.0:
+            return "throttled"
+        self._last_native_trail_ts = now
+        hedge = bool(getattr(self, "_hedge_mode", False))
+        algo_side = "SELL" if s == "long" else "BUY"
+        ps = ("LONG" if s == "long" else "SHORT") if hedge else None
+        try:
+            try:
+                self._place_algo_conditional_order(
+                    "TRAILING_STOP_MARKET",
+                    algo_side,
+                    None,
+                    position_side=ps,
+                    close_position=False,
+                    quantity=float(q),
+                    callback_rate=float(callback_pct),
+                    activation_price=activation_price,
+                    reduce_only=True,
+                )
+            except Exception as e:
+                msg = str(e)
+                if activation_price is None or not (("-2021" in msg) or ("immediately trigger" in msg)):
+                    raise
+                # 激活价已被越过：改为立即开始跟踪
+                self._place_algo_conditional_order(
+                    "TRAILING_STOP_MARKET",
+                    algo_side,
+                    None,
+                    position_side=ps,
+                    close_position=False,
+                    quantity=float(q),
+                    callback_rate=float(callback_pct),
+                    reduce_only=True,
+                )
+            self._native_trail_key[s] = key
+            self.stop_manager.note_placed(bool(live))
+            if live:
+                self._cancel_native_trailing(s, live)
+            logger.info(f"交易所移动止损已挂: {s} 数量={spec.format_qty(q)} 回调={float(callback_pct):.1f}% 激活价={activation_price}")
+            return "ok"
+        except Exception as e:
+            logger.error(f"挂交易所移动止损失败: {e}")
+            return "error"
+
     async def maybe_update_trailing_stop(self):
         if self.shutdown_event.is_set():
             return
-        cfg = self.risk_engine.get_config()
+        sc = self.risk_engine.get_strategy_config()
         self._apply_runtime_settings_from_config()
-        if not bool(cfg.get("TRAILING_STOP_ENABLED", False)):
+        if not sc.trailing_stop_enabled:
             return
         if not self._rest_allowed():
+            self.eval_band.veto()
             return
         if self.latest_price is None or float(self.latest_price or 0.0) <= 0:
+            self.eval_band.veto()
             return
         side = str(self.direction or "long").strip().lower()
         if side not in {"long", "short"}:
             side = "long"
-        try:
-            snap = self.get_position_snapshot()
-        except Exception:
-            return
+        snap = self._local_position_snapshot()
         amt = float(((snap.get(side) or {}).get("amt") or 0.0))
         entry = self._safe_float((snap.get(side) or {}).get("entry_price"))
         if amt <= 0 or entry is None or entry <= 0:
@@ -2120,21 +2490,33 @@ class GridTradingBot:
                 self._trail_trough_price_short = None
                 self._trail_anchor_entry_short = None
                 self._trail_stop_price_short = None
+            self._native_trail_key.pop(side, None)
             keep = set()
             try:
-                if self._pending_entry_enabled(cfg):
-                    pp = self._pending_entry_price(cfg)
-                    hs = self._safe_float(cfg.get("HARD_STOPLOSS_PRICE", 0.0))
+                if self._pending_entry_enabled(sc):
+                    pp = self._pending_entry_price(sc)
+                    hs = sc.hard_stoploss_price
                     if pp is not None and hs is not None and float(hs) > 0:
                         cid = self._pending_hardstop_client_id(side, float(pp), float(hs))
                         if cid:
                             keep.add(str(cid))
             except Exception:
                 keep = set()
-            async with self.lock:
-                self._cancel_stop_orders_for_side(side, keep_client_ids=keep)
+            async with self._io_lock:
+                await self.rest.call("cancel_stops", self._cancel_stop_orders_for_side, side, keep_client_ids=keep)
             return
-        stop_price = self._compute_trailing_stop_price(side, float(entry), float(self.latest_price), cfg)
+        native = self._native_trailing_enabled(sc)
+        stop_price = self._compute_trailing_stop_price(side, float(entry), float(self.latest_price), sc, native=native)
+        if native:
+            # 回撤部分由交易所移动止损单跟踪，只在档位/数量变化时重挂
+            plan = self._native_trailing_plan(side, float(entry), sc)
+            if plan is not None:
+                async with self._io_lock:
+                    await self.rest.call("upsert_stop", self._upsert_native_trailing, side, float(amt), plan[0], plan[1])
+        elif self._native_trail_key.get(side) is not None or self.stop_manager.side_stops(side, bool(getattr(self, "_hedge_mode", False)), trailing=True):
+            async with self._io_lock:
+                await self.rest.call("cancel_stops", self._cancel_native_trailing, side)
+        self._note_trailing_band(side, float(entry), sc, native, stop_price)
         if stop_price is None:
             return
         px = self._safe_float(getattr(self, "best_bid_price" if side == "long" else "best_ask_price", None))
@@ -2148,55 +2530,71 @@ class GridTradingBot:
             await self._trigger_hardstop(side, pnl, reason=f"trailing_stop_breached price={float(px):.6f} stop_price={float(stop_price):.6f}")
             return
         upsert_result = None
-        async with self.lock:
-            upsert_result = self._upsert_stop_market(side, float(amt), float(stop_price))
+        async with self._io_lock:
+            upsert_result = await self.rest.call("upsert_stop", self._upsert_stop_market, side, float(amt), float(stop_price))
         if upsert_result == "immediate_trigger":
             pnl = float(self._safe_float((snap.get(side) or {}).get("pnl")) or 0.0)
             await self._trigger_hardstop(side, pnl, reason="stop_order_would_immediately_trigger")
             return
 
+    def _note_trailing_band(self, side: str, entry: float, sc: StrategyConfig, native: bool, stop_price):
+        """移动止损的价格带：未触及止损价；峰值（谷值）不创新高或未到下一档触发价时止损价不变。
+
+        初始比例与本地回撤阶梯随峰值连续变化，只能以当前峰值为界；只有阶梯时以下一档触发价为界。
+        """
+        band = self.eval_band
+        continuous = (not native) and (sc.trailing_stop_base_stop_ratio > 0 or bool(sc.trailing_pullback_ladder))
+        tables = (sc.trailing_stop_ladder, sc.trailing_pullback_ladder) if native else (sc.trailing_stop_ladder,)
+        if side == "long":
+            if stop_price is not None:
+                band.below(stop_price)
+            peak = self._safe_float(getattr(self, "_trail_peak_price_long", None))
+            if peak is None or peak <= 0:
+                band.veto()
+                return
+            if continuous:
+                band.above(peak)
+                return
+            pr = float(peak) / float(entry) - 1.0
+            for table in tables:
+                tr = table.next_trigger(pr) if table else None
+                if tr is not None:
+                    band.above(float(entry) * (1.0 + float(tr)))
+        else:
+            if stop_price is not None:
+                band.above(stop_price)
+            trough = self._safe_float(getattr(self, "_trail_trough_price_short", None))
+            if trough is None or trough <= 0:
+                band.veto()
+                return
+            if continuous:
+                band.below(trough)
+                return
+            pr = float(entry) / float(trough) - 1.0
+            for table in tables:
+                tr = table.next_trigger(pr) if table else None
+                if tr is not None:
+                    band.below(float(entry) / (1.0 + float(tr)))
+
     async def maybe_trigger_hard_stoploss(self):
         if self.shutdown_event.is_set():
             return
         if bool(getattr(self, "is_grid_stopped", False)):
             return
 
-        cfg = self.risk_engine.get_config()
+        sc = self.risk_engine.get_strategy_config()
         self._apply_runtime_settings_from_config()
-        hs_price = self._safe_float(cfg.get("HARD_STOPLOSS_PRICE", 0.0))
-        if hs_price is None or hs_price <= 0:
+        hs_price = sc.hard_stoploss_price
+        if hs_price <= 0:
             return
         if not self._rest_allowed():
+            self.eval_band.veto()
             return
         if float(self.latest_price or 0.0) <= 0:
+            self.eval_band.veto()
             return
 
-        transient_types = (
-            getattr(ccxt, "NetworkError", Exception),
-            getattr(ccxt, "RequestTimeout", Exception),
-            getattr(ccxt, "ExchangeNotAvailable", Exception),
-            getattr(ccxt, "DDoSProtection", Exception),
-        )
-
-        last_err = None
-        long_amt = short_amt = long_pnl = short_pnl = None
-        for attempt in range(2):
-            try:
-                long_amt, short_amt, long_pnl, short_pnl = self.get_position_risk()
-                last_err = None
-                break
-            except Exception as e:
-                last_err = e
-                if attempt == 0 and isinstance(e, transient_types):
-                    await asyncio.sleep(0.25)
-                    continue
-                break
-
-        if last_err is not None:
-            logger.error(f"获取持仓浮盈亏失败({type(last_err).__name__}): {last_err}")
-            return
-        self.long_position = float(long_amt or 0.0)
-        self.short_position = float(short_amt or 0.0)
+        long_amt, short_amt, long_pnl, short_pnl = self.get_position_risk_local()
 
         active = str(self.direction or "long").strip().lower()
         if active not in {"long", "short"}:
@@ -2210,6 +2608,10 @@ class GridTradingBot:
 
         if amt <= 0:
             return
+        if active == "long":
+            self.eval_band.below(hs_price)
+        else:
+            self.eval_band.above(hs_price)
 
         breached = False
         reason = None
@@ -2224,38 +2626,31 @@ class GridTradingBot:
 
         await self._trigger_hardstop(active, float(pnl or 0.0), str(reason or ""))
 
-    def get_position_risk(self):
-        params = {"type": "future"}
-        positions = self.exchange.fetch_positions(params=params)
-        long_amt = 0.0
-        short_amt = 0.0
-        long_pnl = 0.0
-        short_pnl = 0.0
-
-        for position in positions:
-            if position.get("symbol") != self.ccxt_symbol:
-                continue
-            side = self._position_side_from_ccxt_position(position)
-            contracts = self._position_amount_from_ccxt_position(position)
-            pnl = self._safe_float(position.get("unrealizedPnl"))
-            if pnl is None:
-                pnl = self._safe_float(position.get("unrealizedProfit"))
-            info = position.get("info") or {}
-            if pnl is None:
-                pnl = self._safe_float(info.get("unRealizedProfit"))
-            if pnl is None:
-                pnl = self._safe_float(info.get("unrealizedProfit"))
-            if pnl is None:
-                pnl = 0.0
-
-            if side == "long":
-                long_amt = max(0.0, float(contracts or 0.0))
-                long_pnl = float(pnl)
-            elif side == "short":
-                short_amt = abs(float(contracts or 0.0))
-                short_pnl = float(pnl)
-
-        return float(long_amt), float(short_amt), float(long_pnl), float(short_pnl)
+    def _local_position_snapshot(self):
+        return self.position_book.snapshot(float(self.latest_price or 0.0))
+
+    def _sync_positions_from_book(self):
+        self.long_position = self.position_book.amount("long")
+        self.short_position = self.position_book.amount("short")
+
+    def _reconcile_positions_rest(self):
+        requested_ts = time.time()
+        snap = self.get_position_snapshot()
+        corrected = self.position_book.apply_rest_snapshot(snap, requested_ts)
+        self._sync_positions_from_book()
+        if corrected:
+            logger.info(f"持仓对账修正: 多头 {self.long_position} 张, 空头 {self.short_position} 张")
+        return corrected
+
+    def get_position_risk_local(self):
+        mark = float(self.latest_price or 0.0)
+        book = self.position_book
+        return (
+            book.amount("long"),
+            book.amount("short"),
+            book.unrealized_pnl("long", mark),
+            book.unrealized_pnl("short", mark),
+        )
 
     async def _trigger_hardstop(self, loss_side: str, loss_pnl: float, reason: str = ""):
         if self.shutdown_event.is_set():
@@ -2263,7 +2658,7 @@ class GridTradingBot:
         if bool(getattr(self, "is_grid_stopped", False)):
             return
 
-        cfg = self.risk_engine.get_config()
+        sc = self.risk_engine.get_strategy_config()
         self.is_grid_stopped = True
         self._force_orders_resync = False
 
@@ -2272,137 +2667,74 @@ class GridTradingBot:
             msg = f"{msg} ({reason})"
         logger.error(msg)
 
-        async with self.lock:
+        async with self._io_lock:
             try:
-                self.cancel_orders_for_side(loss_side)
+                await self.rest.call("hardstop_close", self._hardstop_close_side, loss_side)
             except Exception:
                 pass
+
+        if sc.stop_on_hardstop:
             try:
-                self._cancel_stop_orders_for_side(loss_side)
+                await self.shutdown("hard_stoploss")
             except Exception:
                 pass
 
-            qty = float(self.long_position or 0.0) if loss_side == "long" else float(self.short_position or 0.0)
-            if qty > 0:
-                close_side = "sell" if loss_side == "long" else "buy"
-                try:
-                    self.place_order(
-                        close_side,
-                        price=None,
-                        quantity=qty,
-                        is_reduce_only=True,
-                        position_side=loss_side,
-                        order_type="market",
-                    )
-                except Exception:
-                    pass
+    def _hardstop_close_side(self, loss_side: str):
+        try:
+            self.cancel_orders_for_side(loss_side)
+        except Exception:
+            pass
+        try:
+            self._cancel_stop_orders_for_side(loss_side)
+        except Exception:
+            pass
 
-        if bool(cfg.get("STOP_ON_HARDSTOP", True)):
+        qty = float(self.long_position or 0.0) if loss_side == "long" else float(self.short_position or 0.0)
+        if qty > 0:
+            close_side = "sell" if loss_side == "long" else "buy"
             try:
-                await self.shutdown("hard_stoploss")
+                self.place_order(
+                    close_side,
+                    price=None,
+                    quantity=qty,
+                    is_reduce_only=True,
+                    position_side=loss_side,
+                    order_type="market",
+                )
             except Exception:
                 pass
 
     def _initialize_exchange(self):
         """初始化交易所 API"""
-        exchange = CustomGate({
-            "apiKey": self.api_key,
-            "secret": self.api_secret,
-            "timeout": 15000,
-            "enableRateLimit": True,
-            "options": {
-                "defaultType": "future",  # 使用永续合约
-                "fetchCurrencies": False,
-                "adjustForTimeDifference": True,
-                "recvWindow": 10000,
-            },
-        })
-        if self.account_mode in {"testnet", "paper", "sim"}:
-            testnet_base = "https://testnet.binancefuture.com"
-            try:
-                api_urls = exchange.urls.get("api") or {}
-                for k in list(api_urls.keys()):
-                    if not str(k).lower().startswith("fapi"):
-                        continue
-                    v = api_urls.get(k)
-                    if not v:
-                        continue
-                    s = str(v)
-                    if "/fapi/" in s:
-                        tail = s.split("/fapi/", 1)[1]
-                        api_urls[k] = f"{testnet_base}/fapi/{tail}"
-                    elif "/fapi" in s:
-                        tail = s.split("/fapi", 1)[1]
-                        api_urls[k] = f"{testnet_base}/fapi{tail}"
-                    else:
-                        api_urls[k] = f"{testnet_base}/fapi"
-                exchange.urls["api"] = api_urls
-            except Exception:
-                pass
-        try:
-            exchange.load_time_difference()
-        except Exception:
-            pass
-        # 加载市场数据
-        exchange.load_markets(reload=False)
-        return exchange
+        return create_exchange(self.api_key, self.api_secret, self.account_mode)
 
     def _get_price_precision(self):
         """获取交易对的价格精度、数量精度和最小下单数量"""
-        markets = self.exchange.fetch_markets()
+        # 交易所初始化时已 load_markets，多实例共享客户端时直接复用缓存
+        markets = list((getattr(self.exchange, "markets", None) or {}).values()) or self.exchange.fetch_markets()
         symbol_info = next(market for market in markets if market["symbol"] == self.ccxt_symbol)
 
-        # 获取价格精度
-        price_precision = symbol_info["precision"]["price"]
-        if isinstance(price_precision, float):
-            # 如果 price_precision 是浮点数（例如 0.01），计算小数点后的位数
-            self.price_precision = int(abs(math.log10(price_precision)))
-        elif isinstance(price_precision, int):
-            # 如果 price_precision 是整数，直接使用
-            self.price_precision = price_precision
-        else:
-            raise ValueError(f"未知的价格精度类型: {price_precision}")
-
-        # 获取数量精度
-        amount_precision = symbol_info["precision"]["amount"]
-        if isinstance(amount_precision, float):
-            # 如果 amount_precision 是浮点数（例如 0.001），计算小数点后的位数
-            self.amount_precision = int(abs(math.log10(amount_precision)))
-        elif isinstance(amount_precision, int):
-            # 如果 amount_precision 是整数，直接使用
-            self.amount_precision = amount_precision
-        else:
-            raise ValueError(f"未知的数量精度类型: {amount_precision}")
+        # tickSize/stepSize/最小名义价值统一由 MarketSpec 换算，价格与数量按整数 tick/lot 比较
+        self.market_spec = MarketSpec.from_ccxt(symbol_info)
+        self.price_precision = self.market_spec.price_precision
+        self.amount_precision = self.market_spec.amount_precision
 
         # 获取最小下单数量
         self.min_order_amount = symbol_info["limits"]["amount"]["min"]
-        try:
-            self.min_order_cost = (symbol_info.get("limits") or {}).get("cost", {}).get("min")
-        except Exception:
-            self.min_order_cost = None
-
-        contract_size = symbol_info.get("contractSize")
-        if contract_size is None:
-            contract_size = (symbol_info.get("info") or {}).get("contractSize")
-        try:
-            self.contract_size = float(contract_size) if contract_size is not None else 1.0
-        except Exception:
-            self.contract_size = 1.0
-        if float(self.contract_size or 0.0) <= 0:
-            self.contract_size = 1.0
+        if self.min_order_amount is None:
+            self.min_order_amount = self.market_spec.min_qty
+        self.min_order_cost = self.market_spec.min_notional or None
+        self.contract_size = self.market_spec.contract_size
 
         logger.info(
-            f"价格精度: {self.price_precision}, 数量精度: {self.amount_precision}, 最小下单数量: {self.min_order_amount}")
+            f"价格精度: {self.price_precision}, 数量精度: {self.amount_precision}, 最小下单数量: {self.min_order_amount}, "
+            f"tickSize: {self.market_spec.tick_size}, stepSize: {self.market_spec.step_size}")
 
     def round_amount_up(self, amount: float):
         a = self._safe_float(amount)
         if a is None:
             return None
-        p = int(self.amount_precision or 0)
-        if p <= 0:
-            return float(math.ceil(float(a)))
-        factor = 10 ** p
-        return float(math.ceil(float(a) * factor) / factor)
+        return self.market_spec.round_qty(a, "up")
 
     def get_position(self):
         """获取当前持仓"""
@@ -2437,23 +2769,15 @@ class GridTradingBot:
             try:
                 await asyncio.sleep(60)  # 每60秒检查一次
                 current_time = time.time()  # 当前时间（秒）
-                orders = self.exchange.fetch_open_orders(self.ccxt_symbol)
+                orders = self.order_store.grid_orders()
 
                 if not orders:
                     logger.info("当前没有未成交的挂单")
-                    self.buy_long_orders = 0.0  # 多头买入剩余挂单数量
-                    self.sell_long_orders = 0.0  # 多头卖出剩余挂单数量
-                    self.sell_short_orders = 0.0  # 空头卖出剩余挂单数量
-                    self.buy_short_orders = 0.0  # 空头买入剩余挂单数量
                     continue
 
                 for order in orders:
-                    order_id = order['id']
-                    order_timestamp = order.get('timestamp')  # 获取订单创建时间戳（毫秒）
-                    create_time = float(order['info'].get('create_time', 0))  # 获取订单创建时间（秒）
-
-                    # 优先使用 create_time，如果不存在则使用 timestamp
-                    order_time = create_time if create_time > 0 else order_timestamp / 1000
+                    order_id = order.order_id
+                    order_time = order.ts  # 订单创建时间（秒）
 
                     if not order_time:
                         logger.warning(f"订单 {order_id} 缺少时间戳，无法检查超时")
@@ -2462,7 +2786,7 @@ class GridTradingBot:
                     if current_time - order_time > 300:  # 超过300秒未成交
                         logger.info(f"订单 {order_id} 超过300秒未成交，取消挂单")
                         try:
-                            self.cancel_order(order_id)
+                            await self.rest.call("cancel_order", self.cancel_order, order_id)
                         except Exception as e:
                             logger.error(f"取消订单 {order_id} 失败: {e}")
 
@@ -2470,49 +2794,17 @@ class GridTradingBot:
                 logger.error(f"监控挂单状态失败: {e}")
 
     def check_orders_status(self):
-        """检查当前所有挂单的状态，并更新多头和空头的挂单数量"""
-        # 获取当前所有挂单（带 symbol 参数，限制为某个交易对）
+        """REST 全量对账本地挂单簿，并更新多头和空头的挂单数量"""
+        requested_ts = time.time()
         orders = self.exchange.fetch_open_orders(symbol=self.ccxt_symbol)
-
-        # 初始化计数器
-        buy_long_orders = 0.0  # 使用浮点数
-        sell_long_orders = 0.0  # 使用浮点数
-        buy_short_orders = 0.0  # 使用浮点数
-        sell_short_orders = 0.0  # 使用浮点数
-
-        for order in orders:
-            try:
-                if self._is_stop_order(order):
-                    continue
-                orig_quantity = self._safe_float((order.get('info') or {}).get('origQty'))
-                if orig_quantity is None:
-                    orig_quantity = self._safe_float(order.get("amount"))
-                if orig_quantity is None:
-                    continue
-                orig_quantity = abs(float(orig_quantity))
-                side = str(order.get('side') or '').strip().lower()
-                if side not in {"buy", "sell"}:
-                    continue
-                reduce_only = self._get_order_reduce_only(order)
-
-                if reduce_only:
-                    if side == "sell":
-                        sell_long_orders += orig_quantity
-                    else:
-                        buy_short_orders += orig_quantity
-                else:
-                    if side == "buy":
-                        buy_long_orders += orig_quantity
-                    else:
-                        sell_short_orders += orig_quantity
-            except Exception:
-                continue
-
-        # 更新实例变量
-        self.buy_long_orders = buy_long_orders
-        self.sell_long_orders = sell_long_orders
-        self.buy_short_orders = buy_short_orders
-        self.sell_short_orders = sell_short_orders
+        algo_orders = self._fetch_open_algo_orders(self._raw_market_id(), raise_errors=True)
+        records = [self._order_record_from_ccxt(o) for o in (orders or [])]
+        records.extend(self._order_record_from_algo(ao) for ao in (algo_orders or []))
+        corrected = self.order_store.load_rest(records, requested_ts)
+        self._sync_order_counters_from_store()
+        self.last_orders_update_time = time.time()
+        if corrected and self.order_store.rest_syncs > 1:
+            logger.info(f"挂单对账修正: 当前挂单 {len(self.order_store)} 个")
 
     def _fetch_last_price_rest(self):
         try:
@@ -2527,32 +2819,29 @@ class GridTradingBot:
         return None
 
     async def _maybe_open_base_position(self):
-        cfg = {}
-        try:
-            cfg = self.risk_engine.get_config() or {}
-        except Exception:
-            cfg = {}
-        if self._pending_entry_enabled(cfg) and self._pending_entry_price(cfg) is not None:
+        sc = self.risk_engine.get_strategy_config()
+        if self._pending_entry_enabled(sc) and self._pending_entry_price(sc) is not None:
             return
-        grid_enabled = bool(cfg.get("GRID_ENABLED", True))
-        if grid_enabled and (not bool(cfg.get("ENABLE_BASE_POSITION", False))):
+        if sc.grid_enabled and (not sc.enable_base_position):
             return
-        base_usdc = self._safe_float(cfg.get("BASE_POSITION_USDC", 0.0))
-        if base_usdc is None or float(base_usdc) <= 0:
+        base_usdc = float(sc.base_position_usdc or 0.0)
+        if base_usdc <= 0:
             return
         if float(self.long_position or 0.0) > 0 or float(self.short_position or 0.0) > 0:
             return
         price = self._safe_float(getattr(self, "latest_price", None))
         if price is None or float(price) <= 0:
-            price = self._fetch_last_price_rest()
+            price = await self.rest.call("fetch_ticker", self._fetch_last_price_rest)
         if price is None or float(price) <= 0:
             return
         qty = self.usdc_to_amount(float(base_usdc), float(price))
         if qty is None or float(qty) <= 0:
             return
         side = "buy" if str(self.direction or "long") == "long" else "sell"
-        async with self.lock:
-            self.place_order(
+        async with self._io_lock:
+            await self.rest.call(
+                "base_position",
+                self.place_order,
                 side,
                 price=None,
                 quantity=float(qty),
@@ -2564,18 +2853,27 @@ class GridTradingBot:
 
     async def run(self):
         """启动 WebSocket 监听"""
+        _LOG_INSTANCE.set(self.instance_id)
         self._apply_runtime_settings_from_config()
         asyncio.create_task(self.status_file_loop())
+        asyncio.create_task(self.control_watch_loop())
+        self._user_event_task = asyncio.create_task(self.user_event_loop())
+        self._ticker_task = asyncio.create_task(self.ticker_consumer_loop())
+        ws_api = getattr(self.exchange, "ws_order_api", None)
+        if ws_api is not None:
+            ws_api.start()
+        if self.market_hub_addr is not None and not self.external_streams:
+            self._market_hub_task = asyncio.create_task(self.market_hub_loop())
         # 初始化时获取一次持仓数据
-        self.long_position, self.short_position = self.get_position()
-        # self.last_position_update_time = time.time()
+        await self.rest.call("fetch_positions", self._reconcile_positions_rest)
+        self.last_position_update_time = time.time()
         logger.info(f"初始化持仓: 多头 {self.long_position} 张, 空头 {self.short_position} 张")
 
         # 等待状态同步完成
         await asyncio.sleep(float(self.order_first_time_sec or 0.0))
 
         # 初始化时获取一次挂单状态
-        self.check_orders_status()
+        await self.rest.call("fetch_open_orders", self.check_orders_status)
         logger.info(
             f"初始化挂单状态: 多头开仓={self.buy_long_orders}, 多头止盈={self.sell_long_orders}, 空头开仓={self.sell_short_orders}, 空头止盈={self.buy_short_orders}")
 
@@ -2584,10 +2882,14 @@ class GridTradingBot:
         # 启动挂单监控任务
         # asyncio.create_task(self.monitor_orders())
         # 启动 listenKey 更新任务
-        asyncio.create_task(self.keep_listen_key_alive())
+        if not self.external_streams:
+            asyncio.create_task(self.keep_listen_key_alive())
         asyncio.create_task(self.status_log_loop())
         asyncio.create_task(self.risk_engine.config_watch_loop())
 
+        if self.external_streams:
+            # 行情与用户数据由运行时共享连接投递
+            await self.shutdown_event.wait()
         while not self.shutdown_event.is_set():
             try:
                 await self.connect_websocket()
@@ -2597,24 +2899,75 @@ class GridTradingBot:
                 logger.error(f"WebSocket 连接失败: {e}")
                 await asyncio.sleep(5)  # 等待 5 秒后重试
 
+        # 退出流程中的撤单/平仓在线程池中执行，等待其完成后再返回
+        if getattr(self, "_shutting_down", False):
+            try:
+                await asyncio.wait_for(self._shutdown_done.wait(), timeout=120.0)
+            except Exception:
+                pass
+        if ws_api is not None and not self.external_streams:
+            await ws_api.close()
+        self.rest.close(wait=False)
+
     async def connect_websocket(self):
-        """连接 WebSocket 并订阅 ticker 和持仓数据"""
+        """连接 WebSocket 并订阅 ticker 和持仓数据；配置热备时同时保持多条连接，直到退出"""
+        if WS_STREAM_CONNECTIONS <= 1:
+            await self._ws_session(0)
+            return
+        links = [asyncio.create_task(self._ws_link_loop(i)) for i in range(WS_STREAM_CONNECTIONS)]
+        try:
+            await self.shutdown_event.wait()
+        finally:
+            for t in links:
+                t.cancel()
+            await asyncio.gather(*links, return_exceptions=True)
+
+    async def _ws_link_loop(self, link: int):
+        """热备连接之一：断线后独立退避重连，其余连接照常接收"""
+        backoff = 1.0
+        while not self.shutdown_event.is_set():
+            t0 = time.time()
+            reason = "连接关闭"
+            try:
+                await self._ws_session(link)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                reason = e
+            if self.shutdown_event.is_set():
+                break
+            if time.time() - t0 >= 60.0:
+                backoff = 1.0
+            logger.warning(f"WebSocket 连接 #{link} 断开（其余在线 {len(self._ws_links)} 条），{backoff:.0f}s 后重连: {reason}")
+            await asyncio.sleep(backoff)
+            backoff = min(30.0, backoff * 2.0)
+
+    async def _ws_session(self, link: int):
+        """单条连接：订阅行情与用户数据，逐帧解析后分发，断开时返回"""
         async with websockets.connect(self.websocket_url) as websocket:
-            self._ws = websocket
+            # 其它连接一直在线时事件没有缺口，不必全量对账
+            gap = not self._ws_links
+            self._ws_links[link] = websocket
+            dedup = self.ws_dedup
             try:
-                await self.subscribe_ticker(websocket)
+                if not self._market_hub_live:
+                    await self.subscribe_ticker(websocket)
                 await self.subscribe_orders(websocket)
+                if gap:
+                    # 重连期间可能丢失订单事件，标记挂单簿待对账
+                    self.order_store.stale = True
+                    self.eval_band.mark_dirty()
                 while not self.shutdown_event.is_set():
                     try:
                         message = await websocket.recv()
                         self._last_ws_msg_ts = time.time()
-                        data = json.loads(message)
-                        if data.get("e") == "bookTicker":
-                            await self.handle_ticker_update(message)
-                        elif data.get("e") == "ORDER_TRADE_UPDATE":
-                            await self.handle_order_update(message)
-                        elif data.get("e") == "ALGO_UPDATE":
-                            await self.handle_algo_update(message)
+                        # 每帧只解析一次，之后各处理函数直接使用类型化事件
+                        ev = decode_frame(message)
+                        if ev is None:
+                            continue
+                        if dedup is not None and not dedup.accept(link, ev):
+                            continue
+                        await self.dispatch_event(ev)
                     except json.JSONDecodeError as e:
                         if self.shutdown_event.is_set():
                             break
@@ -2632,7 +2985,65 @@ class GridTradingBot:
                         logger.error(f"WebSocket 消息处理失败: {e}")
                         continue
             finally:
-                self._ws = None
+                self._ws_links.pop(link, None)
+                self._direct_ticker_wss.discard(websocket)
+
+    async def dispatch_event(self, ev):
+        """接收已解析的 WebSocket 事件：行情直接覆盖，用户数据进入高优先级道"""
+        if isinstance(ev, BookTicker):
+            await self.handle_ticker_update(ev)
+            return
+        # 用户数据事件由独立任务按到达顺序处理，接收循环不等待锁和 REST
+        self._user_lanes_idle.clear()
+        self.event_lanes.put("algo" if isinstance(ev, AlgoUpdate) else "user", ev)
+
+    def client_id_prefix(self) -> str:
+        try:
+            return self.risk_engine.get_strategy_config().order_client_id_prefix
+        except Exception:
+            return "AF"
+
+    def owns_order_event(self, o: dict) -> bool:
+        """共享用户数据流时判断订单/条件单事件是否属于本实例"""
+        if not isinstance(o, dict):
+            return False
+        oid = o.get("i")
+        if oid is not None and self.order_store.get(oid) is not None:
+            return True
+        aid = o.get("aid")
+        if aid is not None and self.order_store.get(f"algo:{aid}") is not None:
+            return True
+        cid = str(o.get("c") or o.get("caid") or "").strip()
+        if not cid:
+            return False
+        if self.order_store.by_client_id(cid) is not None:
+            return True
+        return cid.startswith(self.client_id_prefix())
+
+    def _new_client_order_id(self) -> str:
+        # 未指定时也带实例前缀，共享用户数据流可按前缀路由
+        return f"{self.client_id_prefix()}{uuid.uuid4().hex[:24]}"[:36]
+
+    async def user_event_loop(self):
+        while not self.shutdown_event.is_set():
+            try:
+                _, ev, enqueued_ts = await self.event_lanes.get(USER_EVENT_LANES)
+            except asyncio.CancelledError:
+                break
+            try:
+                if isinstance(ev, OrderUpdate):
+                    await self.handle_order_update(ev, enqueued_ts)
+                elif isinstance(ev, AlgoUpdate):
+                    await self.handle_algo_update(ev)
+                elif isinstance(ev, AccountUpdate):
+                    await self.handle_account_update(ev)
+            except Exception as e:
+                if self.shutdown_event.is_set():
+                    break
+                logger.error(f"用户数据事件处理失败: {e}")
+            finally:
+                if self.event_lanes.pending(USER_EVENT_LANES) == 0:
+                    self._user_lanes_idle.set()
 
     async def subscribe_ticker(self, websocket):
         """订阅 ticker 数据"""
@@ -2642,8 +3053,74 @@ class GridTradingBot:
             "id": 1
         }
         await websocket.send(json.dumps(payload))
+        self._direct_ticker_wss.add(websocket)
         logger.info(f"已发送 ticker 订阅请求: {payload}")
 
+    async def unsubscribe_ticker(self, websocket):
+        """取消直连 ticker 订阅（改由行情中心供价）"""
+        payload = {
+            "method": "UNSUBSCRIBE",
+            "params": [f"{self.coin_name.lower()}{self.contract_type.lower()}@bookTicker"],
+            "id": 2
+        }
+        await websocket.send(json.dumps(payload))
+        self._direct_ticker_wss.discard(websocket)
+        logger.info(f"已发送 ticker 退订请求: {payload}")
+
+    async def _set_direct_ticker(self, enabled: bool):
+        # 尚未连接时由 connect_websocket 按 _market_hub_live 决定是否直连订阅
+        for ws in list(self._ws_links.values()):
+            try:
+                if enabled and ws not in self._direct_ticker_wss:
+                    await self.subscribe_ticker(ws)
+                elif (not enabled) and ws in self._direct_ticker_wss:
+                    await self.unsubscribe_ticker(ws)
+            except Exception as e:
+                logger.warning(f"切换 ticker 来源失败: {e}")
+
+    async def market_hub_loop(self):
+        """从本地行情中心读取报价；中心不可用时回退为本进程直连订阅"""
+        host, port = self.market_hub_addr
+        symbol = f"{self.coin_name}{self.contract_type}".upper()
+        backoff = 1.0
+        while not self.shutdown_event.is_set():
+            writer = None
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=5.0)
+                writer.write(f"SUB {self.websocket_url} {symbol}\n".encode("utf-8"))
+                await writer.drain()
+                self._market_hub_live = True
+                backoff = 1.0
+                logger.info(f"已连接行情中心 {host}:{port}，订阅 {symbol}")
+                await self._set_direct_ticker(False)
+                while not self.shutdown_event.is_set():
+                    line = await asyncio.wait_for(reader.readline(), timeout=MARKET_HUB_STALE_SEC)
+                    if not line:
+                        break
+                    ev = parse_quote_line(line)
+                    if ev is None or ev.symbol != symbol:
+                        continue
+                    self._market_hub_quotes += 1
+                    await self.handle_ticker_update(ev)
+            except asyncio.CancelledError:
+                break
+            except asyncio.TimeoutError:
+                logger.warning(f"行情中心 {host}:{port} 超时无报价")
+            except Exception as e:
+                logger.warning(f"行情中心 {host}:{port} 不可用: {e}")
+            finally:
+                self._market_hub_live = False
+                if writer is not None:
+                    try:
+                        writer.close()
+                    except Exception:
+                        pass
+            if self.shutdown_event.is_set():
+                break
+            await self._set_direct_ticker(True)
+            await asyncio.sleep(backoff)
+            backoff = min(30.0, backoff * 2.0)
+
     async def subscribe_orders(self, websocket):
         """订阅挂单数据"""
         if not self.listenKey:
@@ -2680,8 +3157,8 @@ class GridTradingBot:
         while not self.shutdown_event.is_set():
             try:
                 await asyncio.sleep(1800)  # 每 30 分钟更新一次
-                self.exchange.fapiPrivatePutListenKey()
-                self.listenKey = self.get_listen_key()  # 更新 self.listenKey
+                await self.rest.call("listen_key_keepalive", self.exchange.fapiPrivatePutListenKey)
+                self.listenKey = await self.rest.call("listen_key", self.get_listen_key)  # 更新 self.listenKey
                 logger.info(f"listenKey 已更新: {self.listenKey}")
             except Exception as e:
                 if self.shutdown_event.is_set():
@@ -2693,80 +3170,77 @@ class GridTradingBot:
         """生成 HMAC-SHA256 签名"""
         return hmac.new(self.api_secret.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).hexdigest()
 
-    async def handle_ticker_update(self, message):
-        current_time = time.time()
-        if current_time - self.last_ticker_update_time < 0.5:  # 100ms
-            return  # 跳过本次更新
-
-        self.last_ticker_update_time = current_time
-        """处理 ticker 更新"""
-        data = json.loads(message)
-        if data.get("e") == "bookTicker":  # Binance 的 bookTicker 事件
-            best_bid_price = data.get("b")
-            best_ask_price = data.get("a")
-
-            # 校验字段是否存在且有效
-            if best_bid_price is None or best_ask_price is None:
-                logger.warning("bookTicker 消息中缺少最佳买价或最佳卖价")
-                return
-
-            try:
-                self.best_bid_price = float(best_bid_price)  # 最佳买价
-                self.best_ask_price = float(best_ask_price)  # 最佳卖价
-                self.latest_price = (self.best_bid_price + self.best_ask_price) / 2  # 最新价格
-                # logger.info(
-                #     f"最新价格: {self.latest_price}, 最佳买价: {self.best_bid_price}, 最佳卖价: {self.best_ask_price}")
-            except ValueError as e:
-                logger.error(f"解析价格失败: {e}")
-
-            # 检查持仓状态是否过时
-            if time.time() - self.last_position_update_time > float(self.rest_sync_interval_sec or 0.0):
-                if self._rest_allowed():
-                    try:
-                        self.long_position, self.short_position = self.get_position()
-                        self.last_position_update_time = time.time()
-                        self._rest_backoff_sec = 0.0
-                        logger.info(f"同步 position: 多头 {self.long_position} 张, 空头 {self.short_position} 张 @ ticker")
-                    except Exception as e:
-                        self.last_position_update_time = time.time()
-                        self._note_rest_error(e, "pos_sync")
-
-            # 检查持仓状态是否过时
-            if time.time() - self.last_orders_update_time > float(self.rest_sync_interval_sec or 0.0):
-                if self._rest_allowed():
-                    try:
-                        self.check_orders_status()
-                        self.last_orders_update_time = time.time()
-                        self._rest_backoff_sec = 0.0
-                        logger.info(f"同步 orders: 多头买单 {self.buy_long_orders} 张, 多头卖单 {self.sell_long_orders} 张,空头卖单 {self.sell_short_orders} 张, 空头买单 {self.buy_short_orders} 张 @ ticker")
-                    except Exception as e:
-                        self.last_orders_update_time = time.time()
-                        self._note_rest_error(e, "orders_sync")
-
-            await self.maybe_update_trailing_stop()
-            await self.maybe_trigger_take_profit()
-            await self.maybe_trigger_hard_stoploss()
-            await self.adjust_grid_strategy()
+    async def handle_ticker_update(self, ev: BookTicker):
+        """处理 ticker 更新（Binance bookTicker，已由 decode_frame 解析）"""
+        if ev.bid <= 0 or ev.ask <= 0:
+            logger.warning("bookTicker 消息中缺少最佳买价或最佳卖价")
+            return
+        # 每笔报价都覆盖最新值，不再按时间丢弃
+        self.last_ticker_update_time = time.time()
+        self.best_bid_price = ev.bid  # 最佳买价
+        self.best_ask_price = ev.ask  # 最佳卖价
+        self.latest_price = (self.best_bid_price + self.best_ask_price) / 2  # 最新价格
+        self._quote_seq += 1
+        # logger.info(
+        #     f"最新价格: {self.latest_price}, 最佳买价: {self.best_bid_price}, 最佳卖价: {self.best_ask_price}")
+
+        # 策略评估（含 REST 同步）由 ticker_consumer_loop 处理，接收循环立即返回
+        self.event_lanes.put("market", self._quote_seq)
+
+    async def _maybe_rest_sync(self):
+        # 检查持仓状态是否过时
+        if time.time() - self.last_position_update_time > float(self.rest_sync_interval_sec or 0.0):
+            if self._rest_allowed():
+                try:
+                    await self.rest.call("fetch_positions", self._reconcile_positions_rest)
+                    self.last_position_update_time = time.time()
+                    self._rest_backoff_sec = 0.0
+                except Exception as e:
+                    self.last_position_update_time = time.time()
+                    self._note_rest_error(e, "pos_sync")
 
-    async def handle_order_update(self, message):
+        # 挂单簿由 WS 事件维护，REST 只在断档或到达审计间隔时全量对账
+        audit_itv = max(float(self.rest_sync_interval_sec or 0.0), float(self.risk_engine.get_strategy_config().order_audit_interval_sec or 0.0))
+        if self.order_store.stale or (time.time() - self.last_orders_update_time > audit_itv):
+            if self._rest_allowed():
+                try:
+                    await self.rest.call("fetch_open_orders", self.check_orders_status)
+                    self.last_orders_update_time = time.time()
+                    self._rest_backoff_sec = 0.0
+                    logger.info(f"同步 orders: 多头买单 {self.buy_long_orders} 张, 多头卖单 {self.sell_long_orders} 张,空头卖单 {self.sell_short_orders} 张, 空头买单 {self.buy_short_orders} 张 @ ticker")
+                except Exception as e:
+                    self.last_orders_update_time = time.time()
+                    self._note_rest_error(e, "orders_sync")
+        band = self.eval_band
+        band.deadline(float(self.last_position_update_time or 0.0) + float(self.rest_sync_interval_sec or 0.0))
+        band.deadline(float(self.last_orders_update_time or 0.0) + audit_itv)
+        if self.order_store.stale:
+            band.veto()
+
+    async def handle_account_update(self, ev: AccountUpdate):
+        async with self.lock.section("account_update"):
+            if self.position_book.apply_account_update(ev.data):
+                self._state_seq += 1
+                self.eval_band.mark_dirty()
+                self._sync_positions_from_book()
+
+    async def handle_order_update(self, ev: OrderUpdate, enqueued_ts: float = None):
         need_eval = False
         shutdown_reason = None
-        async with self.lock:
-            data = json.loads(message)
-            if data.get("e") != "ORDER_TRADE_UPDATE":
-                return
-
-            order = data.get("o", {})
-            symbol = order.get("s")
+        pending_hs = None
+        fire_tpl = None
+        async with self.lock.section("order_update"):
+            order = ev.o
+            symbol = ev.symbol
             if symbol != f"{self.coin_name}{self.contract_type}":
                 return
+            # 挂单簿变化（含外部撤单、过期）都可能需要重挂，作废免评估价格带
+            self.eval_band.mark_dirty()
 
             side = str(order.get("S") or "").strip().upper()
             position_side = str(order.get("ps") or "").strip().upper()
             status = order.get("X")
-            quantity = float(order.get("q", 0))
             filled = float(order.get("z", 0))
-            remaining = quantity - filled
             reduce_only_flag = _parse_env_bool(order.get("R"), False) or _parse_env_bool(order.get("reduceOnly"), False) or _parse_env_bool(order.get("reduce_only"), False)
             close_position = _parse_env_bool(order.get("cp"), False) or _parse_env_bool(order.get("closePosition"), False) or _parse_env_bool(order.get("close_position"), False)
             reduce_only = bool(reduce_only_flag or close_position)
@@ -2781,54 +3255,46 @@ class GridTradingBot:
             except Exception:
                 trade_sig = None
 
-            if status == "NEW":
-                if side == "BUY":
-                    if reduce_only:
-                        self.buy_short_orders += remaining
-                    else:
-                        self.buy_long_orders += remaining
-                elif side == "SELL":
-                    if reduce_only:
-                        self.sell_long_orders += remaining
-                    else:
-                        self.sell_short_orders += remaining
-            elif status == "FILLED":
+            self.order_store.apply_order_update(order, event_ts=int(self._safe_float(order.get("T")) or ev.event_ts or 0))
+            self._sync_order_counters_from_store()
+            if status == "FILLED":
                 self.total_fills += 1
-                if side == "BUY":
-                    if reduce_only:
-                        self.short_position = max(0.0, self.short_position - filled)
-                        self.buy_short_orders = max(0.0, self.buy_short_orders - filled)
-                    else:
+                if not reduce_only:
+                    if side == "BUY":
                         self.buy_fills += 1
-                        self.long_position += filled
-                        self.buy_long_orders = max(0.0, self.buy_long_orders - filled)
-                elif side == "SELL":
-                    if reduce_only:
-                        self.long_position = max(0.0, self.long_position - filled)
-                        self.sell_long_orders = max(0.0, self.sell_long_orders - filled)
-                    else:
+                    elif side == "SELL":
                         self.sell_fills += 1
-                        self.short_position += filled
-                        self.sell_short_orders = max(0.0, self.sell_short_orders - filled)
-            elif status == "CANCELED":
-                if side == "BUY":
-                    if reduce_only:
-                        self.buy_short_orders = max(0.0, self.buy_short_orders - quantity)
-                    else:
-                        self.buy_long_orders = max(0.0, self.buy_long_orders - quantity)
-                elif side == "SELL":
-                    if reduce_only:
-                        self.sell_long_orders = max(0.0, self.sell_long_orders - quantity)
+
+            if exec_type == "TRADE" and self._fill_requote_since is None:
+                self._fill_requote_since = float(enqueued_ts if enqueued_ts is not None else time.perf_counter())
+
+            if exec_type == "TRADE":
+                self._state_seq += 1
+                # 持仓按每笔成交量 l 增量更新本地持仓簿：按成交 id 去重，ACCOUNT_UPDATE 已覆盖的交易时间不再计入
+                last_qty = float(self._safe_float(order.get("l")) or 0.0)
+                if last_qty > 0 and side in {"BUY", "SELL"}:
+                    if position_side in {"LONG", "SHORT"}:
+                        book_side = position_side.lower()
+                        opening = (side == "BUY") == (position_side == "LONG")
                     else:
-                        self.sell_short_orders = max(0.0, self.sell_short_orders - quantity)
+                        book_side = ("short" if side == "BUY" else "long") if reduce_only else ("long" if side == "BUY" else "short")
+                        opening = not reduce_only
+                    self.position_book.apply_fill(
+                        book_side,
+                        last_qty if opening else -last_qty,
+                        price=float(self._safe_float(order.get("L")) or 0.0),
+                        trade_ts=int(ev.trans_ts or self._safe_float(order.get("T")) or 0),
+                        trade_key=_fill_key(order),
+                    )
+                    self._sync_positions_from_book()
 
             try:
-                cfg = self.risk_engine.get_config() or {}
+                sc = self.risk_engine.get_strategy_config()
                 active_side = str(self.direction or "long").strip().lower()
                 if active_side not in {"long", "short"}:
                     active_side = "long"
-                pp = self._pending_entry_price(cfg)
-                if self._pending_entry_enabled(cfg) and pp is not None:
+                pp = self._pending_entry_price(sc)
+                if self._pending_entry_enabled(sc) and pp is not None:
                     expected_cid = self.risk_engine._pending_entry_client_id(active_side, float(pp))
                 else:
                     expected_cid = None
@@ -2837,7 +3303,7 @@ class GridTradingBot:
                     qty_for_stop = float(self._safe_float(order.get("z")) or filled or 0.0)
                     if qty_for_stop <= 0:
                         qty_for_stop = float(self._safe_float(order.get("q")) or 0.0)
-                    self._ensure_pending_entry_hardstop_locked(cfg, active_side, float(pp), float(qty_for_stop))
+                    pending_hs = (sc, active_side, float(pp), float(qty_for_stop))
             except Exception:
                 pass
 
@@ -2881,7 +3347,12 @@ class GridTradingBot:
             if status == "FILLED" and exec_type == "TRADE":
                 filled_side = "long" if str(anchor_ps) == "LONG" else "short"
                 self._set_grid_action_bypass(filled_side, window_sec=2.0)
-                self._force_orders_resync = True
+                tpl = self._fill_templates.pop(str(order.get("i")), None)
+                if tpl is not None and self._fill_template_ready_locked(tpl, filled_side, fill_price):
+                    # 锁内只确认模板可用，下单在释放状态锁后发出
+                    fire_tpl = (tpl, filled_side)
+                else:
+                    self._force_orders_resync = True
 
             if status in {"FILLED", "PARTIALLY_FILLED", "EXPIRED"}:
                 if status == "PARTIALLY_FILLED":
@@ -2916,6 +3387,21 @@ class GridTradingBot:
                     self._update_anchor_after_fill(anchor_ps, float(fill_price or 0.0))
                 need_eval = True
 
+        if fire_tpl is not None:
+            # 释放状态锁后立即计数（中间没有 await）：发送期间开始的网格评估不重挂，发送完成后的补评估再对账
+            self._fill_fast_inflight += 1
+            try:
+                if not await self._send_fill_template(fire_tpl[0], fire_tpl[1], enqueued_ts):
+                    self._force_orders_resync = True
+            finally:
+                self._fill_fast_inflight -= 1
+        if pending_hs is not None:
+            try:
+                async with self._io_lock:
+                    await self.rest.call("pending_hardstop", self._ensure_pending_entry_hardstop, *pending_hs)
+            except Exception:
+                pass
+
         if shutdown_reason and (not self.shutdown_event.is_set()):
             try:
                 await self.shutdown(shutdown_reason)
@@ -2951,16 +3437,15 @@ class GridTradingBot:
             pos = None
         if pos is None:
             try:
-                snap = self.get_position_snapshot()
-                pos = float(((snap.get(s) or {}).get("amt") or 0.0))
+                pos = self.position_book.amount(s)
             except Exception:
                 pos = None
         if pos is None:
             return
         if float(pos or 0.0) > 0:
             try:
-                snap = self.get_position_snapshot()
-                pos2 = float(((snap.get(s) or {}).get("amt") or 0.0))
+                await self.rest.call("fetch_positions", self._reconcile_positions_rest)
+                pos2 = self.position_book.amount(s)
                 if float(pos2 or 0.0) > 0:
                     return
             except Exception:
@@ -2970,15 +3455,13 @@ class GridTradingBot:
         except Exception:
             pass
 
-    async def handle_algo_update(self, message):
-        async with self.lock:
-            data = json.loads(message)
-            if data.get("e") != "ALGO_UPDATE":
-                return
-            order = data.get("o") or {}
-            symbol = str(order.get("s") or "").strip().upper()
-            if symbol != f"{self.coin_name}{self.contract_type}":
+    async def handle_algo_update(self, ev: AlgoUpdate):
+        async with self.lock.section("algo_update"):
+            order = ev.o
+            if ev.symbol != f"{self.coin_name}{self.contract_type}":
                 return
+            self.order_store.apply_algo_update(order, event_ts=int(ev.trans_ts or ev.event_ts or 0))
+            self.eval_band.mark_dirty()
             ot = str(order.get("o") or "").strip().upper()
             if ("STOP" not in ot) and ("TAKE_PROFIT" not in ot) and ("TRAILING" not in ot):
                 return
@@ -2999,31 +3482,103 @@ class GridTradingBot:
         if not self.shutdown_event.is_set():
             asyncio.create_task(self._maybe_shutdown_after_algo_event(closed_side, reason))
 
-    def _kick_risk_eval(self):
+    def _kick_risk_eval(self, rest_sync: bool = False):
+        if self.shutdown_event.is_set():
+            return
         task = getattr(self, "_order_event_eval_task", None)
         if task is not None and (not task.done()):
+            # 评估进行中：合并为一次补评估，结束后用最新价格再跑一轮
+            self._risk_eval_pending = True
+            self._risk_eval_pending_rest_sync = bool(getattr(self, "_risk_eval_pending_rest_sync", False) or rest_sync)
             return
-        if self.shutdown_event.is_set():
-            return
-        self._order_event_eval_task = asyncio.create_task(self._order_event_eval())
+        self._order_event_eval_task = asyncio.create_task(self._risk_eval_loop(rest_sync))
+
+    async def _risk_eval_loop(self, rest_sync: bool = False):
+        while True:
+            self._risk_eval_pending = False
+            self._risk_eval_pending_rest_sync = False
+            await self._order_event_eval(rest_sync)
+            if self.shutdown_event.is_set() or (not bool(getattr(self, "_risk_eval_pending", False))):
+                return
+            rest_sync = bool(getattr(self, "_risk_eval_pending_rest_sync", False))
+
+    def _ticker_eval_min_interval(self) -> float:
+        return max(0.0, self.risk_engine.get_strategy_config().ticker_eval_min_interval_sec)
+
+    async def ticker_consumer_loop(self):
+        """行情邮箱消费者：接收循环只覆盖最新报价，这里按最大频率处理最新一笔。"""
+        while not self.shutdown_event.is_set():
+            try:
+                await asyncio.wait_for(self.event_lanes.get(("market",)), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            except asyncio.CancelledError:
+                break
+            if self.eval_band.contains(self.best_bid_price, self.best_ask_price, time.time()):
+                # 报价仍在上次评估算出的价格带内，且其后没有成交/账户/配置事件：决策不会变化
+                continue
+            wait = self._ticker_eval_min_interval() - (time.time() - float(self._last_ticker_eval_ts or 0.0))
+            if wait > 0:
+                # 限频期间到达的报价直接覆盖，醒来后评估的仍是最新价格
+                await asyncio.sleep(wait)
+            self.event_lanes.get_nowait(("market",))
+            # 行情道优先级最低：先让已排队的成交/条件单事件处理完
+            try:
+                await asyncio.wait_for(self._user_lanes_idle.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+            if self.shutdown_event.is_set():
+                break
+            self._last_ticker_eval_ts = time.time()
+            self._kick_risk_eval(rest_sync=True)
+            task = getattr(self, "_order_event_eval_task", None)
+            if task is not None:
+                try:
+                    await task
+                except Exception:
+                    pass
 
-    async def _order_event_eval(self):
+    async def _order_event_eval(self, rest_sync: bool = False):
+        self._eval_quote_seq = self._quote_seq
+        band = self.eval_band
+        band.begin()
+        if rest_sync:
+            try:
+                await self._maybe_rest_sync()
+            except Exception:
+                band.veto()
+        else:
+            # 未做 REST 同步的评估不知道下次同步时间，不启用价格带
+            band.veto()
         try:
             await self.maybe_update_trailing_stop()
         except Exception:
-            pass
+            band.veto()
         try:
             await self.maybe_trigger_take_profit()
         except Exception:
-            pass
+            band.veto()
         try:
             await self.maybe_trigger_hard_stoploss()
         except Exception:
-            pass
+            band.veto()
         try:
             await self.adjust_grid_strategy()
         except Exception:
-            pass
+            band.veto()
+        self._commit_eval_band()
+
+    def _commit_eval_band(self):
+        """各评估器已登记约束；补上杠杆/保证金重试时间后启用价格带"""
+        band = self.eval_band
+        sc = self.risk_engine.get_strategy_config()
+        if not sc.eval_band_enabled or self.shutdown_event.is_set():
+            band.veto()
+        if sc.leverage is not None and int(getattr(self, "_applied_leverage", 0) or 0) != sc.leverage:
+            band.deadline(getattr(self, "_leverage_backoff_until_ts", 0.0))
+        if str(getattr(self, "_applied_margin_mode", "") or "").strip().lower() != sc.margin_mode:
+            band.deadline(getattr(self, "_margin_mode_backoff_until_ts", 0.0))
+        band.commit(time.time(), sc.eval_band_max_sec)
 
     async def maybe_trigger_take_profit(self):
         if self.shutdown_event.is_set():
@@ -3031,17 +3586,21 @@ class GridTradingBot:
         if bool(getattr(self, "is_grid_stopped", False)):
             return
 
-        cfg = self.risk_engine.get_config()
+        sc = self.risk_engine.get_strategy_config()
         self._apply_runtime_settings_from_config()
-        if not bool(cfg.get("TAKE_PROFIT_ENABLED", False)):
+        if not sc.take_profit_enabled:
             return
-        tp_price = self._safe_float(cfg.get("TAKE_PROFIT_PRICE", 0.0))
-        if tp_price is None or float(tp_price) <= 0:
+        tp_price = sc.take_profit_price
+        if tp_price <= 0:
             return
 
         side = str(self.direction or "long").strip().lower()
         if side not in {"long", "short"}:
             side = "long"
+        if side == "long":
+            self.eval_band.above(tp_price)
+        else:
+            self.eval_band.below(tp_price)
 
         if side == "long":
             px = self._safe_float(getattr(self, "best_bid_price", None))
@@ -3069,21 +3628,9 @@ class GridTradingBot:
 
         logger.info(f"【自定义止盈触发】side={side} price={current_price:.6f} tp_price={tp_price:.6f}")
 
-        async with self.lock:
-            try:
-                self.cancel_all_open_orders()
-            except Exception:
-                pass
-            try:
-                self._cancel_stop_orders_for_side("long")
-            except Exception:
-                pass
-            try:
-                self._cancel_stop_orders_for_side("short")
-            except Exception:
-                pass
+        async with self._io_lock:
             try:
-                self.flatten_all_positions_market()
+                await self.rest.call("take_profit_close", self._take_profit_close_all)
             except Exception:
                 pass
 
@@ -3092,84 +3639,73 @@ class GridTradingBot:
         except Exception:
             pass
 
+    def _take_profit_close_all(self):
+        try:
+            self.cancel_all_open_orders()
+        except Exception:
+            pass
+        try:
+            self._cancel_stop_orders_for_side("long")
+        except Exception:
+            pass
+        try:
+            self._cancel_stop_orders_for_side("short")
+        except Exception:
+            pass
+        try:
+            self.flatten_all_positions_market()
+        except Exception:
+            pass
+
     def cancel_orders_for_side(self, position_side):
         """撤销某个方向的所有挂单"""
-        orders = self._get_open_orders_cached(max_age_sec=0.0)
-
-        if len(orders) == 0:
-            logger.info("没有找到挂单")
-        else:
-            try:
-                for order in orders:
-                    try:
-                        if self._is_stop_order(order):
-                            continue
-                        side = str(order.get('side') or '').strip().lower()
-                        if side not in {"buy", "sell"}:
-                            continue
-                        reduce_only = self._get_order_reduce_only(order)
-                        ps = self._get_order_position_side(order)
-                        if bool(getattr(self, "_hedge_mode", False)):
-                            if position_side == "long" and ps not in {"LONG"}:
-                                continue
-                            if position_side == "short" and ps not in {"SHORT"}:
-                                continue
-
-                        if position_side == 'long':
-                            if (not reduce_only) and side == 'buy':
-                                self.cancel_order(order['id'])
-                            elif reduce_only and side == 'sell':
-                                self.cancel_order(order['id'])
-                        elif position_side == 'short':
-                            if (not reduce_only) and side == 'sell':
-                                self.cancel_order(order['id'])
-                            elif reduce_only and side == 'buy':
-                                self.cancel_order(order['id'])
-                    except Exception:
-                        continue
-            except ccxt.OrderNotFound as e:
-                logger.warning(f"订单 {order['id']} 不存在，无需撤销: {e}")
-                self.check_orders_status()  # 强制更新挂单状态
-            except Exception as e:
-                logger.error(f"撤单失败: {e}")
-            finally:
-                self._refresh_open_orders_cache()
+        self.cancel_grid_orders_for_side(position_side, cancel_add=True, cancel_tp=True)
 
     def cancel_grid_orders_for_side(self, position_side: str, cancel_add: bool = True, cancel_tp: bool = True):
-        orders = self._get_open_orders_cached(max_age_sec=0.0)
-        if not orders:
+        try:
+            self._ensure_order_store_synced()
+        except Exception:
+            pass
+        ps_target = str(position_side or "").strip().lower()
+        if ps_target not in {"long", "short"}:
             return
+        self.cancel_orders_batch(self._grid_order_ids_for_side(ps_target, cancel_add, cancel_tp))
+
+    def _grid_order_ids_for_side(self, position_side: str, include_add: bool = True, include_tp: bool = True) -> list:
         ps_target = str(position_side or "").strip().lower()
-        for order in orders:
-            try:
-                if self._is_stop_order(order):
-                    continue
-                info = (order or {}).get("info") or {}
-                o_side = str((order or {}).get("side") or info.get("side") or info.get("S") or "").strip().lower()
-                if o_side not in {"buy", "sell"}:
-                    continue
-                reduce_only = self._get_order_reduce_only(order)
-                ps = self._get_order_position_side(order)
-                if bool(getattr(self, "_hedge_mode", False)):
-                    if ps_target == "long" and ps not in {"LONG"}:
-                        continue
-                    if ps_target == "short" and ps not in {"SHORT"}:
-                        continue
-                is_add = (not reduce_only) and ((ps_target == "long" and o_side == "buy") or (ps_target == "short" and o_side == "sell"))
-                is_tp = reduce_only and ((ps_target == "long" and o_side == "sell") or (ps_target == "short" and o_side == "buy"))
-                if (is_add and cancel_add) or (is_tp and cancel_tp):
-                    oid = order.get("id")
-                    if oid:
-                        self.cancel_order(oid)
-            except Exception:
+        if ps_target not in {"long", "short"}:
+            return []
+        add_side = "buy" if ps_target == "long" else "sell"
+        tp_side = "sell" if ps_target == "long" else "buy"
+        required_ps = None
+        if bool(getattr(self, "_hedge_mode", False)):
+            required_ps = "LONG" if ps_target == "long" else "SHORT"
+        out = []
+        for rec in self.order_store.grid_orders():
+            if required_ps is not None and rec.position_side != required_ps:
                 continue
-        self._refresh_open_orders_cache()
+            is_add = (not rec.reduce_only) and rec.side == add_side
+            is_tp = rec.reduce_only and rec.side == tp_side
+            if (is_add and include_add) or (is_tp and include_tp):
+                out.append(rec.order_id)
+        return out
 
     def cancel_order(self, order_id):
         """撤单"""
         try:
-            self.exchange.cancel_order(order_id, self.ccxt_symbol)
+            done = None
+            if str(order_id or "").isdigit():
+                done = self._ws_api_call("order.cancel", {"symbol": self._raw_market_id(), "orderId": int(order_id)})
+            if done is None:
+                self.exchange.cancel_order(order_id, self.ccxt_symbol)
+            self.order_store.remove(order_id)
+            self._sync_order_counters_from_store()
             # logger.info(f"撤销挂单成功, 订单ID: {order_id}")
+        except ccxt.OrderNotFound as e:
+            # 交易所已无此单（已成交或已撤），本地挂单簿同步移除
+            self.order_store.remove(order_id)
+            self._sync_order_counters_from_store()
+            logger.warning(f"订单 {order_id} 不存在，无需撤销: {e}")
         except ccxt.BaseError as e:
             logger.error(f"撤单失败: {e}")
 
@@ -3178,10 +3714,10 @@ class GridTradingBot:
         try:
             if quantity is None:
                 return None
-            price = round(price, self.price_precision) if price is not None else None
+            price = self.market_spec.round_price(price) if price is not None else None
 
             # 修正数量精度并确保不低于最小下单数量
-            quantity = round(quantity, self.amount_precision)
+            quantity = self.market_spec.round_qty(quantity)
             if float(quantity or 0.0) <= 0:
                 return None
             min_amt = float(self.min_order_amount or 0.0)
@@ -3191,7 +3727,7 @@ class GridTradingBot:
             # 如果是市价单，不需要价格参数
             if order_type == 'market':
                 params = {
-                    'newClientOrderId': str(client_order_id or uuid.uuid4()),
+                    'newClientOrderId': str(client_order_id or self._new_client_order_id()),
                 }
                 if bool(is_reduce_only) and (not bool(getattr(self, "_hedge_mode", False))):
                     params["reduceOnly"] = True
@@ -3204,100 +3740,405 @@ class GridTradingBot:
                 if price is None:
                     logger.error("限价单必须提供 price 参数")
                     return None
-
-                maker_only = self._maker_only_enabled()
-                try:
-                    cfg = self.risk_engine.get_config() or {}
-                except Exception:
-                    cfg = {}
-                tp_maker_only = self._safe_bool((cfg or {}).get("TP_MAKER_ONLY"), False)
-                maker_only_limit = bool(maker_only) and (not bool(is_reduce_only))
-                maker_only_tp = False
-                if bool(is_reduce_only) and order_type == "limit" and bool(tp_maker_only):
-                    bid = self._safe_float(getattr(self, "best_bid_price", None)) or 0.0
-                    ask = self._safe_float(getattr(self, "best_ask_price", None)) or 0.0
-                    s2 = str(side or "").strip().lower()
-                    p2 = self._safe_float(price) or 0.0
-                    marketable = False
-                    if s2 == "sell":
-                        marketable = (bid > 0 and p2 > 0 and p2 <= bid)
-                    elif s2 == "buy":
-                        marketable = (ask > 0 and p2 > 0 and p2 >= ask)
-                    maker_only_tp = (not marketable)
-                if maker_only_limit or maker_only_tp:
-                    price_po = self._post_only_price(side, price)
-                    if price_po is None:
-                        return None
-                    price = price_po
-
-
-                if (not bool(is_reduce_only)) and position_side is not None:
-                    desired_ps = str(position_side).strip().upper()
-                    if desired_ps in {"LONG", "SHORT"}:
-                        pass
-                    else:
-                        desired_ps = str(position_side).strip().lower()
-                        if desired_ps in {"long", "short"}:
-                            desired_ps = desired_ps.upper()
-                        else:
-                            desired_ps = None
-                    if desired_ps in {"LONG", "SHORT"} and self._has_duplicate_add_order(side, price, desired_ps):
-                        logger.info(
-                            f"已存在相同方向/仓位方向/价格的补仓单，跳过挂单: {side} {desired_ps} @ {price}"
-                        )
-                        return None
-
-                params = {
-                    'newClientOrderId': str(client_order_id or uuid.uuid4()),
-                }
-                if bool(is_reduce_only) and (not bool(getattr(self, "_hedge_mode", False))):
-                    params["reduceOnly"] = True
-                if bool(getattr(self, "_hedge_mode", False)) and position_side is not None:
-                    params['positionSide'] = str(position_side).strip().upper()
-                if maker_only_limit or maker_only_tp:
-                    params["timeInForce"] = "GTX"
-                try:
-                    order = self.exchange.create_order(self.ccxt_symbol, 'limit', side, quantity, price, params)
-                    return order
-                except ccxt.BaseError as e:
-                    if maker_only_limit or maker_only_tp:
-                        msg = str(e).lower()
-                        if ("5022" in msg) or ("post" in msg and "only" in msg) or ("immediately match" in msg):
-                            ps = str(position_side or "").strip().lower()
-                            if ps in {"long", "short"}:
-                                self._mark_postonly_reject(ps)
-                            if maker_only_tp:
-                                try:
-                                    params2 = {"newClientOrderId": params.get("newClientOrderId")}
-                                    if bool(is_reduce_only) and (not bool(getattr(self, "_hedge_mode", False))):
-                                        params2["reduceOnly"] = True
-                                    if bool(getattr(self, "_hedge_mode", False)) and position_side is not None:
-                                        params2["positionSide"] = str(position_side).strip().upper()
-                                    return self.exchange.create_order(self.ccxt_symbol, 'limit', side, quantity, price, params2)
-                                except Exception:
-                                    return None
-                            return None
-                    raise e
+                leg = self._prepare_limit_order(side, price, quantity, is_reduce_only, position_side, client_order_id)
+                if leg is None:
+                    return None
+                return self._send_prepared_order(leg)
 
         except ccxt.BaseError as e:
             logger.error(f"下单报错: {e}")
             return None
 
-    def _pending_entry_enabled(self, cfg: dict) -> bool:
+    def _prepare_limit_order(self, side, price, quantity, is_reduce_only=False, position_side=None, client_order_id=None):
+        """整理限价单：精度、只做 Maker 价格、重复补仓检查；不应下单时返回 None"""
+        if quantity is None or price is None:
+            return None
+        spec = self.market_spec
+        lots = spec.qty_to_lots(quantity)
+        if lots <= 0:
+            return None
+        quantity = spec.lots_to_qty(lots)
+        price = spec.round_price(price)
+        min_amt = float(self.min_order_amount or 0.0)
+        if min_amt > 0 and float(quantity) < min_amt:
+            return None
+
+        sc = self.risk_engine.get_strategy_config()
+        maker_only = bool(sc.maker_only)
+        tp_maker_only = bool(sc.tp_maker_only)
+        maker_only_limit = bool(maker_only) and (not bool(is_reduce_only))
+        maker_only_tp = False
+        if bool(is_reduce_only) and bool(tp_maker_only):
+            bid = self._safe_float(getattr(self, "best_bid_price", None)) or 0.0
+            ask = self._safe_float(getattr(self, "best_ask_price", None)) or 0.0
+            s2 = str(side or "").strip().lower()
+            p2 = self._safe_float(price) or 0.0
+            marketable = False
+            if s2 == "sell":
+                marketable = (bid > 0 and p2 > 0 and p2 <= bid)
+            elif s2 == "buy":
+                marketable = (ask > 0 and p2 > 0 and p2 >= ask)
+            maker_only_tp = (not marketable)
+        if maker_only_limit or maker_only_tp:
+            price_po = self._post_only_price(side, price)
+            if price_po is None:
+                return None
+            price = price_po
+
+        if (not bool(is_reduce_only)) and position_side is not None:
+            desired_ps = str(position_side).strip().upper()
+            if desired_ps in {"LONG", "SHORT"}:
+                pass
+            else:
+                desired_ps = str(position_side).strip().lower()
+                if desired_ps in {"long", "short"}:
+                    desired_ps = desired_ps.upper()
+                else:
+                    desired_ps = None
+            if desired_ps in {"LONG", "SHORT"} and self._has_duplicate_add_order(side, price, desired_ps):
+                logger.info(
+                    f"已存在相同方向/仓位方向/价格的补仓单，跳过挂单: {side} {desired_ps} @ {price}"
+                )
+                return None
+
+        params = {
+            'newClientOrderId': str(client_order_id or self._new_client_order_id()),
+        }
+        if bool(is_reduce_only) and (not bool(getattr(self, "_hedge_mode", False))):
+            params["reduceOnly"] = True
+        if bool(getattr(self, "_hedge_mode", False)) and position_side is not None:
+            params['positionSide'] = str(position_side).strip().upper()
+        if maker_only_limit or maker_only_tp:
+            params["timeInForce"] = "GTX"
+        return {
+            "side": side,
+            "price": price,
+            "price_tick": spec.price_to_ticks(price),
+            "qty": quantity,
+            "lots": lots,
+            "params": params,
+            "reduce_only": bool(is_reduce_only),
+            "position_side": position_side,
+            "post_only": bool(maker_only_limit or maker_only_tp),
+            "maker_only_tp": bool(maker_only_tp),
+        }
+
+    def _send_prepared_order(self, leg: dict):
+        """发送 _prepare_limit_order 整理好的限价单，回执立即入挂单簿"""
         try:
-            return bool((cfg or {}).get("PENDING_ENTRY_ENABLED", False))
-        except Exception:
-            return False
+            try:
+                resp = self._ws_api_call("order.place", self._batch_leg_payload(self._raw_market_id(), leg))
+            except WsApiUnconfirmed as e:
+                return self._resolve_unconfirmed_place(leg, e)
+            if resp is not None:
+                order = self.exchange.parse_order(resp, self.exchange.market(self.ccxt_symbol))
+            else:
+                order = self.exchange.create_order(self.ccxt_symbol, 'limit', leg["side"], leg["qty"], leg["price"], leg["params"])
+            self._record_order_ack(order)
+            return order
+        except ccxt.BaseError as e:
+            if leg["post_only"] and self._is_postonly_reject(e):
+                return self._on_postonly_reject(leg)
+            raise e
+
+    def _resolve_unconfirmed_place(self, leg: dict, err):
+        """WS 下单已发出但无应答：按 client id 向交易所查询，确认没有该单才经 REST 重下。
 
-    def _pending_entry_price(self, cfg: dict):
+        查询失败时本笔跳过并标记挂单簿待对账，由下一轮网格对账决定是否补单。
+        """
+        cid = str(leg["params"]["newClientOrderId"])
+        resp = None
         try:
-            p = self._safe_float((cfg or {}).get("PENDING_ENTRY_PRICE", 0.0))
-            if p is None or float(p) <= 0:
+            resp = self.exchange.fapiPrivateGetOrder({"symbol": self._raw_market_id(), "origClientOrderId": cid})
+        except ccxt.OrderNotFound:
+            resp = None
+        except Exception as e:
+            if "-2013" not in str(e):
+                self.order_store.stale = True
+                logger.warning(f"WS 下单未确认且查询失败，本笔跳过待对账: {cid} {err} / {e}")
                 return None
-            return float(p)
+        if isinstance(resp, dict) and resp.get("orderId") is not None:
+            order = self.exchange.parse_order(resp, self.exchange.market(self.ccxt_symbol))
+            self._record_order_ack(order)
+            logger.info(f"WS 下单未确认，交易所已有该单: {cid} status={resp.get('status')}")
+            return order
+        logger.warning(f"WS 下单未确认，交易所无该单，改走 REST: {cid} {err}")
+        order = self.exchange.create_order(self.ccxt_symbol, 'limit', leg["side"], leg["qty"], leg["price"], leg["params"])
+        self._record_order_ack(order)
+        return order
+
+    def _ws_api_call(self, method: str, params: dict):
+        """经 WS 下单通道发送单笔请求；通道未启用或请求未发出时返回 None，由调用方改走 REST。
+
+        下单已发出但无应答时抛 WsApiUnconfirmed，由调用方先查询再决定是否重下；撤单/改单重发安全，照常返回 None。
+        交易所拒绝按 REST 的异常类型抛出（-2011/-2013 为 OrderNotFound），调用方的错误处理保持不变。
+        """
+        api = getattr(self.exchange, "ws_order_api", None)
+        if api is None:
+            return None
+        try:
+            return api.call(method, params)
+        except WsApiUnconfirmed as e:
+            if method == "order.place":
+                raise
+            now = time.time()
+            if now - self._ws_api_fallback_log_ts >= 60.0:
+                self._ws_api_fallback_log_ts = now
+                logger.warning(f"WS 下单通道无应答，改走 REST: {e}")
+            return None
+        except WsApiUnavailable as e:
+            now = time.time()
+            if now - self._ws_api_fallback_log_ts >= 60.0:
+                self._ws_api_fallback_log_ts = now
+                logger.warning(f"WS 下单通道不可用，改走 REST: {e}")
+            return None
+        except WsApiError as e:
+            if str(e.code) in {"-2011", "-2013"}:
+                raise ccxt.OrderNotFound(str(e))
+            raise ccxt.ExchangeError(str(e))
+
+    def _is_postonly_reject(self, err) -> bool:
+        msg = str(err or "").lower()
+        return ("5022" in msg) or ("post" in msg and "only" in msg) or ("immediately match" in msg)
+
+    def _on_postonly_reject(self, leg: dict):
+        """只做 Maker 被拒：记录拒单；止盈单退回普通限价单重下一次"""
+        ps = str(leg.get("position_side") or "").strip().lower()
+        if ps in {"long", "short"}:
+            self._mark_postonly_reject(ps)
+        if not leg.get("maker_only_tp"):
+            return None
+        try:
+            params2 = {"newClientOrderId": leg["params"].get("newClientOrderId")}
+            if "reduceOnly" in leg["params"]:
+                params2["reduceOnly"] = True
+            if "positionSide" in leg["params"]:
+                params2["positionSide"] = leg["params"]["positionSide"]
+            order = self.exchange.create_order(self.ccxt_symbol, 'limit', leg["side"], leg["qty"], leg["price"], params2)
+            self._record_order_ack(order)
+            return order
         except Exception:
             return None
 
+    def _batch_orders_enabled(self) -> bool:
+        return bool(self.risk_engine.get_strategy_config().batch_orders_enabled)
+
+    def _batch_leg_payload(self, market_id: str, leg: dict) -> dict:
+        params = leg["params"]
+        item = {
+            "symbol": market_id,
+            "side": str(leg["side"]).upper(),
+            "type": "LIMIT",
+            "quantity": self.market_spec.format_lots(leg["lots"]),
+            "price": self.market_spec.format_ticks(leg["price_tick"]),
+            "timeInForce": str(params.get("timeInForce") or "GTC"),
+            "newClientOrderId": str(params["newClientOrderId"]),
+        }
+        if params.get("reduceOnly"):
+            item["reduceOnly"] = "true"
+        if params.get("positionSide"):
+            item["positionSide"] = str(params["positionSide"])
+        return item
+
+    def place_orders_batch(self, legs: list) -> list:
+        """批量限价下单（batchOrders 每批最多 5 笔）。
+
+        legs 为 place_order 的关键字参数；返回与 legs 对齐的 (client_id, 订单或 None)，
+        单笔失败只影响该笔，其余照常入挂单簿。
+        """
+        results = [(None, None)] * len(legs or [])
+        prepared = []
+        for i, leg in enumerate(legs or []):
+            p = self._prepare_limit_order(
+                leg.get("side"),
+                leg.get("price"),
+                leg.get("quantity"),
+                leg.get("is_reduce_only", False),
+                leg.get("position_side"),
+                leg.get("client_order_id"),
+            )
+            if p is not None:
+                prepared.append((i, p))
+        market_id = self._raw_market_id()
+        market = None
+        try:
+            market = self.exchange.market(self.ccxt_symbol)
+        except Exception:
+            market = None
+        for k in range(0, len(prepared), 5):
+            chunk = prepared[k:k + 5]
+            try:
+                resp = self.exchange.fapiPrivatePostBatchOrders(
+                    {"batchOrders": json.dumps([self._batch_leg_payload(market_id, p) for _, p in chunk], separators=(",", ":"))}
+                )
+            except Exception as e:
+                logger.error(f"批量下单失败: {e}")
+                for i, p in chunk:
+                    results[i] = (p["params"]["newClientOrderId"], None)
+                continue
+            resp = resp if isinstance(resp, list) else []
+            for j, (i, p) in enumerate(chunk):
+                cid = p["params"]["newClientOrderId"]
+                r = resp[j] if j < len(resp) else None
+                if isinstance(r, dict) and r.get("orderId") is not None:
+                    order = self.exchange.parse_order(r, market)
+                    self._record_order_ack(order)
+                    results[i] = (cid, order)
+                    continue
+                code = (r or {}).get("code") if isinstance(r, dict) else None
+                msg = (r or {}).get("msg") if isinstance(r, dict) else None
+                if p["post_only"] and self._is_postonly_reject(f"{code} {msg}"):
+                    results[i] = (cid, self._on_postonly_reject(p))
+                    continue
+                logger.error(f"批量下单单笔失败 {cid}: {code} {msg}")
+                results[i] = (cid, None)
+        return results
+
+    def cancel_orders_batch(self, order_ids):
+        """批量撤单（batchOrders 每批最多 10 笔）；整批请求失败时退回逐笔撤单"""
+        ids = []
+        for oid in (order_ids or []):
+            if oid is None or str(oid) in ids:
+                continue
+            ids.append(str(oid))
+        if not ids:
+            return
+        if len(ids) == 1 or (not self._batch_orders_enabled()):
+            for oid in ids:
+                self.cancel_order(oid)
+            return
+        market_id = self._raw_market_id()
+        for k in range(0, len(ids), 10):
+            chunk = ids[k:k + 10]
+            try:
+                resp = self.exchange.fapiPrivateDeleteBatchOrders(
+                    {"symbol": market_id, "orderIdList": json.dumps([int(x) for x in chunk], separators=(",", ":"))}
+                )
+            except Exception as e:
+                logger.warning(f"批量撤单失败，改为逐笔撤单: {e}")
+                for oid in chunk:
+                    self.cancel_order(oid)
+                continue
+            resp = resp if isinstance(resp, list) else []
+            for j, oid in enumerate(chunk):
+                r = resp[j] if j < len(resp) else None
+                if isinstance(r, dict) and r.get("orderId") is not None:
+                    self.order_store.remove(oid)
+                    continue
+                code = r.get("code") if isinstance(r, dict) else None
+                if str(code) == "-2011":
+                    # 交易所已无此单（已成交或已撤），本地挂单簿同步移除
+                    self.order_store.remove(oid)
+                    continue
+                logger.error(f"批量撤单单笔失败 {oid}: {r}")
+            self._sync_order_counters_from_store()
+
+    def _amend_orders_enabled(self) -> bool:
+        return bool(self.risk_engine.get_strategy_config().amend_orders_enabled)
+
+    def amend_order(self, order_id, leg: dict) -> bool:
+        """改单（PUT /fapi/v1/order）：只改价格，数量沿用原单；成功返回 True，被拒时由调用方撤单重挂"""
+        rec = self.order_store.get(order_id)
+        if rec is None or rec.is_stop or rec.is_algo:
+            return False
+        p = self._prepare_limit_order(
+            leg.get("side"),
+            leg.get("price"),
+            rec.qty,
+            leg.get("is_reduce_only", False),
+            leg.get("position_side"),
+            rec.client_id,
+        )
+        if p is None:
+            return False
+        if int(p["price_tick"]) == int(rec.price_tick):
+            # 只做 Maker 修正后价格未变，原单保留
+            return True
+        t0 = time.perf_counter()
+        try:
+            req = {
+                "symbol": self._raw_market_id(),
+                "orderId": int(rec.order_id),
+                "side": str(p["side"]).upper(),
+                "quantity": self.market_spec.format_lots(p["lots"]),
+                "price": self.market_spec.format_ticks(p["price_tick"]),
+            }
+            resp = self._ws_api_call("order.modify", req)
+            if resp is None:
+                resp = self.exchange.fapiPrivatePutOrder(req)
+        except Exception as e:
+            logger.warning(f"改单失败，改为撤单重挂 {order_id}: {e}")
+            if p["post_only"] and self._is_postonly_reject(e):
+                ps = str(p.get("position_side") or "").strip().lower()
+                if ps in {"long", "short"}:
+                    self._mark_postonly_reject(ps)
+            return False
+        ms = (time.perf_counter() - t0) * 1000.0
+        try:
+            order = self.exchange.parse_order(resp, self.exchange.market(self.ccxt_symbol))
+        except Exception:
+            order = None
+        new_rec = self._order_record_from_ccxt(order)
+        if new_rec is None or new_rec.status not in {"NEW", "PARTIALLY_FILLED"}:
+            # 只做 Maker 改单会穿价时交易所直接让订单失效
+            self.order_store.remove(order_id)
+            self._sync_order_counters_from_store()
+            return False
+        if new_rec.ts is None:
+            new_rec.ts = time.time()
+        self.order_store.upsert(new_rec, True)
+        self._sync_order_counters_from_store()
+        self._amend_ok += 1
+        self._amend_last_ms = ms
+        self._amend_total_ms += ms
+        if ms > self._amend_max_ms:
+            self._amend_max_ms = ms
+        return True
+
+    def _execute_requote(self, cancel_ids: list, legs: list, amends=()) -> list:
+        """重挂：先改单，改单被拒的转为撤单重挂；再批量撤旧单、批量挂新单。
+
+        返回与 legs 对齐的下单结果（改单失败补挂的结果追加在末尾）。
+        """
+        cancel_ids = list(cancel_ids or [])
+        legs = list(legs or [])
+        for order_id, leg in (amends or ()):
+            if self.amend_order(order_id, leg):
+                continue
+            self._amend_fallback += 1
+            if self.order_store.get(order_id) is not None:
+                cancel_ids.append(order_id)
+            legs.append(leg)
+        if cancel_ids:
+            try:
+                self.cancel_orders_batch(cancel_ids)
+            except Exception:
+                pass
+        if not legs:
+            return []
+        if len(legs) == 1 or (not self._batch_orders_enabled()):
+            out = []
+            for leg in legs:
+                o = self.place_order(
+                    leg.get("side"),
+                    price=leg.get("price"),
+                    quantity=leg.get("quantity"),
+                    is_reduce_only=leg.get("is_reduce_only", False),
+                    position_side=leg.get("position_side"),
+                    order_type="limit",
+                    client_order_id=leg.get("client_order_id"),
+                )
+                out.append((self._get_order_client_id(o) if o is not None else None, o))
+            return out
+        return self.place_orders_batch(legs)
+
+    def _pending_entry_enabled(self, cfg: StrategyConfig) -> bool:
+        return bool(cfg.pending_entry_enabled)
+
+    def _pending_entry_price(self, cfg: StrategyConfig):
+        p = float(cfg.pending_entry_price or 0.0)
+        return p if p > 0 else None
+
     def _pending_hardstop_client_id(self, side: str, pending_price: float, hard_stop_price: float):
         try:
             return self.risk_engine._pending_hardstop_client_id(side, float(pending_price), float(hard_stop_price))
@@ -3315,7 +4156,7 @@ class GridTradingBot:
         except Exception:
             self._deferred_pending_hardstop = None
 
-    def _maybe_apply_deferred_pending_hardstop_locked(self, cfg: dict) -> None:
+    def _maybe_apply_deferred_pending_hardstop(self, cfg: StrategyConfig) -> None:
         d = getattr(self, "_deferred_pending_hardstop", None)
         if not d:
             return
@@ -3326,7 +4167,7 @@ class GridTradingBot:
         except Exception:
             self._deferred_pending_hardstop = None
             return
-        ok = self._ensure_pending_entry_hardstop_locked(cfg, side, pp, qty)
+        ok = self._ensure_pending_entry_hardstop(cfg, side, pp, qty)
         if ok:
             self._deferred_pending_hardstop = None
 
@@ -3341,7 +4182,7 @@ class GridTradingBot:
         if sp is None or float(sp) <= 0:
             raise ValueError("invalid stop price")
         params = {"stopPrice": float(sp)}
-        params["newClientOrderId"] = str(client_order_id or uuid.uuid4())
+        params["newClientOrderId"] = str(client_order_id or self._new_client_order_id())
         params["workingType"] = "CONTRACT_PRICE"
         if not bool(getattr(self, "_hedge_mode", False)):
             params["reduceOnly"] = True
@@ -3351,9 +4192,9 @@ class GridTradingBot:
                 params["positionSide"] = ps
         return self.exchange.create_order(self.ccxt_symbol, "STOP_MARKET", sd, float(q), None, params)
 
-    def _ensure_pending_entry_hardstop_locked(self, cfg: dict, active_side: str, pending_price: float, pending_qty: float) -> bool:
-        hs = self._safe_float((cfg or {}).get("HARD_STOPLOSS_PRICE", 0.0))
-        if hs is None or float(hs) <= 0:
+    def _ensure_pending_entry_hardstop(self, cfg: StrategyConfig, active_side: str, pending_price: float, pending_qty: float) -> bool:
+        hs = float(cfg.hard_stoploss_price or 0.0)
+        if hs <= 0:
             return False
         s = str(active_side or "").strip().lower()
         if s not in {"long", "short"}:
@@ -3385,28 +4226,11 @@ class GridTradingBot:
             self._defer_pending_hardstop(s, pp, pending_qty)
             return False
         desired_o_side = "sell" if s == "long" else "buy"
-        algo_orders = self._fetch_open_algo_orders(market_id)
-        for ao in (algo_orders or []):
-            try:
-                raw = ao or {}
-                status = str(raw.get("algoStatus") or raw.get("status") or "").strip().upper()
-                if status and status not in {"NEW"}:
-                    continue
-                if str(raw.get("clientAlgoId") or raw.get("clientOrderId") or raw.get("clientOrderID") or "").strip() != str(cid):
-                    continue
-                a_side = str(raw.get("side") or "").strip().lower()
-                if a_side != desired_o_side:
-                    continue
-                ot = str(raw.get("orderType") or raw.get("type") or "").strip().upper()
-                if "STOP" not in ot:
-                    continue
-                if required_ps is not None:
-                    ps = str(raw.get("positionSide") or "").strip().upper()
-                    if ps and ps not in {required_ps, "BOTH"}:
-                        continue
+        self._ensure_order_store_synced()
+        rec = self.order_store.by_client_id(cid)
+        if rec is not None and rec.is_algo and rec.side == desired_o_side and "STOP" in str(rec.order_type or ""):
+            if required_ps is None or rec.position_side in {required_ps, "BOTH", None}:
                 return True
-            except Exception:
-                continue
         try:
             self._place_algo_conditional_order(
                 "STOP_MARKET",
@@ -3416,7 +4240,7 @@ class GridTradingBot:
                 close_position=True,
                 client_algo_id=str(cid),
             )
-            self._refresh_open_orders_cache()
+            self._ensure_order_store_synced()
             return True
         except Exception as e:
             es = str(e or "")
@@ -3426,7 +4250,7 @@ class GridTradingBot:
             self._note_rest_error(e, "pending_hardstop")
             return False
 
-    def _maybe_ensure_pending_entry_order_locked(self, cfg: dict) -> bool:
+    def _maybe_ensure_pending_entry_order(self, cfg: StrategyConfig) -> bool:
         if not self._pending_entry_enabled(cfg):
             return False
         pending_price = self._pending_entry_price(cfg)
@@ -3437,47 +4261,34 @@ class GridTradingBot:
             active_side = "long"
 
         pos = float(self.long_position or 0.0) if active_side == "long" else float(self.short_position or 0.0)
-        if pos <= 0:
+        if pos <= 0 and (not self.position_book.ready):
             if self._rest_allowed():
                 try:
-                    lp, sp = self.get_position()
-                    self.long_position, self.short_position = lp, sp
-                    pos = float(lp or 0.0) if active_side == "long" else float(sp or 0.0)
+                    self._reconcile_positions_rest()
+                    pos = self.position_book.amount(active_side)
                 except Exception as e:
                     self._note_rest_error(e, "pending_pos")
         if pos > 0:
             try:
-                orders = self._get_open_orders_cached(max_age_sec=0.0) or []
+                self._ensure_order_store_synced()
             except Exception:
-                orders = []
+                pass
             desired_id = None
             try:
                 desired_id = self.risk_engine._pending_entry_client_id(active_side, pending_price)
             except Exception:
                 desired_id = None
             if desired_id:
-                for o in orders:
-                    try:
-                        if self._is_stop_order(o):
-                            continue
-                        if self._get_order_reduce_only(o):
-                            continue
-                        if str(self._get_order_client_id(o) or "") != str(desired_id):
-                            continue
-                        oid = (o or {}).get("id")
-                        if oid:
-                            self.cancel_order(oid)
-                    except Exception:
-                        continue
+                rec = self.order_store.by_client_id(desired_id)
+                if rec is not None and (not rec.is_stop) and (not rec.reduce_only):
+                    self.cancel_order(rec.order_id)
             return False
 
         entry_side = "buy" if active_side == "long" else "sell"
-        base_usdc = None
-        if bool((cfg or {}).get("ENABLE_BASE_POSITION", False)):
-            base_usdc = self._safe_float((cfg or {}).get("BASE_POSITION_USDC", 0.0))
-        if base_usdc is None or float(base_usdc) <= 0:
-            base_usdc = self._safe_float((cfg or {}).get("BASE_ORDER_SIZE_USDC", 0.0))
-        if base_usdc is None or float(base_usdc) <= 0:
+        base_usdc = float(cfg.base_position_usdc or 0.0) if cfg.enable_base_position else 0.0
+        if base_usdc <= 0:
+            base_usdc = float(cfg.base_order_size_usdc or 0.0)
+        if base_usdc <= 0:
             return True
 
         qty = self.usdc_to_amount(float(base_usdc), float(pending_price))
@@ -3485,62 +4296,35 @@ class GridTradingBot:
             return True
 
         try:
-            orders = self._get_open_orders_cached(max_age_sec=0.0) or []
+            self._ensure_order_store_synced()
         except Exception:
-            orders = []
+            pass
         desired_id = None
         try:
             desired_id = self.risk_engine._pending_entry_client_id(active_side, pending_price)
         except Exception:
             desired_id = None
-        desired_price = round(float(pending_price), int(self.price_precision or 0))
+        desired_tick = self.market_spec.price_to_ticks(pending_price)
+        desired_price = self.market_spec.ticks_to_price(desired_tick)
+        required_ps = None
+        if bool(getattr(self, "_hedge_mode", False)):
+            required_ps = "LONG" if active_side == "long" else "SHORT"
 
-        for o in orders:
-            try:
-                if self._is_stop_order(o):
-                    continue
-                if self._get_order_reduce_only(o):
-                    continue
-                o_side = str((o or {}).get("side") or "").strip().lower()
-                if o_side != entry_side:
-                    continue
-                ps = self._get_order_position_side(o)
-                if bool(getattr(self, "_hedge_mode", False)):
-                    required_ps = "LONG" if active_side == "long" else "SHORT"
-                    if ps != required_ps:
-                        continue
-                o_price = self._safe_float((o or {}).get("price"))
-                if o_price is None:
-                    o_price = self._safe_float(((o or {}).get("info") or {}).get("price"))
-                if o_price is None or float(o_price) <= 0:
-                    continue
-                o_price = round(float(o_price), int(self.price_precision or 0))
-                cid = str(self._get_order_client_id(o) or "")
-                if desired_id and cid == str(desired_id) and o_price == desired_price:
+        if desired_id:
+            rec = self.order_store.by_client_id(desired_id)
+            if rec is not None and (not rec.is_stop) and (not rec.reduce_only) and rec.side == entry_side and rec.price_tick == desired_tick:
+                if required_ps is None or rec.position_side == required_ps:
                     return True
-            except Exception:
-                continue
 
-        for o in orders:
+        for rec in self.order_store.grid_orders():
             try:
-                if self._is_stop_order(o):
+                if rec.reduce_only or rec.side != entry_side:
                     continue
-                if self._get_order_reduce_only(o):
+                if required_ps is not None and rec.position_side != required_ps:
                     continue
-                o_side = str((o or {}).get("side") or "").strip().lower()
-                if o_side != entry_side:
-                    continue
-                ps = self._get_order_position_side(o)
-                if bool(getattr(self, "_hedge_mode", False)):
-                    required_ps = "LONG" if active_side == "long" else "SHORT"
-                    if ps != required_ps:
-                        continue
-                cid = str(self._get_order_client_id(o) or "")
-                if desired_id and cid == str(desired_id):
+                if desired_id and rec.client_id == str(desired_id):
                     continue
-                oid = (o or {}).get("id")
-                if oid:
-                    self.cancel_order(oid)
+                self.cancel_order(rec.order_id)
             except Exception:
                 continue
 
@@ -3555,7 +4339,7 @@ class GridTradingBot:
         )
         if o is not None:
             logger.info(f"挂单入场已下单: {active_side} {entry_side} @ {desired_price}")
-        self._refresh_open_orders_cache()
+        self._ensure_order_store_synced()
         return True
 
     # ==================== 策略逻辑 ====================
@@ -3565,379 +4349,571 @@ class GridTradingBot:
             return
         if bool(getattr(self, "is_grid_stopped", False)):
             return
+        band = self.eval_band
         if self.latest_price is None or float(self.latest_price or 0.0) <= 0:
+            band.veto()
             return
 
-        cfg = self.risk_engine.get_config()
+        sc = self.risk_engine.get_strategy_config()
         self._apply_runtime_settings_from_config()
-        grid_enabled = bool(cfg.get("GRID_ENABLED", True))
-        maker_only = self._maker_only_enabled()
-        min_interval = float(cfg.get("RISK_EVAL_MIN_INTERVAL_SEC", 0.8))
+        grid_enabled = sc.grid_enabled
+        maker_only = sc.maker_only
+        if self.event_lanes.pending(USER_EVENT_LANES) > 0:
+            # 成交/条件单事件尚未入账，先让高优先级道处理完，避免基于旧持仓重挂
+            band.veto()
+            return
+        fill_since = self._fill_requote_since
+        min_interval = sc.risk_eval_min_interval_sec
         now = time.time()
-        if min_interval > 0 and (now - float(getattr(self, "_last_risk_eval_ts", 0.0) or 0.0)) < min_interval:
+        if fill_since is None and min_interval > 0 and (now - float(getattr(self, "_last_risk_eval_ts", 0.0) or 0.0)) < min_interval:
+            # 限频期间网格不会动作，到期前价格带只由风控项决定
+            band.deadline(float(getattr(self, "_last_risk_eval_ts", 0.0) or 0.0) + min_interval)
             return
         self._last_risk_eval_ts = now
 
-        async with self.lock:
-            if bool(getattr(self, "is_grid_stopped", False)):
-                return
-            self._maybe_apply_deferred_pending_hardstop_locked(cfg)
-            if self._maybe_ensure_pending_entry_order_locked(cfg):
-                self._force_orders_resync = False
-                return
-            if not grid_enabled:
-                try:
-                    active_side = str(self.direction or "long").strip().lower()
-                    if active_side not in {"long", "short"}:
-                        active_side = "long"
-                    purge_needed = bool(getattr(self, "_force_orders_resync", False)) or (not bool(getattr(self, "_grid_disabled_purged", False)))
-                    if purge_needed and (not self._in_grid_action_cooldown(active_side)):
-                        self._mark_grid_action(active_side)
-                        try:
-                            self.cancel_orders_for_side(active_side)
-                        except Exception:
-                            pass
-                        self._grid_disabled_purged = True
-                except Exception:
-                    pass
-                self._force_orders_resync = False
-                return
-            self._grid_disabled_purged = False
+        if self.order_store.stale:
+            # 挂单簿断档时先在锁外全量对账
+            try:
+                await self.rest.call("orders_sync", self._ensure_order_store_synced)
+            except Exception:
+                pass
+        async with self._io_lock:
+            async with self.lock.section("grid_plan"):
+                if bool(getattr(self, "is_grid_stopped", False)):
+                    return
+                if self._fill_fast_inflight > 0:
+                    # 成交快速补单发送中，挂单簿尚无该单；发送完成后会再触发评估
+                    band.veto()
+                    return
+                seq = self._state_seq
+                actions, finish = self._plan_grid_strategy_locked(sc, grid_enabled, maker_only, now)
+                if not actions:
+                    self._apply_grid_results_locked(actions, [], finish, seq)
+                else:
+                    # 本轮有挂撤单，结果回报前无法确定下一次的触发条件
+                    band.veto()
+            if actions:
+                results = await self.rest.call("adjust_grid", self._execute_grid_actions, actions)
+                async with self.lock.section("grid_apply"):
+                    self._apply_grid_results_locked(actions, results, finish, seq)
+        if fill_since is not None:
+            self._record_fill_requote(fill_since)
+
+    @staticmethod
+    def _grid_action(label: str, fn, *args, done=None) -> dict:
+        """锁外执行的一步交易所操作；done(结果) 在回写阶段于锁内调用"""
+        return {"label": label, "fn": fn, "args": args, "done": done}
+
+    def _execute_grid_actions(self, actions: list) -> list:
+        """线程池中依次执行本轮网格动作，返回与 actions 对齐的结果；单个动作失败不影响其余动作"""
+        out = []
+        for a in actions:
+            if self.shutdown_event.is_set() or bool(getattr(self, "is_grid_stopped", False)):
+                # 执行期间触发硬止损/止盈/退出，剩余动作不再发出
+                out.append(None)
+                continue
+            try:
+                out.append(a["fn"](*a["args"]))
+            except Exception as e:
+                logger.error(f"网格动作执行失败 {a['label']}: {e}")
+                out.append(None)
+        return out
+
+    def _apply_grid_results_locked(self, actions: list, results: list, finish: list, seq: int):
+        """回写执行结果并重建成交模板；计划之后持仓/成交/配置有变化时视为冲突，不建模板并补评估一轮"""
+        for a, r in zip(actions, results):
+            if a["done"] is not None:
+                a["done"](r)
+        if actions:
+            self._grid_exec_passes += 1
+        self._fill_templates = {}
+        if self._state_seq != seq:
+            self._grid_conflicts += 1
+            self._kick_risk_eval()
+            return
+        for f in finish:
+            f()
 
+    def _note_initial_order_result(self, side: str, add_leg: int, now: float, results):
+        if results and add_leg < len(results) and results[add_leg][1] is not None:
+            if side == "long":
+                self.last_long_order_time = now
+            else:
+                self.last_short_order_time = now
+
+    def _record_fill_requote(self, fill_since: float):
+        """记录成交事件入队到重挂完成的耗时。"""
+        ms = max(0.0, (time.perf_counter() - float(fill_since)) * 1000.0)
+        if self._fill_requote_since == fill_since:
+            self._fill_requote_since = None
+        self._fill_requote_count += 1
+        self._fill_requote_last_ms = ms
+        self._fill_requote_total_ms += ms
+        if ms > self._fill_requote_max_ms:
+            self._fill_requote_max_ms = ms
+
+    def _plan_grid_strategy_locked(self, cfg: StrategyConfig, grid_enabled: bool, maker_only: bool, now: float):
+        """锁内只做计算：返回 (锁外执行的动作列表, 执行后锁内调用的收尾列表)。
+
+        冷却、锚点、强制重挂标记等状态在计划时即更新（乐观应用）；执行期间到达的事件照常修改状态，
+        回写时按 _state_seq 判断是否冲突。
+        """
+        actions = []
+        finish = []
+        band = self.eval_band
+        if getattr(self, "_deferred_pending_hardstop", None):
+            actions.append(self._grid_action("pending_hardstop", self._maybe_apply_deferred_pending_hardstop, cfg))
+        pending_cid = None
+        pending_price = self._pending_entry_price(cfg) if self._pending_entry_enabled(cfg) else None
+        if pending_price is not None:
+            actions.append(self._grid_action("pending_entry", self._maybe_ensure_pending_entry_order, cfg))
+            pending_side = str(self.direction or "long").strip().lower()
+            if pending_side not in {"long", "short"}:
+                pending_side = "long"
+            if float((self.long_position if pending_side == "long" else self.short_position) or 0.0) <= 0:
+                # 空仓时由挂单入场接管，不挂网格
+                self._force_orders_resync = False
+                return actions, finish
             try:
-                orders = self._get_open_orders_cached(max_age_sec=0.5) or []
+                pending_cid = self.risk_engine._pending_entry_client_id(pending_side, pending_price)
             except Exception:
-                orders = []
+                pending_cid = None
+        if not grid_enabled:
+            try:
+                active_side = str(self.direction or "long").strip().lower()
+                if active_side not in {"long", "short"}:
+                    active_side = "long"
+                purge_needed = bool(getattr(self, "_force_orders_resync", False)) or (not bool(getattr(self, "_grid_disabled_purged", False)))
+                if purge_needed and (not self._in_grid_action_cooldown(active_side)):
+                    self._mark_grid_action(active_side)
+                    actions.append(self._grid_action("grid_disabled_purge", self.cancel_orders_for_side, active_side))
+                    self._grid_disabled_purged = True
+                elif purge_needed:
+                    self.eval_band.veto()
+            except Exception:
+                pass
+            self._force_orders_resync = False
+            return actions, finish
+        self._grid_disabled_purged = False
 
-            long_pos = float(self.long_position or 0.0)
-            short_pos = float(self.short_position or 0.0)
+        orders = self.order_store.grid_orders()
+        if pending_cid:
+            # 已有持仓时入场单由上面的动作撤掉，本轮对账不把它当作加仓单
+            orders = [r for r in orders if r.client_id != pending_cid]
 
-            active_side = str(self.direction or "long").strip().lower()
-            if active_side not in {"long", "short"}:
-                active_side = "long"
-            active_sides = (active_side,)
+        long_pos = float(self.long_position or 0.0)
+        short_pos = float(self.short_position or 0.0)
 
-            plans = {}
-            for s in active_sides:
-                p = long_pos if s == "long" else short_pos
-                plans[s] = self.risk_engine.side_plan(s, float(self.latest_price), float(p))
+        active_side = str(self.direction or "long").strip().lower()
+        if active_side not in {"long", "short"}:
+            active_side = "long"
+        active_sides = (active_side,)
 
-            for side in active_sides:
-                pos = long_pos if side == "long" else short_pos
-                plan = plans.get(side) or {}
-                if not bool(plan.get("enabled", False)):
-                    continue
+        plans = {}
+        for s in active_sides:
+            p = long_pos if s == "long" else short_pos
+            plans[s] = self.risk_engine.side_plan(s, float(self.latest_price), float(p))
 
-                if pos <= 0:
-                    if side == "long":
-                        self.mid_price_long = 0.0
-                    else:
-                        self.mid_price_short = 0.0
+        for side in active_sides:
+            pos = long_pos if side == "long" else short_pos
+            plan = plans.get(side) or {}
+            if not bool(plan.get("enabled", False)):
+                continue
+            levels = None
 
-                if pos > 0:
+            if pos <= 0:
+                if side == "long":
+                    self.mid_price_long = 0.0
+                else:
+                    self.mid_price_short = 0.0
+                if cfg.requote_qty_tolerance_ratio > 0:
+                    # 空仓首单数量随现价换算，比较数量时无法给出价格带
+                    band.veto()
+
+            if pos > 0:
+                if side == "long":
+                    anchor = float(self.mid_price_long or 0.0)
+                    if anchor <= 0:
+                        self.mid_price_long = float(self.latest_price)
+                        anchor = float(self.mid_price_long)
+                else:
+                    anchor = float(self.mid_price_short or 0.0)
+                    if anchor <= 0:
+                        self.mid_price_short = float(self.latest_price)
+                        anchor = float(self.mid_price_short)
+
+                add_spacing = float((plan.get("add") or {}).get("spacing") or 0.0)
+                tp_spacing = float((plan.get("tp") or {}).get("spacing") or 0.0)
+                add_usdc = float((plan.get("add") or {}).get("size_usdc") or 0.0)
+                tp_usdc = float((plan.get("tp") or {}).get("size_usdc") or 0.0)
+
+                slow_enabled = cfg.slow_trend_requote_enabled
+                slow_min_itv = cfg.slow_trend_requote_min_interval_sec
+                slow_max_age = cfg.slow_trend_max_order_age_sec
+                slow_drift_steps = cfg.slow_trend_max_drift_steps
+                if slow_enabled and anchor > 0 and (slow_min_itv >= 0) and (slow_max_age >= 0) and (slow_drift_steps >= 0):
                     if side == "long":
-                        anchor = float(self.mid_price_long or 0.0)
-                        if anchor <= 0:
-                            self.mid_price_long = float(self.latest_price)
-                            anchor = float(self.mid_price_long)
+                        last_rq = float(getattr(self, "_last_slow_requote_ts_long", 0.0) or 0.0)
                     else:
-                        anchor = float(self.mid_price_short or 0.0)
-                        if anchor <= 0:
-                            self.mid_price_short = float(self.latest_price)
-                            anchor = float(self.mid_price_short)
-
-                    add_spacing = float((plan.get("add") or {}).get("spacing") or 0.0)
-                    tp_spacing = float((plan.get("tp") or {}).get("spacing") or 0.0)
-                    add_usdc = float((plan.get("add") or {}).get("size_usdc") or 0.0)
-                    tp_usdc = float((plan.get("tp") or {}).get("size_usdc") or 0.0)
-
-                    slow_enabled = bool(cfg.get("SLOW_TREND_REQUOTE_ENABLED", False))
-                    slow_min_itv = float(cfg.get("SLOW_TREND_REQUOTE_MIN_INTERVAL_SEC", 60.0) or 0.0)
-                    slow_max_age = float(cfg.get("SLOW_TREND_MAX_ORDER_AGE_SEC", 120.0) or 0.0)
-                    slow_drift_steps = float(cfg.get("SLOW_TREND_MAX_DRIFT_STEPS", 3.0) or 0.0)
-                    if slow_enabled and anchor > 0 and (slow_min_itv >= 0) and (slow_max_age >= 0) and (slow_drift_steps >= 0):
-                        if side == "long":
-                            last_rq = float(getattr(self, "_last_slow_requote_ts_long", 0.0) or 0.0)
+                        last_rq = float(getattr(self, "_last_slow_requote_ts_short", 0.0) or 0.0)
+                    allow_rq = (slow_min_itv == 0) or ((now - last_rq) >= slow_min_itv)
+                    if not allow_rq:
+                        band.deadline(last_rq + slow_min_itv)
+                    if allow_rq:
+                        add_side2 = "buy" if side == "long" else "sell"
+                        tp_side2 = "sell" if side == "long" else "buy"
+                        required_ps2 = None
+                        if bool(getattr(self, "_hedge_mode", False)):
+                            required_ps2 = "LONG" if side == "long" else "SHORT"
+                        oldest_ts = None
+                        for rec in orders:
+                            if required_ps2 is not None and rec.position_side != required_ps2:
+                                continue
+                            if not (((not rec.reduce_only) and rec.side == add_side2) or (rec.reduce_only and rec.side == tp_side2)):
+                                continue
+                            if rec.ts is None:
+                                continue
+                            oldest_ts = rec.ts if oldest_ts is None else min(float(oldest_ts), float(rec.ts))
+                        drift_unit = max(float(add_spacing or 0.0), float(tp_spacing or 0.0))
+                        drift_threshold = float(drift_unit) * float(slow_drift_steps)
+                        drift_ok = False
+                        if drift_threshold > 0:
+                            drift_ok = abs((float(self.latest_price) - float(anchor)) / float(anchor)) >= drift_threshold
+                        age_ok = False
+                        if slow_max_age > 0 and oldest_ts is not None:
+                            age_ok = (now - float(oldest_ts)) >= slow_max_age
+                        if age_ok or drift_ok:
+                            anchor = float(self.latest_price)
+                            if side == "long":
+                                self.mid_price_long = float(anchor)
+                                self._last_slow_requote_ts_long = float(now)
+                            else:
+                                self.mid_price_short = float(anchor)
+                                self._last_slow_requote_ts_short = float(now)
+                            band.deadline(now + slow_min_itv)
                         else:
-                            last_rq = float(getattr(self, "_last_slow_requote_ts_short", 0.0) or 0.0)
-                        allow_rq = (slow_min_itv == 0) or ((now - last_rq) >= slow_min_itv)
-                        if allow_rq:
-                            add_side2 = "buy" if side == "long" else "sell"
-                            tp_side2 = "sell" if side == "long" else "buy"
-                            required_ps2 = None
-                            if bool(getattr(self, "_hedge_mode", False)):
-                                required_ps2 = "LONG" if side == "long" else "SHORT"
-                            oldest_ts = None
-                            for o in orders:
-                                try:
-                                    if self._is_stop_order(o):
-                                        continue
-                                    if required_ps2 is not None and self._get_order_position_side(o) != required_ps2:
-                                        continue
-                                    info2 = (o or {}).get("info") or {}
-                                    o_side2 = str((o or {}).get("side") or info2.get("side") or info2.get("S") or "").strip().lower()
-                                    if o_side2 not in {"buy", "sell"}:
-                                        continue
-                                    ro2 = self._get_order_reduce_only(o)
-                                    if (not ro2) and o_side2 == add_side2:
-                                        ts2 = self._get_order_timestamp_sec(o)
-                                    elif ro2 and o_side2 == tp_side2:
-                                        ts2 = self._get_order_timestamp_sec(o)
-                                    else:
-                                        continue
-                                    if ts2 is None:
-                                        continue
-                                    oldest_ts = ts2 if oldest_ts is None else min(float(oldest_ts), float(ts2))
-                                except Exception:
-                                    continue
-                            drift_unit = max(float(add_spacing or 0.0), float(tp_spacing or 0.0))
-                            drift_threshold = float(drift_unit) * float(slow_drift_steps)
-                            drift_ok = False
+                            # 慢单边重挂的偏移阈值与挂单最大时长
                             if drift_threshold > 0:
-                                drift_ok = abs((float(self.latest_price) - float(anchor)) / float(anchor)) >= drift_threshold
-                            age_ok = False
+                                band.below(float(anchor) * (1.0 - drift_threshold))
+                                band.above(float(anchor) * (1.0 + drift_threshold))
                             if slow_max_age > 0 and oldest_ts is not None:
-                                age_ok = (now - float(oldest_ts)) >= slow_max_age
-                            if age_ok or drift_ok:
-                                anchor = float(self.latest_price)
-                                if side == "long":
-                                    self.mid_price_long = float(anchor)
-                                    self._last_slow_requote_ts_long = float(now)
-                                else:
-                                    self.mid_price_short = float(anchor)
-                                    self._last_slow_requote_ts_short = float(now)
+                                band.deadline(float(oldest_ts) + slow_max_age)
 
-                    if side == "long":
-                        fixed_add_price = anchor * (1.0 - add_spacing)
-                        fixed_tp_price = anchor * (1.0 + tp_spacing)
-                    else:
-                        fixed_add_price = anchor * (1.0 + add_spacing)
-                        fixed_tp_price = anchor * (1.0 - tp_spacing)
-
-                    if fixed_add_price > 0:
-                        (plan.get("add") or {})["price"] = float(fixed_add_price)
-                        if add_usdc > 0:
-                            (plan.get("add") or {})["qty"] = self.usdc_to_amount(add_usdc, fixed_add_price)
-                    if fixed_tp_price > 0:
-                        (plan.get("tp") or {})["price"] = float(fixed_tp_price)
-                        if tp_usdc > 0:
-                            tp_qty_calc = self.usdc_to_amount(tp_usdc, fixed_tp_price)
+                if side == "long":
+                    fixed_add_price = anchor * (1.0 - add_spacing)
+                    fixed_tp_price = anchor * (1.0 + tp_spacing)
+                else:
+                    fixed_add_price = anchor * (1.0 + add_spacing)
+                    fixed_tp_price = anchor * (1.0 - tp_spacing)
+
+                if fixed_add_price > 0:
+                    (plan.get("add") or {})["price"] = float(fixed_add_price)
+                    if add_usdc > 0:
+                        (plan.get("add") or {})["qty"] = self.usdc_to_amount(add_usdc, fixed_add_price)
+                if fixed_tp_price > 0:
+                    (plan.get("tp") or {})["price"] = float(fixed_tp_price)
+                    if tp_usdc > 0:
+                        tp_qty_calc = self.usdc_to_amount(tp_usdc, fixed_tp_price)
+                        if tp_qty_calc is not None:
+                            tp_qty_calc = min(float(tp_qty_calc), float(pos))
+                            tp_qty_calc = self.round_amount_down(tp_qty_calc)
                             if tp_qty_calc is not None:
                                 tp_qty_calc = min(float(tp_qty_calc), float(pos))
-                                tp_qty_calc = self.round_amount_down(tp_qty_calc)
-                                if tp_qty_calc is not None:
-                                    tp_qty_calc = min(float(tp_qty_calc), float(pos))
-                                if tp_qty_calc is not None and float(tp_qty_calc) >= float(self.min_order_amount or 0.0):
-                                    (plan.get("tp") or {})["qty"] = tp_qty_calc
-
-                desired_add_id = (plan.get("add") or {}).get("client_id")
-                desired_tp_id = (plan.get("tp") or {}).get("client_id")
-                desired_add_id = str(desired_add_id) if desired_add_id else None
-                desired_tp_id = str(desired_tp_id) if desired_tp_id else None
-
-                add_present = False
-                tp_present = False
-                add_order_ts = None
-                add_ok = False
-                tp_ok = False
-                add_id_ok = False
-
-                add_price_target = self._safe_float((plan.get("add") or {}).get("price")) or 0.0
-                tp_price_target = self._safe_float((plan.get("tp") or {}).get("price")) or 0.0
-                add_price_target = round(float(add_price_target), int(self.price_precision or 0)) if add_price_target > 0 else 0.0
-                tp_price_target = round(float(tp_price_target), int(self.price_precision or 0)) if tp_price_target > 0 else 0.0
-                add_side = "buy" if side == "long" else "sell"
-                tp_side = "sell" if side == "long" else "buy"
-                required_ps = None
-                if bool(getattr(self, "_hedge_mode", False)):
-                    required_ps = "LONG" if side == "long" else "SHORT"
-
-                for o in orders:
-                    if self._is_stop_order(o):
-                        continue
-                    ps = self._get_order_position_side(o)
-                    ro = self._get_order_reduce_only(o)
-                    info = (o or {}).get("info") or {}
-                    o_side = str((o or {}).get("side") or info.get("side") or info.get("S") or "").strip().lower()
-                    if o_side not in {"buy", "sell"}:
-                        continue
-                    o_qty = self._safe_float((o or {}).get("remaining"))
-                    if o_qty is None:
-                        o_qty = self._safe_float((o or {}).get("amount"))
-                    if o_qty is None:
-                        o_qty = self._safe_float(((o or {}).get("info") or {}).get("origQty"))
-                    if o_qty is None or float(o_qty) <= 0:
-                        continue
-                    o_price = self._safe_float((o or {}).get("price"))
-                    if o_price is None:
-                        o_price = self._safe_float(((o or {}).get("info") or {}).get("price"))
-                    if o_price is None or float(o_price) <= 0:
-                        continue
-                    o_price = round(float(o_price), int(self.price_precision or 0))
-                    o_cid = self._get_order_client_id(o)
-                    if required_ps is not None and ps != required_ps:
-                        continue
+                            if tp_qty_calc is not None and float(tp_qty_calc) >= float(self.min_order_amount or 0.0):
+                                (plan.get("tp") or {})["qty"] = tp_qty_calc
+
+                # 多层挂单：各层由同一锚点批量生成，单层配置时为 None
+                levels = self.risk_engine.level_tables(side, anchor, pos)
+
+            desired_add_id = (plan.get("add") or {}).get("client_id")
+            desired_tp_id = (plan.get("tp") or {}).get("client_id")
+            desired_add_id = str(desired_add_id) if desired_add_id else None
+            desired_tp_id = str(desired_tp_id) if desired_tp_id else None
+
+            add_price_target = self._safe_float((plan.get("add") or {}).get("price")) or 0.0
+            tp_price_target = self._safe_float((plan.get("tp") or {}).get("price")) or 0.0
+            add_price_target = self.market_spec.round_price(add_price_target) if add_price_target > 0 else 0.0
+            tp_price_target = self.market_spec.round_price(tp_price_target) if tp_price_target > 0 else 0.0
+            add_side = "buy" if side == "long" else "sell"
+            tp_side = "sell" if side == "long" else "buy"
+            required_ps = None
+            if bool(getattr(self, "_hedge_mode", False)):
+                required_ps = "LONG" if side == "long" else "SHORT"
+
+            add_qty = (plan.get("add") or {}).get("qty")
+            tp_qty = (plan.get("tp") or {}).get("qty")
+            need_tp = pos > 0 and tp_qty is not None and float(tp_qty) > 0
+
+            # 期望挂单：空仓首单跟随最优价，不比较价格；空仓时不应有止盈单
+            if levels is not None:
+                desired = self._level_desired_orders(levels["add"], add_side, required_ps, False)
+                desired.extend(self._level_desired_orders(levels["tp"], tp_side, required_ps, True))
+                add_want = desired[0]
+            else:
+                add_want = DesiredOrder(
+                    "add",
+                    add_side,
+                    required_ps,
+                    False,
+                    self.order_store.to_tick(add_price_target) if pos > 0 else None,
+                    add_qty,
+                    desired_add_id,
+                )
+                desired = []
+                if add_qty is not None and float(add_qty) > 0:
+                    desired.append(add_want)
+                if pos <= 0:
+                    desired.append(DesiredOrder("tp", tp_side, required_ps, True, None, None, desired_tp_id))
+                elif need_tp:
+                    desired.append(
+                        DesiredOrder("tp", tp_side, required_ps, True, self.order_store.to_tick(tp_price_target), tp_qty, desired_tp_id)
+                    )
+
+            add_live = match_live(add_want, orders)
+            add_present = bool(add_live)
+            add_order_ts = None
+            for rec in add_live:
+                add_order_ts = rec.ts or add_order_ts
+
+            refresh_initial = False
+            first_wait = cfg.order_first_time_sec
+            if pos <= 0 and add_present and float(first_wait or 0.0) > 0:
+                last_ts = float(self.last_long_order_time or 0.0) if side == "long" else float(self.last_short_order_time or 0.0)
+                if last_ts <= 0:
                     if side == "long":
-                        if (not ro) and o_side == add_side:
-                            add_present = True
-                            add_order_ts = self._get_order_timestamp_sec(o) or add_order_ts
-                            if desired_add_id is not None and (o_cid is None or str(o_cid or "") == desired_add_id):
-                                add_id_ok = True
-                            if o_price == add_price_target:
-                                if desired_add_id is None or o_cid is None or str(o_cid or "") == desired_add_id:
-                                    add_ok = True
-                        if ro and o_side == tp_side:
-                            tp_present = True
-                            if o_price == tp_price_target:
-                                if desired_tp_id is None or o_cid is None or str(o_cid or "") == desired_tp_id:
-                                    tp_ok = True
+                        self.last_long_order_time = now
                     else:
-                        if (not ro) and o_side == add_side:
-                            add_present = True
-                            add_order_ts = self._get_order_timestamp_sec(o) or add_order_ts
-                            if desired_add_id is not None and (o_cid is None or str(o_cid or "") == desired_add_id):
-                                add_id_ok = True
-                            if o_price == add_price_target:
-                                if desired_add_id is None or o_cid is None or str(o_cid or "") == desired_add_id:
-                                    add_ok = True
-                        if ro and o_side == tp_side:
-                            tp_present = True
-                            if o_price == tp_price_target:
-                                if desired_tp_id is None or o_cid is None or str(o_cid or "") == desired_tp_id:
-                                    tp_ok = True
-
-                add_qty = (plan.get("add") or {}).get("qty")
-                tp_qty = (plan.get("tp") or {}).get("qty")
-                need_tp = pos > 0 and tp_qty is not None and float(tp_qty) > 0
-                if not need_tp:
-                    tp_ok = True
-
-                refresh_initial = False
-                first_wait = self._safe_float(cfg.get("ORDER_FIRST_TIME_SEC", self.order_first_time_sec))
-                if first_wait is None:
-                    first_wait = float(self.order_first_time_sec or 0.0)
-                if pos <= 0 and add_present and float(first_wait or 0.0) > 0:
-                    last_ts = float(self.last_long_order_time or 0.0) if side == "long" else float(self.last_short_order_time or 0.0)
-                    if last_ts <= 0:
-                        if side == "long":
-                            self.last_long_order_time = now
-                        else:
-                            self.last_short_order_time = now
-                        last_ts = now
-                    base_ts = float(add_order_ts or 0.0) if add_order_ts is not None else last_ts
-                    if base_ts <= 0:
-                        base_ts = last_ts
-                    if (now - float(base_ts)) >= float(first_wait or 0.0):
-                        refresh_initial = True
-
-                if pos > 0:
-                    need_update_add = bool(getattr(self, "_force_orders_resync", False)) or (not add_ok)
-                    need_update_tp = bool(getattr(self, "_force_orders_resync", False)) or (not tp_ok)
-                else:
-                    need_reset = (
-                        bool(getattr(self, "_force_orders_resync", False))
-                        or (not add_present)
-                        or (desired_add_id is not None and (not add_id_ok))
-                        or refresh_initial
-                    )
+                        self.last_short_order_time = now
+                    last_ts = now
+                base_ts = float(add_order_ts or 0.0) if add_order_ts is not None else last_ts
+                if base_ts <= 0:
+                    base_ts = last_ts
+                if (now - float(base_ts)) >= float(first_wait or 0.0):
+                    refresh_initial = True
+                band.deadline(float(base_ts) + float(first_wait or 0.0))
+
+            force_roles = ()
+            if bool(getattr(self, "_force_orders_resync", False)):
+                force_roles = ("add", "tp")
+            elif pos <= 0 and refresh_initial:
+                force_roles = ("add",)
+            diff = reconcile(
+                desired,
+                orders,
+                price_tol_ticks=cfg.requote_price_tolerance_ticks,
+                qty_tol_ratio=cfg.requote_qty_tolerance_ratio,
+                force_roles=force_roles,
+                allow_amend=self._amend_orders_enabled(),
+            )
+            changed = diff.roles()
+            need_update_add = "add" in changed
+            need_update_tp = "tp" in changed
+            need_reset = bool(need_update_add or need_update_tp)
+
+            bypass = self._grid_action_bypass_active(side)
+            action_allowed = bypass or (not self._in_grid_action_cooldown(side))
+
+            if need_reset and not action_allowed:
+                band.veto()
+            elif not need_reset:
+                # 只做 Maker 的边界：现有买单在买一之下、卖单在卖一之上，越过即成交或需重挂
+                half_tick = 0.5 * float(self.market_spec.tick_size)
+                for rec in orders:
+                    if required_ps is not None and rec.position_side != required_ps:
+                        continue
+                    px = self.market_spec.ticks_to_price(rec.price_tick)
+                    if rec.side == "buy":
+                        band.below(px - half_tick)
+                    else:
+                        band.above(px + half_tick)
 
-                bypass = self._grid_action_bypass_active(side)
-                action_allowed = bypass or (not self._in_grid_action_cooldown(side))
-
-                if pos > 0:
-                    if (not need_tp):
-                        need_update_tp = False
-                    need_reset = bool(need_update_add or need_update_tp)
-
-                if need_reset and action_allowed:
-                    if maker_only and self._recent_postonly_reject(side):
-                        if pos > 0 and bool(need_update_tp) and (not bool(need_update_add)):
-                            pass
-                        elif pos > 0 and bool(need_update_tp) and bool(need_update_add):
-                            need_update_add = False
-                            need_reset = bool(need_update_add or need_update_tp)
-                        else:
-                            continue
-                    self._mark_grid_action(side)
-                    if bypass:
-                        if str(side) == "long":
-                            self._grid_action_bypass_until_long = 0.0
-                        elif str(side) == "short":
-                            self._grid_action_bypass_until_short = 0.0
-
-                    if pos <= 0 and refresh_initial:
-                        logger.info(f"刷新 {side} 初始开仓挂单到最优价")
-
-                    if add_qty is not None and float(add_qty) > 0:
-                        o = None
-                        if pos <= 0:
-                            best = self.best_bid_price if side == "long" else self.best_ask_price
-                            add_price = float(best or 0.0)
-                            if add_price <= 0:
-                                add_price = float((plan.get("add") or {}).get("price") or 0.0)
-                            add_usdc = float((plan.get("add") or {}).get("size_usdc") or 0.0)
-                            if add_usdc > 0 and add_price > 0:
-                                add_qty = self.usdc_to_amount(add_usdc, add_price)
-                        else:
+            if need_reset and action_allowed:
+                if maker_only and self._recent_postonly_reject(side):
+                    if pos > 0 and bool(need_update_tp) and (not bool(need_update_add)):
+                        pass
+                    elif pos > 0 and bool(need_update_tp) and bool(need_update_add):
+                        need_update_add = False
+                        need_reset = bool(need_update_add or need_update_tp)
+                    else:
+                        band.veto()
+                        continue
+                self._mark_grid_action(side)
+                if bypass:
+                    if str(side) == "long":
+                        self._grid_action_bypass_until_long = 0.0
+                    elif str(side) == "short":
+                        self._grid_action_bypass_until_short = 0.0
+
+                if pos <= 0 and refresh_initial:
+                    logger.info(f"刷新 {side} 初始开仓挂单到最优价")
+
+                # 只撤对账结果中过期的订单；撤单与挂单各合并为一次批量请求
+                cancel_ids = []
+                legs = []
+                add_leg = None
+                amends = []
+                roles = {r for r, need in (("add", need_update_add), ("tp", need_update_tp)) if need}
+                # 单层挂单沿用计划中的原始价格（只做 Maker 时由下单处按方向取整），多层按层 tick
+                plan_prices = None if levels is not None else {
+                    "add": float((plan.get("add") or {}).get("price") or 0.0),
+                    "tp": float((plan.get("tp") or {}).get("price") or 0.0),
+                }
+                for oid, want in diff.amends:
+                    if want.role in roles:
+                        amends.append((oid, self._desired_leg(want, side, plan_prices)))
+                cancel_ids.extend(diff.cancel_ids(tuple(sorted(roles))))
+                for want in diff.places:
+                    if want.role not in roles:
+                        continue
+                    leg = self._desired_leg(want, side, plan_prices)
+                    if want.role == "add" and pos <= 0:
+                        best = self.best_bid_price if side == "long" else self.best_ask_price
+                        add_price = float(best or 0.0)
+                        if add_price <= 0:
                             add_price = float((plan.get("add") or {}).get("price") or 0.0)
-                            if not bool(need_update_add):
-                                add_price = None
+                        add_usdc = float((plan.get("add") or {}).get("size_usdc") or 0.0)
+                        if add_usdc > 0 and add_price > 0:
+                            add_qty = self.usdc_to_amount(add_usdc, add_price)
+                        leg["price"] = add_price
+                        leg["quantity"] = float(add_qty)
+                    if want.role == "add" and add_leg is None:
+                        add_leg = len(legs)
+                    legs.append(leg)
+
+                done = None
+                if pos <= 0 and add_leg is not None:
+                    done = functools.partial(self._note_initial_order_result, side, add_leg, now)
+                actions.append(self._grid_action("requote", self._execute_requote, cancel_ids, legs, amends, done=done))
+
+            if levels is None and pos > 0 and cfg.fill_fast_path_enabled:
+                finish.append(functools.partial(self._build_fill_templates_locked, cfg, side, pos, plan, required_ps))
 
-                        if add_price is not None:
-                            try:
-                                if pos > 0:
-                                    self.cancel_grid_orders_for_side(side, cancel_add=True, cancel_tp=False)
-                                else:
-                                    self.cancel_orders_for_side(side)
-                            except Exception:
-                                pass
-                            o = self.place_order(
-                                add_side,
-                                price=add_price,
-                                quantity=float(add_qty),
-                                is_reduce_only=False,
-                                position_side=side,
-                                order_type="limit",
-                                client_order_id=desired_add_id,
-                            )
-                        if pos <= 0 and o is not None:
-                            if side == "long":
-                                self.last_long_order_time = now
-                            else:
-                                self.last_short_order_time = now
+        self._force_orders_resync = False
+        return actions, finish
+
+    def _build_fill_templates_locked(self, cfg: StrategyConfig, side: str, pos: float, plan: dict, required_ps):
+        """为当前报价对的两种成交各预备下一笔订单（价格、数量、client id、参数均已整理好）。
+
+        加仓单在其价格成交后锚点移到该价，下一笔加仓单再远一格；止盈单成交后下一笔止盈单再远一格，
+        数量不超过成交后的剩余持仓。与成交后 adjust_grid_strategy 算出的期望挂单一致，补评估时保留。
+        多层挂单时更深的层已在盘口，不另备模板。
+        """
+        add = plan.get("add") or {}
+        tp = plan.get("tp") or {}
+        add_side = "buy" if side == "long" else "sell"
+        tp_side = "sell" if side == "long" else "buy"
+        sign = -1.0 if side == "long" else 1.0
+        orders = self.order_store.grid_orders()
+        spec = self.market_spec
+        for role, o_side, reduce_only, spacing, size_usdc, cid in (
+            ("add", add_side, False, float(add.get("spacing") or 0.0), float(add.get("size_usdc") or 0.0), add.get("client_id")),
+            ("tp", tp_side, True, float(tp.get("spacing") or 0.0), float(tp.get("size_usdc") or 0.0), tp.get("client_id")),
+        ):
+            live = match_live(DesiredOrder(role, o_side, required_ps, reduce_only), orders)
+            if len(live) != 1 or spacing <= 0 or size_usdc <= 0:
+                continue
+            rec = live[0]
+            step_sign = sign if role == "add" else -sign
+            price = spec.ticks_to_price(rec.price_tick) * (1.0 + step_sign * spacing)
+            qty = self.usdc_to_amount(size_usdc, price)
+            if qty is None:
+                continue
+            if reduce_only:
+                rest = float(pos) - float(rec.remaining or 0.0)
+                qty = self.round_amount_down(min(float(qty), rest)) if rest > 0 else None
+                if qty is None or float(qty) < float(self.min_order_amount or 0.0):
+                    continue
+            leg = self._prepare_limit_order(o_side, price, qty, reduce_only, side, cid)
+            if leg is None:
+                continue
+            self._fill_templates[str(rec.order_id)] = {
+                "role": role,
+                "side": side,
+                "tick": int(rec.price_tick),
+                "version": int(cfg.version),
+                "leg": leg,
+            }
 
-                    if need_tp:
-                        tp_price = float((plan.get("tp") or {}).get("price") or 0.0)
-                        tp_side = "sell" if side == "long" else "buy"
-                        if bool(need_update_tp):
-                            try:
-                                self.cancel_grid_orders_for_side(side, cancel_add=False, cancel_tp=True)
-                            except Exception:
-                                pass
-                            self.place_order(
-                                tp_side,
-                                price=tp_price,
-                                quantity=float(tp_qty),
-                                is_reduce_only=True,
-                                position_side=side,
-                                order_type="limit",
-                                client_order_id=desired_tp_id,
-                            )
+    def _fill_template_ready_locked(self, tpl: dict, filled_side: str, fill_price) -> bool:
+        """成交事件到达时确认预备好的下一笔订单仍然适用；条件不符返回 False，由补评估整体重挂"""
+        if self.shutdown_event.is_set() or bool(getattr(self, "is_grid_stopped", False)):
+            return False
+        sc = self.risk_engine.get_strategy_config()
+        if (not sc.fill_fast_path_enabled) or (not sc.grid_enabled) or int(tpl["version"]) != int(sc.version):
+            return False
+        if tpl["side"] != filled_side or str(self.direction or "long").strip().lower() != filled_side:
+            self._fill_fast_miss += 1
+            return False
+        # 模板按挂单价成交推算；成交均价偏离（穿价成交）时锚点不同，交给补评估
+        if fill_price is None or self.market_spec.price_to_ticks(float(fill_price)) != int(tpl["tick"]):
+            self._fill_fast_miss += 1
+            return False
+        leg = tpl["leg"]
+        if leg["reduce_only"]:
+            pos = float((self.long_position if filled_side == "long" else self.short_position) or 0.0)
+            if float(leg["qty"]) > pos + 1e-12:
+                self._fill_fast_miss += 1
+                return False
+        return True
 
-            self._force_orders_resync = False
+    async def _send_fill_template(self, tpl: dict, filled_side: str, enqueued_ts: float = None) -> bool:
+        """锁外发出已确认的模板订单"""
+        leg = tpl["leg"]
+        try:
+            o = await self.rest.call("fill_template", self._send_prepared_order, leg)
+        except Exception as e:
+            logger.error(f"成交快速补单失败: {e}")
+            o = None
+        if o is None:
+            self._fill_fast_miss += 1
+            return False
+        t0 = float(enqueued_ts) if enqueued_ts is not None else None
+        if t0 is not None:
+            ms = max(0.0, (time.perf_counter() - t0) * 1000.0)
+            self._fill_fast_last_ms = ms
+            self._fill_fast_total_ms += ms
+            if ms > self._fill_fast_max_ms:
+                self._fill_fast_max_ms = ms
+        self._fill_fast_count += 1
+        logger.info(f"成交快速补单: {filled_side} {tpl['role']} {leg['side']} {leg['qty']} @ {leg['price']}")
+        return True
+
+    def _level_desired_orders(self, table, side: str, position_side, reduce_only: bool) -> list:
+        """多层挂单表转为期望挂单；表为空时给出一笔空期望，撤掉该角色现存挂单"""
+        if not table:
+            return [DesiredOrder(table.role, side, position_side, reduce_only, None, None, None)]
+        spec = self.market_spec
+        return [
+            DesiredOrder(table.role, side, position_side, reduce_only, t, spec.lots_to_qty(q), cid, table.family)
+            for (t, q), cid in zip(table, table.client_ids())
+        ]
+
+    def _desired_leg(self, want: DesiredOrder, side: str, plan_prices=None) -> dict:
+        if plan_prices is not None:
+            price = float(plan_prices.get(want.role) or 0.0)
+        else:
+            price = self.market_spec.ticks_to_price(want.price_tick) if want.price_tick is not None else 0.0
+        return {
+            "side": want.side,
+            "price": price,
+            "quantity": float(want.qty or 0.0),
+            "is_reduce_only": bool(want.reduce_only),
+            "position_side": side,
+            "client_order_id": want.client_id,
+        }
 
     def cancel_all_open_orders(self):
         try:
             self._raw_cancel_all_open_orders_for_symbol()
         except Exception:
             pass
-        orders = self.exchange.fetch_open_orders(symbol=self.ccxt_symbol)
-        for order in orders:
-            oid = order.get("id")
-            if not oid:
-                continue
+        try:
+            self.check_orders_status()
+        except Exception:
+            pass
+        for rec in self.order_store.grid_orders():
             try:
-                self.cancel_order(oid)
+                self.cancel_order(rec.order_id)
             except Exception:
                 pass
         try:
@@ -4010,23 +4986,24 @@ class GridTradingBot:
                 os.remove(self._stop_flag_path)
         except Exception:
             pass
+        for ws in list(self._ws_links.values()):
+            try:
+                await ws.close()
+            except Exception:
+                pass
         try:
-            if self._ws is not None:
-                await self._ws.close()
-        except Exception:
-            pass
-        try:
-            self.cancel_all_open_orders()
+            await self.rest.call("shutdown_cancel_all", self.cancel_all_open_orders)
         except Exception:
             pass
         try:
-            self.flatten_all_positions_market()
+            await self.rest.call("shutdown_flatten", self.flatten_all_positions_market)
         except Exception:
             pass
         try:
-            self.cancel_all_open_orders()
+            await self.rest.call("shutdown_cancel_all", self.cancel_all_open_orders)
         except Exception:
             pass
+        self._shutdown_done.set()
         logger.info(f"已执行优雅退出: {reason}")
 
 
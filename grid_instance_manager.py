@@ -5,6 +5,8 @@ import subprocess
 import sys
 import time
 
+from file_watcher import FileWatcher
+
 
 def _safe_read_json(path: str) -> dict:
     try:
@@ -26,8 +28,7 @@ def _normalize_direction(value) -> str:
     return "long"
 
 
-def _direction_from_config(path: str) -> str:
-    cfg = _safe_read_json(path)
+def _direction_from_cfg(cfg: dict) -> str:
     grid = cfg.get("网格") if isinstance(cfg.get("网格"), dict) else {}
     direction = None
     if isinstance(grid, dict):
@@ -36,8 +37,8 @@ def _direction_from_config(path: str) -> str:
         direction = cfg.get("方向") or cfg.get("交易方向") or cfg.get("DIRECTION")
     return _normalize_direction(direction)
 
-def _enabled_from_config(path: str) -> bool:
-    cfg = _safe_read_json(path)
+
+def _enabled_from_cfg(cfg: dict) -> bool:
     inst = cfg.get("实例") if isinstance(cfg.get("实例"), dict) else {}
     v = None
     if isinstance(inst, dict):
@@ -56,12 +57,147 @@ def _enabled_from_config(path: str) -> bool:
     return True
 
 
+def _config_flags():
+    fixed_slots = os.getenv("GRID_FIXED_SLOTS", "").strip()
+    allow_any = os.getenv("GRID_ALLOW_ANY_CONFIG", "").strip()
+    fixed_enabled = True if fixed_slots == "" else (fixed_slots not in {"0", "false", "no", "off"})
+    allow_any_enabled = allow_any in {"1", "true", "yes", "on"}
+    return fixed_enabled, allow_any_enabled
+
+
+# SlotScanner 关心的状态目录标记文件
+FLAG_SUFFIXES = (".start", ".stop", ".restart", ".pid")
+
+
+class SlotScanner:
+    """槽位配置与 .start/.stop/.restart/.pid 标记的缓存视图，供多进程管理器与单进程运行时共用。
+
+    启动时全量扫描一次，之后只在文件监视器报告变化时重读对应文件：配置只解析一次取 启用/方向，
+    标记只记录是否存在，空闲时不再 listdir、不再读 JSON。
+    """
+
+    def __init__(self, configs_dir: str, status_dir: str, fixed_enabled: bool, allow_any_enabled: bool, poll_interval: float = 1.0):
+        self.configs_dir = os.path.abspath(configs_dir)
+        self.status_dir = os.path.abspath(status_dir)
+        self.fixed_enabled = bool(fixed_enabled)
+        self.allow_any_enabled = bool(allow_any_enabled)
+        self.watcher = FileWatcher(poll_interval)
+        self.watcher.watch_dir(self.configs_dir)
+        # 状态目录里还有每秒刷新的实例状态文件与每次 REST 请求都改写的 rest_budget.json，只关心标记文件
+        self.watcher.watch_dir(self.status_dir, suffixes=FLAG_SUFFIXES)
+        self._configs = {}
+        self._flags = set()
+        self.rescan()
+
+    def _config_wanted(self, name: str) -> bool:
+        if not name.lower().endswith(".json"):
+            return False
+        if self.fixed_enabled and (not self.allow_any_enabled):
+            return name.lower() in {"slot_01.json", "slot_02.json", "slot_03.json"}
+        return True
+
+    def _refresh_config(self, path: str):
+        if not self._config_wanted(os.path.basename(path)) or not os.path.isfile(path):
+            self._configs.pop(path, None)
+            return
+        cfg = _safe_read_json(path)
+        self._configs[path] = {"enabled": _enabled_from_cfg(cfg), "direction": _direction_from_cfg(cfg)}
+
+    def _refresh_flag(self, name: str):
+        if os.path.exists(os.path.join(self.status_dir, name)):
+            self._flags.add(name)
+        else:
+            self._flags.discard(name)
+
+    def rescan(self):
+        self._configs = {}
+        try:
+            names = os.listdir(self.configs_dir)
+        except Exception:
+            names = []
+        for name in names:
+            self._refresh_config(os.path.join(self.configs_dir, name))
+        try:
+            self._flags = {n for n in os.listdir(self.status_dir) if n.endswith(FLAG_SUFFIXES)}
+        except Exception:
+            self._flags = set()
+
+    def apply(self, changes) -> bool:
+        if not changes:
+            return False
+        if self.configs_dir in changes or self.status_dir in changes:
+            self.rescan()
+            return True
+        for path in changes:
+            parent = os.path.dirname(path)
+            if parent == self.configs_dir:
+                self._refresh_config(path)
+            elif parent == self.status_dir and path.endswith(FLAG_SUFFIXES):
+                self._refresh_flag(os.path.basename(path))
+        return True
+
+    def poll(self, timeout: float = 0.0) -> bool:
+        """最多等待 timeout 秒，有文件变化时提前返回 True"""
+        return self.apply(self.watcher.poll(timeout))
+
+    async def wait(self, timeout: float = None, stop_event=None) -> bool:
+        return self.apply(await self.watcher.wait(timeout=timeout, stop_event=stop_event))
+
+    def has_flag(self, name: str) -> bool:
+        return name in self._flags
+
+    def clear_flag(self, name: str):
+        try:
+            os.remove(os.path.join(self.status_dir, name))
+        except Exception:
+            pass
+        self._flags.discard(name)
+
+    def desired(self) -> dict:
+        """返回应运行的配置 {path: {"direction": ...}}：已启用、有 .start 标记且没有 .stop 标记。"""
+        out = {}
+        for path, meta in self._configs.items():
+            if not meta["enabled"]:
+                continue
+            sid = os.path.splitext(os.path.basename(path))[0]
+            if f"{sid}.start" not in self._flags or f"{sid}.stop" in self._flags:
+                continue
+            out[path] = {"direction": meta["direction"]}
+        return out
+
+    def close(self):
+        self.watcher.close()
+
+
 def _python_exe() -> str:
     return sys.executable or "python"
 
 
-def _spawn_instance(config_path: str, direction: str) -> subprocess.Popen:
+def _market_hub_addr():
+    v = os.getenv("GRID_MARKET_HUB", "1").strip().lower()
+    if v in {"0", "false", "no", "off"}:
+        return None
+    return os.getenv("MARKET_DATA_HUB_ADDR", "").strip() or "127.0.0.1:18765"
+
+
+def _spawn_market_hub(addr: str) -> subprocess.Popen:
+    env = os.environ.copy()
+    env["MARKET_DATA_HUB_ADDR"] = str(addr)
+    creationflags = 0
+    if os.name == "nt":
+        creationflags = subprocess.CREATE_NEW_PROCESS_GROUP
+    return subprocess.Popen(
+        [_python_exe(), "market_data_hub.py"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        creationflags=creationflags,
+    )
+
+
+def _spawn_instance(config_path: str, direction: str, hub_addr: str = None) -> subprocess.Popen:
     env = os.environ.copy()
+    if hub_addr:
+        env["MARKET_DATA_HUB_ADDR"] = str(hub_addr)
     env["STRATEGY_CONFIG_PATH"] = os.path.abspath(config_path)
     env["STRATEGY_DIRECTION"] = str(direction)
     env["INSTANCE_ID"] = os.path.splitext(os.path.basename(config_path))[0]
@@ -120,11 +256,10 @@ def main():
     if scan_interval_sec <= 0:
         scan_interval_sec = 1.0
 
-    fixed_slots = os.getenv("GRID_FIXED_SLOTS", "").strip()
-    allow_any = os.getenv("GRID_ALLOW_ANY_CONFIG", "").strip()
-    fixed_enabled = True if fixed_slots == "" else (fixed_slots not in {"0", "false", "no", "off"})
-    allow_any_enabled = allow_any in {"1", "true", "yes", "on"}
+    fixed_enabled, allow_any_enabled = _config_flags()
 
+    hub_addr = _market_hub_addr()
+    hub_proc = None
     procs = {}
     proc_meta = {}
     stop_deadlines = {}
@@ -136,6 +271,8 @@ def main():
             os.remove(os.path.join(status_dir, f"{sid}.start"))
         except Exception:
             pass
+    # 配置与标记变化由文件监视器推送；scan_interval_sec 只作为子进程存活检查的最长间隔
+    scanner = SlotScanner(configs_dir, status_dir, fixed_enabled, allow_any_enabled, scan_interval_sec)
 
     def _pid_path_for_config(path: str) -> str:
         sid = os.path.splitext(os.path.basename(path))[0]
@@ -159,10 +296,6 @@ def main():
         sid = os.path.splitext(os.path.basename(path))[0]
         return os.path.join(status_dir, f"{sid}.restart")
 
-    def _start_flag_path_for_config(path: str) -> str:
-        sid = os.path.splitext(os.path.basename(path))[0]
-        return os.path.join(status_dir, f"{sid}.start")
-
     def _pid_exists(pid: int) -> bool:
         if pid is None:
             return False
@@ -215,41 +348,17 @@ def main():
             pass
 
     while not stopping:
-        try:
-            files = []
-            for name in os.listdir(configs_dir):
-                if not name.lower().endswith(".json"):
-                    continue
-                if fixed_enabled and (not allow_any_enabled):
-                    low = name.lower()
-                    if low not in {"slot_01.json", "slot_02.json", "slot_03.json"}:
-                        continue
-                files.append(os.path.join(configs_dir, name))
-        except Exception:
-            files = []
-
-        desired = {}
-        for path in files:
-            try:
-                os.stat(path)
-            except Exception:
-                continue
-            if not _enabled_from_config(path):
-                continue
-            if not os.path.exists(_start_flag_path_for_config(path)):
-                continue
+        # 行情中心随管理进程启动，退出后自动拉起；槽位进程在中心不可用时自行直连
+        if hub_addr and (hub_proc is None or hub_proc.poll() is not None):
             try:
-                sid = os.path.splitext(os.path.basename(path))[0]
-                if os.path.exists(os.path.join(status_dir, f"{sid}.stop")):
-                    continue
+                hub_proc = _spawn_market_hub(hub_addr)
             except Exception:
-                pass
-            direction = _direction_from_config(path)
-            desired[path] = {"direction": direction}
+                hub_proc = None
+        desired = scanner.desired()
 
         for name in ("slot_01.pid", "slot_02.pid", "slot_03.pid"):
             pid_path = os.path.join(status_dir, name)
-            if not os.path.exists(pid_path):
+            if not scanner.has_flag(name):
                 continue
             cfg_path = os.path.join(configs_dir, name.replace(".pid", ".json"))
             if cfg_path in desired:
@@ -259,23 +368,14 @@ def main():
                 continue
             pid = _read_pid(pid_path)
             if pid is None:
-                try:
-                    os.remove(pid_path)
-                except Exception:
-                    pass
+                scanner.clear_flag(name)
                 continue
             if not _pid_exists(pid):
-                try:
-                    os.remove(pid_path)
-                except Exception:
-                    pass
+                scanner.clear_flag(name)
                 continue
             _kill_pid(pid)
             if not _pid_exists(pid):
-                try:
-                    os.remove(pid_path)
-                except Exception:
-                    pass
+                scanner.clear_flag(name)
 
         for path, meta in list(proc_meta.items()):
             if path not in desired:
@@ -301,7 +401,7 @@ def main():
 
         for path, d in list(desired.items()):
             flag_path = _restart_flag_path_for_config(path)
-            if not os.path.exists(flag_path):
+            if not scanner.has_flag(os.path.basename(flag_path)):
                 continue
             proc = procs.get(path)
             if proc is not None and proc.poll() is None:
@@ -309,29 +409,18 @@ def main():
                 procs.pop(path, None)
                 proc_meta.pop(path, None)
                 stop_deadlines.pop(path, None)
-            try:
-                os.remove(flag_path)
-            except Exception:
-                pass
+            scanner.clear_flag(os.path.basename(flag_path))
 
         for path, d in desired.items():
             proc = procs.get(path)
             if proc is not None and proc.poll() is None:
                 continue
-            try:
-                sid = os.path.splitext(os.path.basename(path))[0]
-                stop_flag = os.path.join(status_dir, f"{sid}.stop")
-                if os.path.exists(stop_flag):
-                    os.remove(stop_flag)
-            except Exception:
-                pass
-            try:
-                flag_path = _restart_flag_path_for_config(path)
-                if os.path.exists(flag_path):
-                    os.remove(flag_path)
-            except Exception:
-                pass
-            procs[path] = _spawn_instance(path, d["direction"])
+            sid = os.path.splitext(os.path.basename(path))[0]
+            if scanner.has_flag(f"{sid}.stop"):
+                scanner.clear_flag(f"{sid}.stop")
+            if scanner.has_flag(f"{sid}.restart"):
+                scanner.clear_flag(f"{sid}.restart")
+            procs[path] = _spawn_instance(path, d["direction"], hub_addr)
             try:
                 _write_pid(_pid_path_for_config(path), procs[path].pid)
             except Exception:
@@ -339,7 +428,7 @@ def main():
             proc_meta[path] = {"direction": d["direction"]}
             stop_deadlines.pop(path, None)
 
-        time.sleep(scan_interval_sec)
+        scanner.poll(scan_interval_sec)
 
     for path, proc in list(procs.items()):
         _stop_process(proc)
@@ -349,6 +438,8 @@ def main():
             os.remove(_pid_path_for_config(path))
         except Exception:
             pass
+    _stop_process(hub_proc, timeout_sec=10.0)
+    scanner.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+import math
+
+try:
+    import numpy as _np
+except Exception:
+    _np = None
+
+# 多层挂单 client id 的层后缀分隔符（Binance 允许 . : / _ -）；前缀部分为同一组网格参数的“家族” id
+LEVEL_ID_SEP = "."
+
+
+def _base36(n: int) -> str:
+    n = int(n)
+    if n <= 0:
+        return "0"
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = []
+    while n:
+        n, r = divmod(n, 36)
+        out.append(digits[r])
+    return "".join(reversed(out))
+
+
+def level_client_id(family: str, tick: int) -> str:
+    """按价格 tick 区分同一家族下的各层：锚点平移一整格时，留在原价位的挂单 client id 不变"""
+    return f"{family}{LEVEL_ID_SEP}{_base36(tick)}"[:36]
+
+
+class LevelTable:
+    """一个角色（add/tp）的多层挂单表：按离锚点由近到远排列的 (价格 tick, 数量 lot)。
+
+    family 为该组网格参数的 client id，各层 client id 为 family 加价格 tick 后缀。
+    """
+
+    __slots__ = ("role", "ticks", "lots", "family")
+
+    def __init__(self, role: str, ticks=(), lots=(), family: str = None):
+        self.role = str(role)
+        self.ticks = tuple(int(t) for t in ticks)
+        self.lots = tuple(int(q) for q in lots)
+        self.family = str(family) if family else None
+
+    def client_ids(self) -> list:
+        if not self.family:
+            return [None] * len(self.ticks)
+        return [level_client_id(self.family, t) for t in self.ticks]
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def __bool__(self):
+        return bool(self.ticks)
+
+    def __iter__(self):
+        return iter(zip(self.ticks, self.lots))
+
+    def __eq__(self, other):
+        return isinstance(other, LevelTable) and (self.role, self.ticks, self.lots) == (other.role, other.ticks, other.lots)
+
+    def __hash__(self):
+        return hash((self.role, self.ticks, self.lots))
+
+    def __repr__(self):
+        return f"LevelTable({self.role}, {list(self)})"
+
+
+def _prices(anchor: float, spacing: float, count: int, sign: int, geometric: bool):
+    """第 1..count 层价格；sign=-1 向下（多头加仓/空头止盈），+1 向上"""
+    if _np is not None:
+        i = _np.arange(1, count + 1, dtype=_np.float64)
+        if geometric:
+            return anchor * _np.power(1.0 + sign * spacing, i)
+        return anchor * (1.0 + sign * spacing * i)
+    if geometric:
+        step = 1.0 + sign * spacing
+        return [anchor * (step ** i) for i in range(1, count + 1)]
+    return [anchor * (1.0 + sign * spacing * i) for i in range(1, count + 1)]
+
+
+def _sizes(size_usdc: float, size_mult: float, count: int):
+    if _np is not None:
+        return size_usdc * _np.power(float(size_mult), _np.arange(count, dtype=_np.float64))
+    return [size_usdc * (float(size_mult) ** i) for i in range(count)]
+
+
+def _to_ticks_lots(spec, prices, sizes):
+    """价格取最近 tick，数量取最近 lot；与 usdc_to_amount 一致地补足最小数量与最小名义"""
+    tick = float(spec.tick_size)
+    step = float(spec.step_size)
+    cs = float(spec.contract_size or 1.0)
+    min_lots = int(spec.min_lots()) if float(spec.min_qty or 0.0) > 0 else 0
+    min_notional = float(spec.min_notional or 0.0)
+    if _np is not None:
+        ticks = _np.rint(prices / tick).astype(_np.int64)
+        tick_px = ticks * tick
+        denom = _np.where(tick_px > 0, tick_px * cs, 1.0)
+        lots = _np.rint(sizes / denom / step).astype(_np.int64)
+        if min_lots > 0:
+            # 最小数量的名义超出该层金额 5% 以上时放弃该层，否则补到最小数量
+            short = lots < min_lots
+            too_small = short & ((min_lots * step * denom) > sizes * 1.05)
+            lots = _np.where(short, min_lots, lots)
+            lots = _np.where(too_small, 0, lots)
+        if min_notional > 0:
+            need = _np.ceil(min_notional / denom / step - 1e-9).astype(_np.int64)
+            lots = _np.where(lots > 0, _np.maximum(lots, need), lots)
+        lots = _np.where(ticks > 0, lots, 0)
+        return ticks.tolist(), lots.tolist()
+    ticks = []
+    lots = []
+    for price, usdc in zip(prices, sizes):
+        t = int(round(price / tick))
+        denom = t * tick * cs
+        if t <= 0 or denom <= 0:
+            ticks.append(t)
+            lots.append(0)
+            continue
+        q = int(round(usdc / denom / step))
+        if min_lots > 0 and q < min_lots:
+            q = 0 if (min_lots * step * denom) > usdc * 1.05 else min_lots
+        if min_notional > 0 and q > 0:
+            q = max(q, int(math.ceil(min_notional / denom / step - 1e-9)))
+        ticks.append(t)
+        lots.append(q)
+    return ticks, lots
+
+
+def build_levels(
+    spec,
+    role: str,
+    anchor: float,
+    spacing: float,
+    count: int,
+    sign: int,
+    geometric: bool = True,
+    size_usdc: float = 0.0,
+    size_mult: float = 1.0,
+    max_lots: int = None,
+    family: str = None,
+) -> LevelTable:
+    """由锚点一次性生成 count 层挂单。
+
+    等比（geometric）第 i 层价格为 anchor*(1±spacing)^i，锚点移到任一层价格后其余层价位不变；
+    等差为 anchor*(1±i*spacing)。第 i 层金额为 size_usdc*size_mult^(i-1)。
+    折算后价格重复（间距小于一个 tick）或数量为 0 的层去掉；max_lots 给出时按层累计截断
+    （止盈单合计不超过持仓），剩余不足最小数量即停止。
+    """
+    n = int(count or 0)
+    a = float(anchor or 0.0)
+    if n <= 0 or a <= 0 or float(spacing or 0.0) <= 0 or float(size_usdc or 0.0) <= 0:
+        return LevelTable(role, family=family)
+    prices = _prices(a, float(spacing), n, -1 if int(sign) < 0 else 1, bool(geometric))
+    sizes = _sizes(float(size_usdc), float(size_mult or 1.0), n)
+    ticks, lots = _to_ticks_lots(spec, prices, sizes)
+    remaining = None if max_lots is None else max(0, int(max_lots))
+    min_lots = max(1, int(spec.min_lots()))
+    min_notional = float(spec.min_notional or 0.0)
+    unit = float(spec.tick_size) * float(spec.step_size) * float(spec.contract_size or 1.0)
+    out_t = []
+    out_q = []
+    seen = set()
+    for t, q in zip(ticks, lots):
+        if t <= 0 or q <= 0 or t in seen:
+            continue
+        if remaining is not None:
+            q = min(q, remaining)
+            if q < min_lots or (min_notional > 0 and q * t * unit < min_notional):
+                break
+            remaining -= q
+        seen.add(t)
+        out_t.append(t)
+        out_q.append(q)
+    return LevelTable(role, out_t, out_q, family)
@@ -0,0 +1,391 @@
+import asyncio
+import json
+import os
+import signal
+import time
+
+import websockets
+
+import grid_Stablize_BN_DB01 as core
+from grid_instance_manager import SlotScanner, _config_flags
+from rest_gateway import RestGateway
+from ws_events import AccountUpdate, BookTicker, decode_frame
+
+# 单进程多实例运行时：同一账户的实例共享交易所客户端、listenKey 和一条 WebSocket
+logger = core.logger
+
+
+def _credentials(account_mode: str):
+    if account_mode in {"testnet", "paper", "sim"}:
+        return core.TESTNET_API_KEY, core.TESTNET_API_SECRET
+    return core.API_KEY, core.API_SECRET
+
+
+def _symbol_of(bot) -> str:
+    return f"{bot.coin_name}{bot.contract_type}".upper()
+
+
+class AccountSession:
+    """一个账户一条连接：订阅该账户 listenKey 与所有实例交易对的 bookTicker，按交易对/客户端 ID 分发。"""
+
+    def __init__(self, account_mode: str, api_key: str, api_secret: str):
+        self.account_mode = str(account_mode or "").strip().lower()
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.websocket_url = core.websocket_url_for(self.account_mode)
+        self.rest = RestGateway(2, name=f"session-{self.account_mode}")
+        self.exchange = None
+        self.listen_key = None
+        self.bots = []
+        self._by_symbol = {}
+        self._ws = None
+        self._streams = set()
+        self._next_id = 1
+        self._task = None
+        self._keepalive_task = None
+        self.stop_event = asyncio.Event()
+        self.frames = 0
+        self.routed = 0
+        self.unrouted = 0
+
+    async def start(self):
+        self.exchange = await self.rest.call("create_exchange", core.create_exchange, self.api_key, self.api_secret, self.account_mode)
+        self.listen_key = await self.rest.call("listen_key", self._fetch_listen_key)
+        self._task = asyncio.create_task(self._stream_loop())
+        self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+
+    async def close(self):
+        self.stop_event.set()
+        for t in (self._task, self._keepalive_task):
+            if t is not None:
+                t.cancel()
+        try:
+            if self._ws is not None:
+                await self._ws.close()
+        except Exception:
+            pass
+        ws_api = getattr(self.exchange, "ws_order_api", None)
+        if ws_api is not None:
+            await ws_api.close()
+        self.rest.close(wait=False)
+
+    def _fetch_listen_key(self):
+        response = self.exchange.fapiPrivatePostListenKey()
+        key = (response or {}).get("listenKey")
+        if not key:
+            raise ValueError("获取的 listenKey 为空")
+        return key
+
+    async def _keepalive_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                await asyncio.sleep(1800)
+                await self.rest.call("listen_key_keepalive", self.exchange.fapiPrivatePutListenKey)
+                key = await self.rest.call("listen_key", self._fetch_listen_key)
+                if key != self.listen_key:
+                    old = self.listen_key
+                    self.listen_key = key
+                    await self._send_method("SUBSCRIBE", [key])
+                    if old:
+                        await self._send_method("UNSUBSCRIBE", [old])
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[{self.account_mode}] 更新 listenKey 失败: {e}")
+
+    # ---------- 实例增删 ----------
+
+    async def add_bot(self, bot):
+        self.bots.append(bot)
+        sym = _symbol_of(bot)
+        self._by_symbol.setdefault(sym, []).append(bot)
+        stream = f"{sym.lower()}@bookTicker"
+        if stream not in self._streams:
+            self._streams.add(stream)
+            await self._send_method("SUBSCRIBE", [stream])
+
+    async def remove_bot(self, bot):
+        try:
+            self.bots.remove(bot)
+        except ValueError:
+            return
+        sym = _symbol_of(bot)
+        group = self._by_symbol.get(sym) or []
+        if bot in group:
+            group.remove(bot)
+        if group:
+            return
+        self._by_symbol.pop(sym, None)
+        stream = f"{sym.lower()}@bookTicker"
+        self._streams.discard(stream)
+        await self._send_method("UNSUBSCRIBE", [stream])
+
+    async def _send_method(self, method: str, params):
+        ws = self._ws
+        if ws is None or not params:
+            return
+        payload = {"method": method, "params": list(params), "id": self._next_id}
+        self._next_id += 1
+        try:
+            await ws.send(json.dumps(payload))
+        except Exception as e:
+            logger.warning(f"[{self.account_mode}] 发送 {method} 失败: {e}")
+
+    # ---------- 连接与分发 ----------
+
+    async def _stream_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                async with websockets.connect(self.websocket_url) as ws:
+                    self._ws = ws
+                    params = sorted(self._streams)
+                    if self.listen_key:
+                        params.append(self.listen_key)
+                    await self._send_method("SUBSCRIBE", params)
+                    # 重连期间可能丢失订单事件，所有实例的挂单簿待对账
+                    for bot in list(self.bots):
+                        bot.order_store.stale = True
+                    async for message in ws:
+                        self.frames += 1
+                        try:
+                            ev = decode_frame(message)
+                        except Exception:
+                            continue
+                        if ev is not None:
+                            await self._route(ev)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                if self.stop_event.is_set():
+                    break
+                logger.error(f"[{self.account_mode}] 共享 WebSocket 连接失败: {e}")
+            finally:
+                self._ws = None
+            if not self.stop_event.is_set():
+                await asyncio.sleep(5)
+
+    def _targets(self, ev):
+        if isinstance(ev, AccountUpdate):
+            # 各实例 PositionBook 只取自己交易对的持仓
+            return list(self.bots)
+        group = self._by_symbol.get(ev.symbol) or []
+        if len(group) <= 1 or isinstance(ev, BookTicker):
+            return list(group)
+        owners = [b for b in group if b.owns_order_event(ev.o)]
+        # 无法判定归属时与多进程模式一致：同交易对实例都收到
+        return owners or list(group)
+
+    async def _route(self, ev):
+        targets = self._targets(ev)
+        if not targets:
+            self.unrouted += 1
+            return
+        self.routed += 1
+        for bot in targets:
+            if bot.shutdown_event.is_set():
+                continue
+            try:
+                await bot.dispatch_event(ev)
+            except Exception as e:
+                logger.error(f"[{bot.instance_id}] 分发事件失败: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "account_mode": self.account_mode,
+            "instances": [b.instance_id for b in self.bots],
+            "streams": sorted(self._streams),
+            "connected": self._ws is not None,
+            "frames": int(self.frames),
+            "routed": int(self.routed),
+            "unrouted": int(self.unrouted),
+        }
+
+
+class GridRuntime:
+    """按 configs 目录与 .start/.stop/.restart 标记管理实例，语义与 grid_instance_manager 相同。"""
+
+    def __init__(self, configs_dir: str, status_dir: str, scan_interval_sec: float = 1.0):
+        self.configs_dir = configs_dir
+        self.status_dir = status_dir
+        self.scan_interval_sec = float(scan_interval_sec)
+        self.fixed_enabled, self.allow_any_enabled = _config_flags()
+        self.scanner = SlotScanner(configs_dir, status_dir, self.fixed_enabled, self.allow_any_enabled, self.scan_interval_sec)
+        self.sessions = {}
+        self.slots = {}
+        self.stop_event = asyncio.Event()
+
+    def _sid(self, path: str) -> str:
+        return os.path.splitext(os.path.basename(path))[0]
+
+    async def _session_for(self, account_mode: str) -> AccountSession:
+        sess = self.sessions.get(account_mode)
+        if sess is None:
+            key, secret = _credentials(account_mode)
+            sess = AccountSession(account_mode, key, secret)
+            await sess.start()
+            self.sessions[account_mode] = sess
+        return sess
+
+    async def _start_slot(self, path: str, direction: str):
+        sid = self._sid(path)
+        account_mode = core._get_account_mode(path)
+        params = core._get_strategy_params(path)
+        sess = await self._session_for(account_mode)
+
+        def _build():
+            return core.GridTradingBot(
+                sess.api_key,
+                sess.api_secret,
+                params["coin_name"],
+                params["contract_type"],
+                core.GRID_SPACING,
+                core.INITIAL_QUANTITY,
+                core.LEVERAGE,
+                account_mode,
+                params["rest_sync_interval_sec"],
+                params["order_first_time_sec"],
+                exchange=sess.exchange,
+                strategy_config_path=path,
+                instance_id=sid,
+                direction=direction,
+                external_streams=True,
+            )
+
+        # 构造函数含同步 REST（杠杆、持仓模式等），放到线程池避免阻塞其它实例
+        bot = await sess.rest.call(f"create_bot:{sid}", _build)
+        await sess.add_bot(bot)
+        task = asyncio.create_task(self._run_slot(sess, bot))
+        self.slots[path] = {"bot": bot, "task": task, "session": sess, "stop_deadline": None, "stopping": None}
+        try:
+            with open(os.path.join(self.status_dir, f"{sid}.pid"), "w", encoding="utf-8") as f:
+                f.write(str(os.getpid()))
+        except Exception:
+            pass
+        logger.info(f"[{sid}] 实例已启动: {params['coin_name']}{params['contract_type']} {direction} ({account_mode})")
+
+    async def _run_slot(self, sess: AccountSession, bot):
+        try:
+            await bot.run()
+        except Exception as e:
+            logger.error(f"[{bot.instance_id}] 实例异常退出: {e}")
+        finally:
+            await sess.remove_bot(bot)
+            try:
+                os.remove(os.path.join(self.status_dir, f"{bot.instance_id}.pid"))
+            except Exception:
+                pass
+
+    def _stop_slot(self, path: str, reason: str):
+        """发起实例退出；槽位保留到任务结束，期间不会被重新拉起，也不阻塞其它实例。"""
+        slot = self.slots.get(path)
+        if slot is None or slot["stopping"] is not None:
+            return
+        slot["stopping"] = asyncio.create_task(slot["bot"].shutdown(reason))
+
+    async def _reconcile(self):
+        desired = self.scanner.desired()
+
+        for path, slot in list(self.slots.items()):
+            if slot["task"].done():
+                self.slots.pop(path, None)
+                continue
+            if slot["stopping"] is not None:
+                continue
+            if path in desired:
+                slot["stop_deadline"] = None
+                continue
+            # 与多进程模式相同：先给实例自行响应停止标记/停用的时间，超时再强制退出
+            if slot["stop_deadline"] is None:
+                grace = float(os.getenv("GRID_SOFT_STOP_GRACE_SEC", "45") or 45.0)
+                slot["stop_deadline"] = time.time() + (grace if grace > 0 else 45.0)
+            if time.time() >= float(slot["stop_deadline"]):
+                self._stop_slot(path, "runtime_stop")
+
+        for path in list(desired.keys()):
+            flag = f"{self._sid(path)}.restart"
+            if not self.scanner.has_flag(flag):
+                continue
+            if path in self.slots:
+                self._stop_slot(path, "restart")
+            self.scanner.clear_flag(flag)
+
+        for path, d in desired.items():
+            if path in self.slots:
+                continue
+            stop_flag = f"{self._sid(path)}.stop"
+            if self.scanner.has_flag(stop_flag):
+                self.scanner.clear_flag(stop_flag)
+            try:
+                await self._start_slot(path, d["direction"])
+            except Exception as e:
+                logger.error(f"[{self._sid(path)}] 实例启动失败: {e}")
+
+    async def run(self):
+        while not self.stop_event.is_set():
+            try:
+                await self._reconcile()
+            except Exception as e:
+                logger.error(f"运行时巡检失败: {e}")
+            # 标记/配置变化即时唤醒；超时只用于宽限期到期与实例任务结束的检查
+            await self.scanner.wait(timeout=self.scan_interval_sec, stop_event=self.stop_event)
+        for path in list(self.slots.keys()):
+            self._stop_slot(path, "runtime_shutdown")
+        tasks = [slot["task"] for slot in self.slots.values()]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=120.0)
+            for t in pending:
+                t.cancel()
+        for sess in list(self.sessions.values()):
+            await sess.close()
+        self.scanner.close()
+
+
+def main():
+    base = os.path.dirname(os.path.abspath(__file__))
+    configs_dir = os.path.abspath(os.getenv("GRID_CONFIG_DIR", "").strip() or os.path.join(base, "configs"))
+    status_dir = os.path.join(base, "status")
+    os.makedirs(configs_dir, exist_ok=True)
+    os.makedirs(status_dir, exist_ok=True)
+    scan_interval_sec = float(os.getenv("GRID_MANAGER_SCAN_INTERVAL_SEC", "1") or 1.0)
+    if scan_interval_sec <= 0:
+        scan_interval_sec = 1.0
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    runtime = GridRuntime(configs_dir, status_dir, scan_interval_sec)
+
+    def _handle(*_args):
+        loop.call_soon_threadsafe(runtime.stop_event.set)
+
+    for sig in (getattr(signal, "SIGINT", None), getattr(signal, "SIGTERM", None), getattr(signal, "SIGBREAK", None)):
+        if sig is None:
+            continue
+        try:
+            signal.signal(sig, _handle)
+        except Exception:
+            pass
+    try:
+        loop.run_until_complete(runtime.run())
+    except KeyboardInterrupt:
+        runtime.stop_event.set()
+        try:
+            loop.run_until_complete(runtime.run())
+        except Exception:
+            pass
+    finally:
+        try:
+            pending = asyncio.all_tasks(loop)
+            for t in pending:
+                t.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        except Exception:
+            pass
+        try:
+            loop.close()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+
+import websockets
+
+from ws_events import BookTicker, decode_frame
+
+# 行情中心：所有槽位进程共用一条上游 bookTicker 连接，解析一次后按行广播给本地订阅者
+MARKET_DATA_HUB_HOST = "127.0.0.1"
+MARKET_DATA_HUB_PORT = 18765
+# 单个订阅者写缓冲超过该值时只保留每个交易对的最新报价
+CLIENT_MAX_BUFFER_BYTES = 64 * 1024
+
+logger = logging.getLogger("market_data_hub")
+
+
+def hub_addr_from_env():
+    """读取 MARKET_DATA_HUB_ADDR（host:port），未配置时返回 None。"""
+    raw = str(os.getenv("MARKET_DATA_HUB_ADDR") or "").strip()
+    if not raw:
+        return None
+    host, _, port = raw.rpartition(":")
+    try:
+        return (host or MARKET_DATA_HUB_HOST), int(port)
+    except Exception:
+        return None
+
+
+def format_quote_line(ev: BookTicker) -> bytes:
+    # 空格分隔纯文本，订阅端 split 即可还原，无需再做 JSON 解析
+    return (
+        f"Q {ev.symbol} {ev.bid!r} {ev.bid_qty!r} {ev.ask!r} {ev.ask_qty!r} "
+        f"{int(ev.update_id)} {int(ev.event_ts)} {int(ev.trans_ts)}\n"
+    ).encode("ascii")
+
+
+def parse_quote_line(line):
+    """解析行情中心推送的一行报价，格式不符返回 None。"""
+    if isinstance(line, (bytes, bytearray)):
+        line = bytes(line).decode("ascii", "replace")
+    parts = line.split()
+    if len(parts) != 9 or parts[0] != "Q":
+        return None
+    try:
+        return BookTicker(
+            parts[1],
+            float(parts[2]),
+            float(parts[3]),
+            float(parts[4]),
+            float(parts[5]),
+            int(parts[6]),
+            int(parts[7]),
+            int(parts[8]),
+        )
+    except ValueError:
+        return None
+
+
+class _Client:
+    __slots__ = ("writer", "keys", "pending", "wakeup", "sent", "coalesced")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.keys = set()
+        self.pending = {}
+        self.wakeup = asyncio.Event()
+        self.sent = 0
+        self.coalesced = 0
+
+
+class _Upstream:
+    __slots__ = ("url", "ws", "symbols", "task", "next_id", "frames", "quotes")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.ws = None
+        self.symbols = set()
+        self.task = None
+        self.next_id = 1
+        self.frames = 0
+        self.quotes = 0
+
+
+class MarketDataHub:
+    """每个 WebSocket 地址维护一条上游连接，订阅集合随本地客户端增减。"""
+
+    def __init__(self, host: str = MARKET_DATA_HUB_HOST, port: int = MARKET_DATA_HUB_PORT):
+        self.host = host
+        self.port = int(port)
+        self._upstreams = {}
+        self._subscribers = {}
+        self._latest = {}
+        self._clients = set()
+        self._server = None
+        self.stop_event = asyncio.Event()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        logger.info(f"行情中心已监听 {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        try:
+            await self.stop_event.wait()
+        finally:
+            await self.close()
+
+    async def close(self):
+        self.stop_event.set()
+        if self._server is not None:
+            self._server.close()
+            try:
+                await self._server.wait_closed()
+            except Exception:
+                pass
+        for up in list(self._upstreams.values()):
+            if up.task is not None:
+                up.task.cancel()
+        for c in list(self._clients):
+            try:
+                c.writer.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._clients),
+            "upstreams": {
+                up.url: {"symbols": sorted(up.symbols), "connected": up.ws is not None, "frames": up.frames, "quotes": up.quotes}
+                for up in self._upstreams.values()
+            },
+        }
+
+    # ---------- 上游 ----------
+
+    async def _send_method(self, up: _Upstream, method: str, symbols):
+        ws = up.ws
+        if ws is None or not symbols:
+            return
+        payload = {"method": method, "params": [f"{s.lower()}@bookTicker" for s in sorted(symbols)], "id": up.next_id}
+        up.next_id += 1
+        await ws.send(json.dumps(payload))
+        logger.info(f"上游 {up.url} {method}: {payload['params']}")
+
+    async def _upstream_loop(self, up: _Upstream):
+        backoff = 1.0
+        while not self.stop_event.is_set():
+            try:
+                async with websockets.connect(up.url) as ws:
+                    up.ws = ws
+                    backoff = 1.0
+                    await self._send_method(up, "SUBSCRIBE", up.symbols)
+                    async for message in ws:
+                        up.frames += 1
+                        try:
+                            ev = decode_frame(message)
+                        except Exception:
+                            continue
+                        if isinstance(ev, BookTicker):
+                            up.quotes += 1
+                            self._publish(up.url, ev)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                if self.stop_event.is_set():
+                    break
+                logger.error(f"上游 {up.url} 连接异常: {e}")
+            finally:
+                up.ws = None
+            if self.stop_event.is_set():
+                break
+            await asyncio.sleep(backoff)
+            backoff = min(30.0, backoff * 2.0)
+
+    def _publish(self, url: str, ev: BookTicker):
+        key = (url, str(ev.symbol or "").upper())
+        line = format_quote_line(ev)
+        self._latest[key] = line
+        for c in self._subscribers.get(key, ()):
+            if key in c.pending:
+                c.coalesced += 1
+            c.pending[key] = line
+            c.wakeup.set()
+
+    # ---------- 订阅者 ----------
+
+    async def _subscribe(self, c: _Client, url: str, symbol: str):
+        key = (url, symbol)
+        if key in c.keys:
+            return
+        c.keys.add(key)
+        self._subscribers.setdefault(key, set()).add(c)
+        up = self._upstreams.get(url)
+        if up is None:
+            up = _Upstream(url)
+            self._upstreams[url] = up
+            up.task = asyncio.create_task(self._upstream_loop(up))
+        if symbol not in up.symbols:
+            up.symbols.add(symbol)
+            try:
+                await self._send_method(up, "SUBSCRIBE", [symbol])
+            except Exception as e:
+                logger.error(f"上游 {url} 订阅 {symbol} 失败: {e}")
+        # 新订阅者立即拿到最近一笔报价
+        line = self._latest.get(key)
+        if line is not None:
+            c.pending[key] = line
+            c.wakeup.set()
+
+    async def _unsubscribe_all(self, c: _Client):
+        for key in list(c.keys):
+            subs = self._subscribers.get(key)
+            if subs is not None:
+                subs.discard(c)
+                if subs:
+                    continue
+                self._subscribers.pop(key, None)
+            url, symbol = key
+            up = self._upstreams.get(url)
+            if up is None or symbol not in up.symbols:
+                continue
+            up.symbols.discard(symbol)
+            self._latest.pop(key, None)
+            try:
+                await self._send_method(up, "UNSUBSCRIBE", [symbol])
+            except Exception:
+                pass
+        c.keys.clear()
+
+    async def _writer_loop(self, c: _Client):
+        writer = c.writer
+        while not self.stop_event.is_set():
+            await c.wakeup.wait()
+            c.wakeup.clear()
+            if not c.pending:
+                continue
+            batch = b"".join(c.pending.values())
+            c.pending.clear()
+            try:
+                writer.write(batch)
+                c.sent += 1
+                # 慢订阅者：等待期间到达的报价在 pending 中按交易对覆盖
+                if writer.transport.get_write_buffer_size() > CLIENT_MAX_BUFFER_BYTES:
+                    await writer.drain()
+            except Exception:
+                break
+
+    async def _handle_client(self, reader, writer):
+        c = _Client(writer)
+        self._clients.add(c)
+        peer = writer.get_extra_info("peername")
+        writer_task = asyncio.create_task(self._writer_loop(c))
+        try:
+            while not self.stop_event.is_set():
+                raw = await reader.readline()
+                if not raw:
+                    break
+                parts = raw.decode("utf-8", "replace").split()
+                if len(parts) == 3 and parts[0].upper() == "SUB":
+                    await self._subscribe(c, parts[1], parts[2].strip().upper())
+                elif parts and parts[0].upper() == "STATS":
+                    writer.write((json.dumps(self.stats(), ensure_ascii=False) + "\n").encode("utf-8"))
+        except Exception as e:
+            logger.warning(f"订阅者 {peer} 异常断开: {e}")
+        finally:
+            writer_task.cancel()
+            self._clients.discard(c)
+            await self._unsubscribe_all(c)
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - [market_data_hub] - %(message)s")
+    addr = hub_addr_from_env() or (MARKET_DATA_HUB_HOST, MARKET_DATA_HUB_PORT)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    hub = MarketDataHub(addr[0], addr[1])
+
+    def _stop(*_args):
+        loop.call_soon_threadsafe(hub.stop_event.set)
+
+    for sig in (getattr(signal, "SIGINT", None), getattr(signal, "SIGTERM", None), getattr(signal, "SIGBREAK", None)):
+        if sig is None:
+            continue
+        try:
+            signal.signal(sig, _stop)
+        except Exception:
+            pass
+    try:
+        loop.run_until_complete(hub.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            loop.close()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    main()
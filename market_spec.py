@@ -0,0 +1,149 @@
+import math
+from decimal import Decimal, InvalidOperation
+
+# 浮点价格换算成 tick 时吸收二进制误差（如 2000.07 / 0.01 = 200006.99999999997）
+_EPS = 1e-9
+
+
+def _dec(v):
+    try:
+        d = Decimal(str(v).strip())
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+    if not d.is_finite() or d <= 0:
+        return None
+    return d
+
+
+def _decimals(d: Decimal) -> int:
+    return max(0, -int(d.normalize().as_tuple().exponent))
+
+
+def _filter(info: dict, name: str) -> dict:
+    for f in (info or {}).get("filters") or []:
+        if isinstance(f, dict) and f.get("filterType") == name:
+            return f
+    return {}
+
+
+def _precision_step(v):
+    """ccxt precision 字段：TICK_SIZE 模式为步长（0.01），DECIMAL_PLACES 模式为位数（2）"""
+    if isinstance(v, bool) or v is None:
+        return None
+    if isinstance(v, int):
+        return Decimal(1).scaleb(-int(v))
+    if isinstance(v, float):
+        return _dec(v)
+    raise ValueError(f"未知的精度类型: {v}")
+
+
+class MarketSpec:
+    """交易对规格：价格与数量统一换算成整数 tick/lot 比较，浮点只在报文处转换。"""
+
+    __slots__ = (
+        "symbol",
+        "market_id",
+        "tick_size",
+        "step_size",
+        "min_qty",
+        "min_notional",
+        "contract_size",
+        "price_precision",
+        "amount_precision",
+    )
+
+    def __init__(self, tick_size, step_size, min_qty=0.0, min_notional=0.0, contract_size=1.0, symbol=None, market_id=None):
+        tick = _dec(tick_size)
+        step = _dec(step_size)
+        if tick is None or step is None:
+            raise ValueError(f"无效的 tickSize/stepSize: {tick_size}/{step_size}")
+        self.symbol = symbol
+        self.market_id = market_id
+        self.tick_size = float(tick)
+        self.step_size = float(step)
+        self.price_precision = _decimals(tick)
+        self.amount_precision = _decimals(step)
+        self.min_qty = float(min_qty or 0.0)
+        self.min_notional = float(min_notional or 0.0)
+        cs = float(contract_size or 0.0)
+        self.contract_size = cs if cs > 0 else 1.0
+
+    @classmethod
+    def from_ccxt(cls, market: dict):
+        """由 load_markets 的交易对条目构建；优先使用交易所原始 filters"""
+        info = market.get("info") or {}
+        precision = market.get("precision") or {}
+        limits = market.get("limits") or {}
+        tick = _dec(_filter(info, "PRICE_FILTER").get("tickSize")) or _precision_step(precision.get("price"))
+        lot = _filter(info, "LOT_SIZE")
+        step = _dec(lot.get("stepSize")) or _precision_step(precision.get("amount"))
+        min_qty = lot.get("minQty")
+        if min_qty is None:
+            min_qty = (limits.get("amount") or {}).get("min")
+        min_notional = _filter(info, "MIN_NOTIONAL").get("notional")
+        if min_notional is None:
+            min_notional = (limits.get("cost") or {}).get("min")
+        contract_size = market.get("contractSize")
+        if contract_size is None:
+            contract_size = info.get("contractSize")
+        try:
+            contract_size = float(contract_size) if contract_size is not None else 1.0
+        except Exception:
+            contract_size = 1.0
+        return cls(
+            tick,
+            step,
+            float(min_qty or 0.0),
+            float(min_notional or 0.0),
+            contract_size,
+            symbol=market.get("symbol"),
+            market_id=market.get("id"),
+        )
+
+    # ---------- 价格 ----------
+    def price_to_ticks(self, price, mode: str = "nearest") -> int:
+        v = float(price) / self.tick_size
+        if mode == "down":
+            return int(math.floor(v + _EPS))
+        if mode == "up":
+            return int(math.ceil(v - _EPS))
+        return int(round(v))
+
+    def ticks_to_price(self, ticks: int) -> float:
+        return round(int(ticks) * self.tick_size, self.price_precision)
+
+    def round_price(self, price, mode: str = "nearest") -> float:
+        return self.ticks_to_price(self.price_to_ticks(price, mode))
+
+    def format_ticks(self, ticks: int) -> str:
+        return f"{self.ticks_to_price(ticks):.{self.price_precision}f}"
+
+    def format_price(self, price) -> str:
+        return self.format_ticks(self.price_to_ticks(price))
+
+    # ---------- 数量 ----------
+    def qty_to_lots(self, qty, mode: str = "nearest") -> int:
+        v = float(qty) / self.step_size
+        if mode == "down":
+            return int(math.floor(v + _EPS))
+        if mode == "up":
+            return int(math.ceil(v - _EPS))
+        return int(round(v))
+
+    def lots_to_qty(self, lots: int) -> float:
+        return round(int(lots) * self.step_size, self.amount_precision)
+
+    def round_qty(self, qty, mode: str = "nearest") -> float:
+        return self.lots_to_qty(self.qty_to_lots(qty, mode))
+
+    def format_lots(self, lots: int) -> str:
+        return f"{self.lots_to_qty(lots):.{self.amount_precision}f}"
+
+    def format_qty(self, qty) -> str:
+        return self.format_lots(self.qty_to_lots(qty))
+
+    def min_lots(self) -> int:
+        return self.qty_to_lots(self.min_qty, "up") if self.min_qty > 0 else 1
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.__slots__}
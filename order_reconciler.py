@@ -0,0 +1,151 @@
+from grid_levels import LEVEL_ID_SEP
+
+
+class DesiredOrder:
+    """期望挂单：一个角色（add/tp）在某方向上应有的一笔限价单；多层挂单时同一角色有多笔。
+
+    price_tick 为 None 表示不比较价格（如空仓首单跟随最优价、按时间刷新）；
+    qty 为 None 或 <= 0 表示该角色不应有挂单，现存的全部撤掉。
+    client_family 给出时（多层挂单），client id 为 family 或 family 加层后缀的现存单都视为同组参数。
+    """
+
+    __slots__ = ("role", "side", "position_side", "reduce_only", "price_tick", "qty", "client_id", "client_family")
+
+    def __init__(self, role, side, position_side=None, reduce_only=False, price_tick=None, qty=None, client_id=None, client_family=None):
+        self.role = str(role)
+        self.side = str(side or "").strip().lower()
+        ps = str(position_side or "").strip().upper()
+        self.position_side = ps if ps in {"LONG", "SHORT"} else None
+        self.reduce_only = bool(reduce_only)
+        self.price_tick = None if price_tick is None else int(price_tick)
+        self.qty = qty
+        self.client_id = str(client_id) if client_id else None
+        self.client_family = str(client_family) if client_family else None
+
+    def wanted(self) -> bool:
+        try:
+            return self.qty is not None and float(self.qty) > 0
+        except Exception:
+            return False
+
+
+class ReconcileResult:
+    __slots__ = ("cancels", "places", "amends", "kept", "matched")
+
+    def __init__(self):
+        self.cancels = []
+        self.places = []
+        self.amends = []
+        self.kept = []
+        self.matched = {}
+
+    def roles(self) -> set:
+        """需要动作（撤/挂/改）的角色集合"""
+        out = {role for role, _ in self.cancels}
+        out.update(d.role for d in self.places)
+        out.update(d.role for _, d in self.amends)
+        return out
+
+    def cancel_ids(self, roles=None) -> list:
+        return [oid for role, oid in self.cancels if roles is None or role in roles]
+
+    def is_noop(self) -> bool:
+        return not (self.cancels or self.places or self.amends)
+
+
+def match_live(desired: DesiredOrder, live) -> list:
+    """现存挂单中属于该角色的订单（同买卖方向、同 reduceOnly、对冲模式下同仓位方向）"""
+    out = []
+    for rec in (live or ()):
+        if rec.side != desired.side or bool(rec.reduce_only) != desired.reduce_only:
+            continue
+        if float(rec.remaining or 0.0) <= 0 or int(rec.price_tick or 0) <= 0:
+            continue
+        if desired.position_side is not None and rec.position_side != desired.position_side:
+            continue
+        out.append(rec)
+    return out
+
+
+def _client_id_ok(desired: DesiredOrder, rec) -> bool:
+    # 交易所回执缺 client id 时不据此判定为旧单
+    if desired.client_id is None or rec.client_id is None or rec.client_id == desired.client_id:
+        return True
+    fam = desired.client_family
+    return fam is not None and (rec.client_id == fam or rec.client_id.startswith(fam + LEVEL_ID_SEP))
+
+
+def _tick_distance(desired: DesiredOrder, rec) -> int:
+    if desired.price_tick is None:
+        return 0
+    return abs(int(rec.price_tick) - int(desired.price_tick))
+
+
+def _qty_ok(desired: DesiredOrder, rec, qty_tol_ratio: float) -> bool:
+    if qty_tol_ratio <= 0:
+        return True
+    want = float(desired.qty or 0.0)
+    if want <= 0:
+        return True
+    return abs(float(rec.remaining or 0.0) - want) <= want * qty_tol_ratio
+
+
+def reconcile(desired_orders, live, price_tol_ticks: int = 0, qty_tol_ratio: float = 0.0, force_roles=(), allow_amend: bool = False) -> ReconcileResult:
+    """对比期望挂单与现存挂单，给出最少的撤单/挂单/改单动作。
+
+    纯函数：只读 desired_orders 与 live（OrderRecord 或同字段对象），不访问交易所。
+    - 价格差在 price_tol_ticks 格内、数量差在 qty_tol_ratio 比例内（<= 0 不比较数量）且 client id 一致的订单保留；
+      同一角色有多笔期望挂单（多层）时按价格差由近到远逐一配对，每笔现存单最多保留给一层；
+    - 同一角色多余的订单撤掉；
+    - 没有可保留订单时，allow_amend 下改价 client id 与数量一致的最近一笔，否则全部撤掉后重挂；
+      多层角色不改单（改单无法更新 client id，会与之后挂在原价位的新单重复）；
+    - force_roles 中的角色不保留也不改单，全部撤掉后重挂。
+    未出现在 desired_orders 中的角色不受影响。
+    """
+    res = ReconcileResult()
+    tol = max(0, int(price_tol_ticks or 0))
+    qtol = max(0.0, float(qty_tol_ratio or 0.0))
+    forced = set(force_roles or ())
+    groups = {}
+    for d in (desired_orders or ()):
+        groups.setdefault(d.role, []).append(d)
+    for role, ds in groups.items():
+        recs = match_live(ds[0], live)
+        res.matched[role] = recs
+        wanted = [d for d in ds if d.wanted()]
+        if not wanted:
+            res.cancels.extend((role, r.order_id) for r in recs)
+            continue
+        kept = {}
+        if role not in forced:
+            pairs = []
+            for i, d in enumerate(wanted):
+                for j, r in enumerate(recs):
+                    if _client_id_ok(d, r) and _tick_distance(d, r) <= tol and _qty_ok(d, r, qtol):
+                        pairs.append((_tick_distance(d, r), -float(r.ts or 0.0), i, j))
+            pairs.sort()
+            used = set()
+            for _dist, _ts, i, j in pairs:
+                if i in kept or j in used:
+                    continue
+                kept[i] = j
+                used.add(j)
+        for i in sorted(kept):
+            res.kept.append((role, recs[kept[i]].order_id))
+        spare = [r for j, r in enumerate(recs) if j not in set(kept.values())]
+        missing = [d for i, d in enumerate(wanted) if i not in kept]
+        if len(ds) == 1 and missing:
+            d = missing[0]
+            amend = None
+            if allow_amend and d.price_tick is not None and role not in forced:
+                # 改单只改价格：数量需在容差内，client id 无法修改
+                candidates = [r for r in spare if _client_id_ok(d, r) and _qty_ok(d, r, qtol)]
+                if candidates:
+                    amend = min(candidates, key=lambda r: (_tick_distance(d, r), -float(r.ts or 0.0)))
+            if amend is not None:
+                res.amends.append((amend.order_id, d))
+                spare = [r for r in spare if r is not amend]
+                missing = []
+        res.cancels.extend((role, r.order_id) for r in spare)
+        res.places.extend(missing)
+    return res
@@ -0,0 +1,382 @@
+import threading
+import time
+
+OPEN_ORDER_STATUSES = {"NEW", "PARTIALLY_FILLED"}
+OPEN_ALGO_STATUSES = {"NEW"}
+
+
+class OrderRecord:
+    __slots__ = (
+        "order_id",
+        "algo_id",
+        "client_id",
+        "side",
+        "position_side",
+        "reduce_only",
+        "is_stop",
+        "is_algo",
+        "order_type",
+        "price",
+        "price_tick",
+        "qty",
+        "remaining",
+        "stop_price",
+        "stop_tick",
+        "status",
+        "ts",
+        "event_ts",
+        "seen_ts",
+    )
+
+    def __init__(self):
+        self.order_id = None
+        self.algo_id = None
+        self.client_id = None
+        self.side = None
+        self.position_side = None
+        self.reduce_only = False
+        self.is_stop = False
+        self.is_algo = False
+        self.order_type = None
+        self.price = 0.0
+        self.price_tick = 0
+        self.qty = 0.0
+        self.remaining = 0.0
+        self.stop_price = 0.0
+        self.stop_tick = 0
+        self.status = None
+        self.ts = None
+        self.event_ts = 0
+        self.seen_ts = 0.0
+
+    def key(self):
+        return (self.side, self.position_side, bool(self.reduce_only), int(self.price_tick))
+
+
+def _f(v, default: float = 0.0) -> float:
+    try:
+        return float(v)
+    except Exception:
+        return float(default)
+
+
+def _b(v) -> bool:
+    if isinstance(v, bool):
+        return v
+    return str(v or "").strip().lower() in {"1", "true", "yes", "y", "on"}
+
+
+def _is_stop_type(t: str) -> bool:
+    s = str(t or "").strip().upper()
+    return ("STOP" in s) or ("TAKE_PROFIT" in s) or ("TRAILING" in s)
+
+
+def _implied_reduce_only(side: str, ps: str) -> bool:
+    return (ps == "LONG" and side == "sell") or (ps == "SHORT" and side == "buy")
+
+
+class OrderStore:
+    """本地挂单簿：由 ORDER_TRADE_UPDATE / ALGO_UPDATE 与下单回执维护，REST 只做断档恢复和定期对账。
+
+    下单回执在线程池中写入、WS 事件在事件循环中写入，增删与查询经 _mu 串行。
+    """
+
+    def __init__(self, market_id: str, price_precision: int, spec=None):
+        self._mu = threading.RLock()
+        self.market_id = str(market_id or "").strip().upper()
+        self._spec = spec
+        self.set_price_precision(price_precision)
+        self._orders = {}
+        self._by_cid = {}
+        self._by_key = {}
+        self._qty = {}
+        self._contrib = {}
+        self._removed = {}
+        self.stale = True
+        self.last_rest_sync_ts = 0.0
+        self.ws_events = 0
+        self.acks = 0
+        self.rest_syncs = 0
+        self.rest_corrections = 0
+
+    def set_price_precision(self, price_precision: int):
+        self._price_scale = 10 ** max(0, int(price_precision or 0))
+
+    def set_spec(self, spec):
+        self._spec = spec
+
+    def to_tick(self, price) -> int:
+        if self._spec is not None:
+            return self._spec.price_to_ticks(_f(price))
+        return int(round(_f(price) * self._price_scale))
+
+    # ---------- 索引维护 ----------
+    def _index(self, rec: OrderRecord):
+        oid = rec.order_id
+        rec.seen_ts = time.time()
+        self._orders[oid] = rec
+        if rec.client_id:
+            self._by_cid[rec.client_id] = oid
+        if not rec.is_stop:
+            self._by_key.setdefault(rec.key(), set()).add(oid)
+            qk = (rec.side, bool(rec.reduce_only))
+            q = float(rec.remaining or 0.0)
+            self._qty[qk] = float(self._qty.get(qk, 0.0)) + q
+            self._contrib[oid] = (qk, q)
+
+    def _unindex(self, oid):
+        rec = self._orders.pop(oid, None)
+        if rec is None:
+            return None
+        if rec.client_id and self._by_cid.get(rec.client_id) == oid:
+            self._by_cid.pop(rec.client_id, None)
+        if not rec.is_stop:
+            ids = self._by_key.get(rec.key())
+            if ids is not None:
+                ids.discard(oid)
+                if not ids:
+                    self._by_key.pop(rec.key(), None)
+        c = self._contrib.pop(oid, None)
+        if c is not None:
+            qk, q = c
+            v = float(self._qty.get(qk, 0.0)) - float(q)
+            self._qty[qk] = v if v > 1e-12 else 0.0
+        return rec
+
+    def upsert(self, rec: OrderRecord, is_open: bool) -> bool:
+        with self._mu:
+            if rec is None or rec.order_id is None:
+                return False
+            prev = self._orders.get(rec.order_id)
+            if prev is None and is_open and rec.order_id in self._removed:
+                # 已撤/已成交的订单不会重新打开，迟到的 NEW 事件直接丢弃
+                return False
+            if prev is not None and int(rec.event_ts or 0) and int(prev.event_ts or 0) > int(rec.event_ts):
+                return False
+            if prev is not None:
+                if rec.ts is None:
+                    rec.ts = prev.ts
+                self._unindex(rec.order_id)
+            if is_open:
+                self._index(rec)
+            else:
+                self._removed[rec.order_id] = time.time()
+            return True
+
+    def remove(self, order_id) -> bool:
+        with self._mu:
+            if order_id is None:
+                return False
+            oid = str(order_id)
+            self._removed[oid] = time.time()
+            return self._unindex(oid) is not None
+
+    def remove_algo(self, algo_id) -> bool:
+        if algo_id is None:
+            return False
+        return self.remove(f"algo:{algo_id}")
+
+    def remove_client_id(self, client_id) -> bool:
+        with self._mu:
+            oid = self._by_cid.get(str(client_id or ""))
+            if oid is None:
+                return False
+            return self.remove(oid)
+
+    def clear(self):
+        with self._mu:
+            self._orders.clear()
+            self._by_cid.clear()
+            self._by_key.clear()
+            self._qty.clear()
+            self._contrib.clear()
+            self._removed.clear()
+            self.stale = True
+
+    # ---------- 事件输入 ----------
+    def apply_order_update(self, o: dict, event_ts: int = 0):
+        if str(o.get("s") or "").strip().upper() != self.market_id:
+            return None
+        rec = OrderRecord()
+        oid = o.get("i")
+        if oid is None:
+            return None
+        rec.order_id = str(oid)
+        rec.client_id = str(o.get("c") or "") or None
+        rec.side = str(o.get("S") or "").strip().lower()
+        ps = str(o.get("ps") or "").strip().upper()
+        rec.position_side = ps if ps in {"LONG", "SHORT", "BOTH"} else None
+        rec.order_type = str(o.get("o") or o.get("ot") or "").strip().upper()
+        rec.stop_price = _f(o.get("sp"))
+        rec.is_stop = _is_stop_type(rec.order_type) or rec.stop_price > 0
+        rec.reduce_only = _b(o.get("R")) or _b(o.get("cp")) or _implied_reduce_only(rec.side, rec.position_side)
+        rec.price = _f(o.get("p"))
+        rec.price_tick = self.to_tick(rec.price)
+        rec.stop_tick = self.to_tick(rec.stop_price)
+        rec.qty = abs(_f(o.get("q")))
+        rec.remaining = max(0.0, rec.qty - abs(_f(o.get("z"))))
+        rec.status = str(o.get("X") or "").strip().upper()
+        rec.event_ts = int(_f(event_ts or o.get("T") or 0))
+        rec.ts = rec.event_ts / 1000.0 if rec.event_ts else time.time()
+        self.upsert(rec, rec.status in OPEN_ORDER_STATUSES)
+        self.ws_events += 1
+        return rec
+
+    def apply_algo_update(self, o: dict, event_ts: int = 0):
+        if str(o.get("s") or "").strip().upper() != self.market_id:
+            return None
+        aid = o.get("aid")
+        if aid is None:
+            return None
+        rec = self.algo_record(
+            aid,
+            o.get("caid"),
+            o.get("S"),
+            o.get("ps"),
+            o.get("o"),
+            o.get("tp"),
+            o.get("q"),
+            _b(o.get("R")) or _b(o.get("cp")),
+            o.get("X"),
+        )
+        rec.event_ts = int(_f(event_ts or 0))
+        rec.ts = rec.event_ts / 1000.0 if rec.event_ts else time.time()
+        self.upsert(rec, rec.status in OPEN_ALGO_STATUSES)
+        self.ws_events += 1
+        return rec
+
+    def algo_record(self, algo_id, client_algo_id, side, ps, order_type, trigger_price, qty, reduce_only, status):
+        rec = OrderRecord()
+        rec.order_id = f"algo:{algo_id}"
+        rec.algo_id = algo_id
+        rec.client_id = str(client_algo_id or "") or None
+        rec.side = str(side or "").strip().lower()
+        p = str(ps or "").strip().upper()
+        rec.position_side = p if p in {"LONG", "SHORT", "BOTH"} else None
+        rec.order_type = str(order_type or "").strip().upper()
+        rec.is_stop = True
+        rec.is_algo = True
+        rec.reduce_only = bool(reduce_only) or _implied_reduce_only(rec.side, rec.position_side)
+        rec.stop_price = _f(trigger_price)
+        rec.stop_tick = self.to_tick(rec.stop_price)
+        rec.qty = abs(_f(qty))
+        rec.remaining = rec.qty
+        rec.status = str(status or "NEW").strip().upper()
+        return rec
+
+    def add_ack(self, rec: OrderRecord):
+        with self._mu:
+            if rec is None or rec.order_id is None:
+                return
+            if rec.order_id in self._orders:
+                return
+            if rec.ts is None:
+                rec.ts = time.time()
+            self._index(rec)
+            self.acks += 1
+
+    def add_algo_ack(self, algo_id, client_algo_id, side, ps, order_type, trigger_price, qty=None, reduce_only=True):
+        if algo_id is None:
+            return None
+        rec = self.algo_record(algo_id, client_algo_id, side, ps, order_type, trigger_price, qty, reduce_only, "NEW")
+        self.add_ack(rec)
+        return rec
+
+    def load_rest(self, records: list, requested_ts: float):
+        """全量对账：以 REST 结果为准，但保留请求发出后才到达的本地记录。"""
+        with self._mu:
+            req = float(requested_ts or 0.0)
+            fresh = {}
+            for rec in (records or []):
+                if rec is not None and rec.order_id is not None:
+                    # 请求发出后本地已撤/已成交的订单不回填
+                    if float(self._removed.get(rec.order_id, 0.0)) > req:
+                        continue
+                    fresh[rec.order_id] = rec
+            corrected = False
+            for oid, rec in list(self._orders.items()):
+                if oid in fresh:
+                    continue
+                if float(rec.seen_ts or 0.0) > req - 1.0:
+                    continue
+                self._unindex(oid)
+                corrected = True
+            for oid, rec in fresh.items():
+                prev = self._orders.get(oid)
+                if prev is None:
+                    corrected = True
+                elif float(prev.seen_ts or 0.0) > req:
+                    continue
+                else:
+                    if rec.ts is None:
+                        rec.ts = prev.ts
+                    self._unindex(oid)
+                self._index(rec)
+            cutoff = time.time() - 300.0
+            for oid in [k for k, v in self._removed.items() if v < cutoff]:
+                self._removed.pop(oid, None)
+            self.stale = False
+            self.last_rest_sync_ts = time.time()
+            self.rest_syncs += 1
+            if corrected:
+                self.rest_corrections += 1
+            return corrected
+
+    # ---------- 查询 ----------
+    def get(self, order_id):
+        with self._mu:
+            return self._orders.get(str(order_id))
+
+    def by_client_id(self, client_id):
+        with self._mu:
+            oid = self._by_cid.get(str(client_id or ""))
+            return self._orders.get(oid) if oid is not None else None
+
+    def has_order_at(self, side: str, position_side, reduce_only: bool, price_tick: int) -> bool:
+        with self._mu:
+            s = str(side or "").strip().lower()
+            ro = bool(reduce_only)
+            t = int(price_tick)
+            if position_side is None:
+                for ps in ("BOTH", "LONG", "SHORT", None):
+                    if self._by_key.get((s, ps, ro, t)):
+                        return True
+                return False
+            return bool(self._by_key.get((s, position_side, ro, t)))
+
+    def records(self):
+        with self._mu:
+            return list(self._orders.values())
+
+    def grid_orders(self):
+        with self._mu:
+            return [r for r in self._orders.values() if not r.is_stop]
+
+    def stop_orders(self):
+        with self._mu:
+            return [r for r in self._orders.values() if r.is_stop]
+
+    def totals(self):
+        """返回 (多头开仓买, 多头止盈卖, 空头开仓卖, 空头止盈买) 剩余数量。"""
+        with self._mu:
+            return (
+                float(self._qty.get(("buy", False), 0.0)),
+                float(self._qty.get(("sell", True), 0.0)),
+                float(self._qty.get(("sell", False), 0.0)),
+                float(self._qty.get(("buy", True), 0.0)),
+            )
+
+    def __len__(self):
+        with self._mu:
+            return len(self._orders)
+
+    def stats(self) -> dict:
+        return {
+            "open_orders": len(self._orders),
+            "stale": bool(self.stale),
+            "ws_events": int(self.ws_events),
+            "acks": int(self.acks),
+            "rest_syncs": int(self.rest_syncs),
+            "rest_corrections": int(self.rest_corrections),
+            "last_rest_sync_ts": float(self.last_rest_sync_ts or 0.0),
+        }
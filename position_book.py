@@ -0,0 +1,180 @@
+import time
+
+# 已计入持仓簿的成交键保留的条数
+FILL_KEYS_CAPACITY = 4096
+
+
+class PositionLeg:
+    __slots__ = ("amt", "entry_price", "event_ts", "account_ts", "updated_ts", "source")
+
+    def __init__(self):
+        self.amt = 0.0
+        self.entry_price = None
+        self.event_ts = 0
+        self.account_ts = 0
+        self.updated_ts = 0.0
+        self.source = None
+
+
+class PositionBook:
+    """本地持仓簿：ACCOUNT_UPDATE / 成交事件实时维护，REST 仅用于定期对账。"""
+
+    def __init__(self, market_id: str, contract_size: float = 1.0):
+        self.market_id = str(market_id or "").strip().upper()
+        try:
+            cs = float(contract_size)
+        except Exception:
+            cs = 1.0
+        self.contract_size = cs if cs > 0 else 1.0
+        self.long = PositionLeg()
+        self.short = PositionLeg()
+        self.ready = False
+        self.ws_updates = 0
+        self.rest_syncs = 0
+        self.rest_corrections = 0
+        self.last_ws_ts = 0.0
+        self.last_rest_ts = 0.0
+        self._fill_keys = {}
+
+    def leg(self, side: str) -> PositionLeg:
+        return self.long if str(side or "").strip().lower() == "long" else self.short
+
+    def amount(self, side: str) -> float:
+        return float(self.leg(side).amt)
+
+    def entry_price(self, side: str):
+        return self.leg(side).entry_price
+
+    def _set(self, leg: PositionLeg, amt: float, entry, event_ts: int, source: str):
+        a = round(abs(float(amt or 0.0)), 12)
+        leg.amt = a
+        if a <= 0:
+            leg.entry_price = None
+        elif entry is not None and float(entry) > 0:
+            leg.entry_price = float(entry)
+        leg.event_ts = max(int(leg.event_ts or 0), int(event_ts or 0))
+        leg.updated_ts = time.time()
+        leg.source = source
+
+    def apply_account_update(self, data: dict) -> bool:
+        acct = (data or {}).get("a") or {}
+        try:
+            event_ts = int((data or {}).get("T") or (data or {}).get("E") or 0)
+        except Exception:
+            event_ts = 0
+        changed = False
+        for p in (acct.get("P") or []):
+            if str(p.get("s") or "").strip().upper() != self.market_id:
+                continue
+            try:
+                pa = float(p.get("pa") or 0.0) * self.contract_size
+            except Exception:
+                continue
+            try:
+                ep = float(p.get("ep") or 0.0)
+            except Exception:
+                ep = 0.0
+            ps = str(p.get("ps") or "BOTH").strip().upper()
+            if ps == "LONG":
+                targets = ((self.long, pa),)
+            elif ps == "SHORT":
+                targets = ((self.short, pa),)
+            elif pa > 0:
+                targets = ((self.long, pa), (self.short, 0.0))
+            elif pa < 0:
+                targets = ((self.short, pa), (self.long, 0.0))
+            else:
+                targets = ((self.long, 0.0), (self.short, 0.0))
+            for leg, amt in targets:
+                if event_ts and int(leg.event_ts or 0) > event_ts:
+                    continue
+                self._set(leg, amt, ep, event_ts, "ws")
+                leg.account_ts = max(int(leg.account_ts or 0), int(event_ts or 0))
+                changed = True
+        if changed:
+            self.ready = True
+            self.ws_updates += 1
+            self.last_ws_ts = time.time()
+        return changed
+
+    def apply_fill(self, side: str, delta: float, price: float = 0.0, trade_ts: int = 0, trade_key=None) -> bool:
+        """按单笔成交增量更新持仓；trade_key 为成交标识（成交 id 或订单 id 加累计成交量），重复推送只计一次。
+
+        一笔吃单对多笔挂单成交时各笔成交共用交易时间 T，因此不能按时间去重；
+        只有 ACCOUNT_UPDATE（绝对持仓）已覆盖到该时间时才跳过。
+        """
+        leg = self.leg(side)
+        if trade_key is not None:
+            if trade_key in self._fill_keys:
+                return False
+            self._fill_keys[trade_key] = True
+            if len(self._fill_keys) > FILL_KEYS_CAPACITY:
+                # dict 按插入顺序迭代，淘汰最早的键
+                self._fill_keys.pop(next(iter(self._fill_keys)))
+        try:
+            if int(trade_ts or 0) and int(leg.account_ts or 0) >= int(trade_ts):
+                return False
+        except Exception:
+            pass
+        d = float(delta or 0.0)
+        old_amt = float(leg.amt)
+        new_amt = max(0.0, old_amt + d)
+        entry = leg.entry_price
+        try:
+            px = float(price or 0.0)
+        except Exception:
+            px = 0.0
+        if d > 0 and px > 0 and new_amt > 0:
+            if old_amt <= 0 or entry is None:
+                entry = px
+            else:
+                entry = (old_amt * float(entry) + d * px) / new_amt
+        self._set(leg, new_amt, entry, int(trade_ts or 0), "fill")
+        return True
+
+    def apply_rest_snapshot(self, snap: dict, requested_ts: float) -> bool:
+        """REST 对账：请求发出后已被 WS 更新过的一侧不覆盖。"""
+        corrected = False
+        for side in ("long", "short"):
+            item = (snap or {}).get(side) or {}
+            leg = self.leg(side)
+            if float(leg.updated_ts or 0.0) > float(requested_ts or 0.0) and leg.source != "rest":
+                continue
+            amt = abs(float(item.get("amt") or 0.0))
+            if self.ready and abs(amt - float(leg.amt)) > 1e-12:
+                corrected = True
+            self._set(leg, amt, item.get("entry_price"), 0, "rest")
+        self.ready = True
+        self.rest_syncs += 1
+        self.last_rest_ts = time.time()
+        if corrected:
+            self.rest_corrections += 1
+        return corrected
+
+    def unrealized_pnl(self, side: str, mark_price: float) -> float:
+        leg = self.leg(side)
+        try:
+            mp = float(mark_price or 0.0)
+        except Exception:
+            mp = 0.0
+        if leg.amt <= 0 or leg.entry_price is None or mp <= 0:
+            return 0.0
+        if leg is self.long:
+            return (mp - float(leg.entry_price)) * float(leg.amt)
+        return (float(leg.entry_price) - mp) * float(leg.amt)
+
+    def snapshot(self, mark_price: float) -> dict:
+        return {
+            "long": {"amt": float(self.long.amt), "pnl": self.unrealized_pnl("long", mark_price), "entry_price": self.long.entry_price},
+            "short": {"amt": float(self.short.amt), "pnl": self.unrealized_pnl("short", mark_price), "entry_price": self.short.entry_price},
+        }
+
+    def stats(self) -> dict:
+        return {
+            "ready": bool(self.ready),
+            "ws_updates": int(self.ws_updates),
+            "rest_syncs": int(self.rest_syncs),
+            "rest_corrections": int(self.rest_corrections),
+            "last_ws_ts": float(self.last_ws_ts or 0.0),
+            "last_rest_ts": float(self.last_rest_ts or 0.0),
+        }
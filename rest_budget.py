@@ -0,0 +1,271 @@
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl as _fcntl
+except Exception:
+    _fcntl = None
+try:
+    import msvcrt as _msvcrt
+except Exception:
+    _msvcrt = None
+
+# 优先级：数值越小越优先。止损/硬止损/撤单可用满额度，同步/状态类最先让路
+PRIORITY_CRITICAL = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# 各优先级可用的额度比例（相对 Binance 每分钟权重与下单数上限）
+_PRIORITY_SHARE = {
+    PRIORITY_CRITICAL: 1.0,
+    PRIORITY_NORMAL: 0.85,
+    PRIORITY_LOW: 0.6,
+}
+
+_LABEL_PRIORITY = {
+    "hardstop_close": PRIORITY_CRITICAL,
+    "pending_hardstop": PRIORITY_CRITICAL,
+    "upsert_stop": PRIORITY_CRITICAL,
+    "cancel_stops": PRIORITY_CRITICAL,
+    "cancel_order": PRIORITY_CRITICAL,
+    "take_profit_close": PRIORITY_CRITICAL,
+    "shutdown_cancel_all": PRIORITY_CRITICAL,
+    "shutdown_flatten": PRIORITY_CRITICAL,
+    "fetch_positions": PRIORITY_LOW,
+    "fetch_open_orders": PRIORITY_LOW,
+    "fetch_ticker": PRIORITY_LOW,
+    "status_file": PRIORITY_LOW,
+}
+
+# 由 RestGateway.call 按标签设置，随上下文进入线程池，CustomGate.fetch 读取
+REST_PRIORITY = contextvars.ContextVar("rest_priority", default=PRIORITY_NORMAL)
+
+
+def priority_for_label(label) -> int:
+    return _LABEL_PRIORITY.get(str(label or "").split(":", 1)[0], PRIORITY_NORMAL)
+
+
+def account_key(api_key) -> str:
+    return hashlib.sha1(str(api_key or "").encode("utf-8")).hexdigest()[:12]
+
+
+def estimate_cost(url: str, method: str):
+    """按接口粗估 (IP 权重, 是否计入下单数)，以响应头为准随时校正。"""
+    u = str(url or "")
+    m = str(method or "GET").upper()
+    path = u.split("?", 1)[0]
+    if path.endswith("/order") or path.endswith("/algoOrder"):
+        # 改单（PUT）同样计入下单数
+        return 1, m in {"POST", "PUT"}
+    if path.endswith("/batchOrders"):
+        return 5, m == "POST"
+    if path.endswith("/openOrders") or path.endswith("/openAlgoOrders"):
+        return (1 if "symbol=" in u else 40), False
+    if path.endswith("/allOpenOrders"):
+        return 1, False
+    if "positionRisk" in path or path.endswith("/account") or path.endswith("/balance"):
+        return 5, False
+    if path.endswith("/exchangeInfo"):
+        return 1, False
+    return 2, False
+
+
+class RestBudgetExceeded(Exception):
+    """共享额度不足，调用方应在 retry_at 之后再试（不计入错误退避）。"""
+
+    def __init__(self, message: str, retry_at: float):
+        super().__init__(message)
+        self.retry_at = float(retry_at)
+
+
+class _FileLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        self._fh = open(self.path, "a+b")
+        if _fcntl is not None:
+            _fcntl.flock(self._fh.fileno(), _fcntl.LOCK_EX)
+        elif _msvcrt is not None:
+            self._fh.seek(0)
+            _msvcrt.locking(self._fh.fileno(), _msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *_exc):
+        try:
+            if _fcntl is not None:
+                _fcntl.flock(self._fh.fileno(), _fcntl.LOCK_UN)
+            elif _msvcrt is not None:
+                self._fh.seek(0)
+                _msvcrt.locking(self._fh.fileno(), _msvcrt.LK_UNLCK, 1)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+
+class RestBudget:
+    """同一台机器（同一出口 IP）上所有进程共享的 REST 额度。
+
+    状态文件在文件锁内读改写：IP 权重按分钟窗口、下单数按账户 10 秒/1 分钟窗口累计，
+    每次响应用 X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-* 头校正；418/429 的 Retry-After
+    写入封禁截止时间，所有进程同时停手。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        account: str,
+        weight_limit_1m: int = 2400,
+        order_limit_10s: int = 300,
+        order_limit_1m: int = 1200,
+    ):
+        self.path = str(path)
+        self.account = str(account or "default")
+        self.weight_limit_1m = int(weight_limit_1m)
+        self.order_limit_10s = int(order_limit_10s)
+        self.order_limit_1m = int(order_limit_1m)
+        self._lock_path = f"{self.path}.lock"
+        self._mu = threading.Lock()
+        self._cache = {}
+        self._cache_ts = 0.0
+        self.deferred = 0
+        self.observed = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    # ---------- 状态读写（调用方持有文件锁） ----------
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                obj = json.load(f)
+            if isinstance(obj, dict):
+                return obj
+        except Exception:
+            pass
+        return {}
+
+    def _write(self, state: dict):
+        tmp = f"{self.path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _window(state: dict, key: str, size: float, now: float) -> dict:
+        w = state.get(key)
+        start = float(int(now // size) * size)
+        if not isinstance(w, dict) or float(w.get("start") or 0.0) != start:
+            w = {"start": start, "used": 0}
+            state[key] = w
+        return w
+
+    def _retry_at(self, state: dict, now: float, priority: int, cost: int, is_order: bool) -> float:
+        ban = float(state.get("ban_until") or 0.0)
+        if ban > now:
+            return ban
+        share = _PRIORITY_SHARE.get(int(priority), _PRIORITY_SHARE[PRIORITY_NORMAL])
+        w = self._window(state, "weight_1m", 60.0, now)
+        if int(w["used"]) + int(cost) > self.weight_limit_1m * share:
+            return float(w["start"]) + 60.0
+        if is_order:
+            o10 = self._window(state, f"orders_10s:{self.account}", 10.0, now)
+            if int(o10["used"]) + 1 > self.order_limit_10s * share:
+                return float(o10["start"]) + 10.0
+            o60 = self._window(state, f"orders_1m:{self.account}", 60.0, now)
+            if int(o60["used"]) + 1 > self.order_limit_1m * share:
+                return float(o60["start"]) + 60.0
+        return 0.0
+
+    # ---------- 对外接口 ----------
+
+    def acquire(self, url: str, method: str, priority: int = None):
+        """请求前预占额度；不足时抛 RestBudgetExceeded。"""
+        if priority is None:
+            priority = REST_PRIORITY.get()
+        cost, is_order = estimate_cost(url, method)
+        now = time.time()
+        with self._mu, _FileLock(self._lock_path):
+            state = self._read()
+            retry_at = self._retry_at(state, now, priority, cost, is_order)
+            if retry_at > now:
+                self.deferred += 1
+                self._remember(state, now)
+                raise RestBudgetExceeded(f"REST 额度不足(优先级 {priority})，{retry_at - now:.1f}s 后重试", retry_at)
+            self._window(state, "weight_1m", 60.0, now)["used"] += int(cost)
+            if is_order:
+                self._window(state, f"orders_10s:{self.account}", 10.0, now)["used"] += 1
+                self._window(state, f"orders_1m:{self.account}", 60.0, now)["used"] += 1
+            self._write(state)
+            self._remember(state, now)
+
+    def observe(self, status_code, headers):
+        """用响应头校正共享计数；418/429 记录封禁截止时间。"""
+        h = {str(k).lower(): v for k, v in dict(headers or {}).items()}
+        now = time.time()
+        used = h.get("x-mbx-used-weight-1m")
+        o10 = h.get("x-mbx-order-count-10s")
+        o60 = h.get("x-mbx-order-count-1m")
+        retry_after = h.get("retry-after")
+        code = int(status_code or 0)
+        if used is None and o10 is None and o60 is None and code not in {418, 429}:
+            return
+        with self._mu, _FileLock(self._lock_path):
+            state = self._read()
+            # 头部是交易所侧的权威值；取较大者以覆盖其它进程尚在途的预占
+            if used is not None:
+                w = self._window(state, "weight_1m", 60.0, now)
+                w["used"] = max(int(w["used"]), int(float(used)))
+            if o10 is not None:
+                w = self._window(state, f"orders_10s:{self.account}", 10.0, now)
+                w["used"] = max(int(w["used"]), int(float(o10)))
+            if o60 is not None:
+                w = self._window(state, f"orders_1m:{self.account}", 60.0, now)
+                w["used"] = max(int(w["used"]), int(float(o60)))
+            if code in {418, 429}:
+                try:
+                    wait = float(retry_after) if retry_after is not None else (120.0 if code == 418 else 60.0)
+                except Exception:
+                    wait = 60.0
+                state["ban_until"] = max(float(state.get("ban_until") or 0.0), now + max(1.0, wait))
+            self._write(state)
+            self._remember(state, now)
+            self.observed += 1
+
+    def _remember(self, state: dict, now: float):
+        self._cache = state
+        self._cache_ts = now
+
+    def blocked_until(self, priority: int = PRIORITY_LOW, max_age_sec: float = 1.0) -> float:
+        """事件循环中的廉价检查：用最近一次读到的状态判断该优先级是否需要让路。"""
+        now = time.time()
+        state = self._cache
+        if (now - float(self._cache_ts or 0.0)) > float(max_age_sec):
+            try:
+                with self._mu, _FileLock(self._lock_path):
+                    state = self._read()
+                self._remember(state, now)
+            except Exception:
+                return 0.0
+        retry_at = self._retry_at(dict(state), now, priority, 1, False)
+        return retry_at if retry_at > now else 0.0
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        state = dict(self._cache or {})
+        w = self._window(state, "weight_1m", 60.0, now)
+        o10 = self._window(state, f"orders_10s:{self.account}", 10.0, now)
+        o60 = self._window(state, f"orders_1m:{self.account}", 60.0, now)
+        return {
+            "weight_1m": int(w["used"]),
+            "weight_limit_1m": int(self.weight_limit_1m),
+            "orders_10s": int(o10["used"]),
+            "orders_1m": int(o60["used"]),
+            "ban_until": float(state.get("ban_until") or 0.0),
+            "deferred": int(self.deferred),
+            "observed": int(self.observed),
+        }
@@ -0,0 +1,90 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rest_budget import REST_PRIORITY, priority_for_label
+
+
+class RestGateway:
+    """把同步 ccxt 调用放到线程池执行，事件循环只 await 结果。"""
+
+    def __init__(self, max_workers: int = 4, name: str = "rest"):
+        try:
+            n = int(max_workers)
+        except Exception:
+            n = 4
+        if n <= 0:
+            n = 1
+        self.name = str(name or "rest")
+        self.max_workers = n
+        self._executor = ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"{self.name}-gw")
+        self._mu = threading.Lock()
+        self._inflight = {}
+        self._seq = 0
+        self._closed = False
+        self.total_calls = 0
+        self.total_errors = 0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.last_error = None
+
+    async def call(self, label: str, fn, *args, **kwargs):
+        if self._closed:
+            raise RuntimeError("rest gateway closed")
+        loop = asyncio.get_running_loop()
+        with self._mu:
+            self._seq += 1
+            seq = self._seq
+            self._inflight[seq] = (str(label or getattr(fn, "__name__", "call")), time.time())
+            self.total_calls += 1
+        started = time.perf_counter()
+        try:
+            # 带上调用方上下文（如日志实例标识），线程池中的日志仍归属发起的实例
+            ctx = contextvars.copy_context()
+            # 按标签确定共享额度优先级，止损/撤单类调用可抢占同步/状态类
+            ctx.run(REST_PRIORITY.set, priority_for_label(label))
+            return await loop.run_in_executor(self._executor, functools.partial(ctx.run, fn, *args, **kwargs))
+        except Exception as e:
+            with self._mu:
+                self.total_errors += 1
+                self.last_error = f"{label}: {type(e).__name__}: {e}"
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            with self._mu:
+                self._inflight.pop(seq, None)
+                self.last_latency_ms = float(elapsed_ms)
+                if elapsed_ms > self.max_latency_ms:
+                    self.max_latency_ms = float(elapsed_ms)
+
+    def inflight_count(self) -> int:
+        with self._mu:
+            return len(self._inflight)
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self._mu:
+            items = sorted(self._inflight.items())
+            out = [{"label": label, "age_ms": round((now - ts) * 1000.0, 1)} for _, (label, ts) in items]
+            return {
+                "max_workers": int(self.max_workers),
+                "inflight_count": len(out),
+                "inflight": out,
+                "total_calls": int(self.total_calls),
+                "total_errors": int(self.total_errors),
+                "last_latency_ms": round(float(self.last_latency_ms), 3),
+                "max_latency_ms": round(float(self.max_latency_ms), 3),
+                "last_error": self.last_error,
+            }
+
+    def close(self, wait: bool = False):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._executor.shutdown(wait=bool(wait), cancel_futures=True)
+        except TypeError:
+            self._executor.shutdown(wait=bool(wait))
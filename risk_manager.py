@@ -1,9 +1,242 @@
-import asyncio
+import bisect
 import hashlib
 import json
 import os
 import time
 
+from file_watcher import FileWatcher
+from grid_levels import build_levels
+
+# 单方向每个角色的挂单层数上限（交易所单交易对挂单数上限为 200）
+MAX_GRID_LEVELS = 20
+
+
+def _as_bool(v) -> bool:
+    if isinstance(v, str):
+        return v.strip().lower() in {"1", "true", "yes", "y", "on", "是"}
+    return bool(v)
+
+
+class LadderTable:
+    """预编译的止损阶梯：触发比例升序排列，values[i] 为前 i+1 档比例的累计最大（止损）或最小（回撤）值。
+
+    lookup(盈利比例) 一次二分即得所有已触发档位的合并结果，与逐档遍历取 max/min 等价。
+    """
+
+    __slots__ = ("triggers", "values")
+
+    def __init__(self, pairs=(), pick=max):
+        triggers = []
+        values = []
+        best = None
+        # NaN 触发比例永远不会被满足，直接剔除以保证二分有序
+        for tr, v in sorted(((t, v) for t, v in pairs if t == t), key=lambda x: x[0]):
+            best = v if best is None else pick(best, v)
+            triggers.append(tr)
+            values.append(best)
+        self.triggers = tuple(triggers)
+        self.values = tuple(values)
+
+    def tier(self, ratio: float) -> int:
+        """已触发（trigger <= ratio）的档位数，0 表示一档都未触发"""
+        if ratio != ratio:
+            return 0
+        return bisect.bisect_right(self.triggers, ratio)
+
+    def lookup(self, ratio: float):
+        """已触发档位的合并比例；一档都未触发时返回 None"""
+        i = self.tier(ratio)
+        return self.values[i - 1] if i else None
+
+    def next_trigger(self, ratio: float):
+        """下一档（trigger > ratio）的触发比例；已全部触发时返回 None"""
+        i = self.tier(ratio)
+        return self.triggers[i] if i < len(self.triggers) else None
+
+    def __bool__(self):
+        return bool(self.triggers)
+
+    def __eq__(self, other):
+        return isinstance(other, LadderTable) and self.triggers == other.triggers and self.values == other.values
+
+    def __hash__(self):
+        return hash((self.triggers, self.values))
+
+    def __repr__(self):
+        return f"LadderTable({list(zip(self.triggers, self.values))})"
+
+
+def _ladder(items, ratio_key: str, pick) -> LadderTable:
+    out = []
+    for item in (items or []):
+        if isinstance(item, dict):
+            out.append((float(item.get("trigger_ratio") or 0.0), float(item.get(ratio_key) or 0.0)))
+    return LadderTable(out, pick)
+
+
+# 快照字段：(配置键, 类型转换)；属性名为配置键小写
+_STRATEGY_FIELDS = (
+    ("MAKER_ONLY", _as_bool),
+    ("DIRECTION", str),
+    ("ALLOCATED_CAPITAL_USDC", float),
+    ("GRID_ENABLED", _as_bool),
+    ("ENABLE_BASE_POSITION", _as_bool),
+    ("BASE_POSITION_USDC", float),
+    ("BASE_GRID_SPACING", float),
+    ("BASE_ORDER_SIZE_USDC", float),
+    ("GRID_ADD_LEVELS", int),
+    ("GRID_TP_LEVELS", int),
+    ("GRID_LEVEL_SPACING_MODE", str),
+    ("GRID_LEVEL_SIZE_MULT", float),
+    ("REST_SYNC_INTERVAL_SEC", float),
+    ("ORDER_AUDIT_INTERVAL_SEC", float),
+    ("ORDER_FIRST_TIME_SEC", float),
+    ("GRID_ACTION_COOLDOWN_SEC", float),
+    ("TP_MAKER_ONLY", _as_bool),
+    ("SLOW_TREND_REQUOTE_ENABLED", _as_bool),
+    ("SLOW_TREND_REQUOTE_MIN_INTERVAL_SEC", float),
+    ("SLOW_TREND_MAX_ORDER_AGE_SEC", float),
+    ("SLOW_TREND_MAX_DRIFT_STEPS", float),
+    ("STATUS_LOG_INTERVAL_SEC", float),
+    ("RISK_EVAL_MIN_INTERVAL_SEC", float),
+    ("TICKER_EVAL_MIN_INTERVAL_SEC", float),
+    ("BATCH_ORDERS_ENABLED", _as_bool),
+    ("AMEND_ORDERS_ENABLED", _as_bool),
+    ("FILL_FAST_PATH_ENABLED", _as_bool),
+    ("EVAL_BAND_ENABLED", _as_bool),
+    ("EVAL_BAND_MAX_SEC", float),
+    ("REQUOTE_PRICE_TOLERANCE_TICKS", int),
+    ("REQUOTE_QTY_TOLERANCE_RATIO", float),
+    ("STOP_ON_HARDSTOP", _as_bool),
+    ("HARD_STOPLOSS_PRICE", float),
+    ("TAKE_PROFIT_ENABLED", _as_bool),
+    ("TAKE_PROFIT_PRICE", float),
+    ("TRAILING_STOP_ENABLED", _as_bool),
+    ("TRAILING_STOP_BASE_STOP_RATIO", float),
+    ("TRAILING_STOP_LADDER", lambda v: _ladder(v, "stop_ratio", max)),
+    ("TRAILING_PULLBACK_LADDER", lambda v: _ladder(v, "pullback_ratio", min)),
+    ("TRAILING_STOP_NATIVE", _as_bool),
+    ("STOP_REPLACE_MIN_TICKS", int),
+    ("PENDING_ENTRY_ENABLED", _as_bool),
+    ("PENDING_ENTRY_PRICE", float),
+    ("ORDER_CLIENT_ID_PREFIX", lambda v: str(v or "").strip() or "AF"),
+    ("HOT_RELOAD_ENABLED", _as_bool),
+    ("CONFIG_WATCH_INTERVAL_SEC", float),
+    ("CONFIG_ERROR_LOG_INTERVAL_SEC", float),
+)
+
+
+# 热加载变更分类：网格类需要重挂网格单，风控类需要重新评估止损/止盈，其余只影响节奏与日志
+_GRID_FIELDS = frozenset(
+    {
+        "direction",
+        "grid_enabled",
+        "enable_base_position",
+        "base_position_usdc",
+        "base_grid_spacing",
+        "base_order_size_usdc",
+        "grid_add_levels",
+        "grid_tp_levels",
+        "grid_level_spacing_mode",
+        "grid_level_size_mult",
+        "grid_action_cooldown_sec",
+        "order_first_time_sec",
+        "slow_trend_requote_enabled",
+        "slow_trend_requote_min_interval_sec",
+        "slow_trend_max_order_age_sec",
+        "slow_trend_max_drift_steps",
+        "requote_price_tolerance_ticks",
+        "requote_qty_tolerance_ratio",
+        "maker_only",
+        "tp_maker_only",
+        "pending_entry_enabled",
+        "pending_entry_price",
+        "order_client_id_prefix",
+    }
+)
+_RISK_FIELDS = frozenset(
+    {
+        "stop_on_hardstop",
+        "hard_stoploss_price",
+        "take_profit_enabled",
+        "take_profit_price",
+        "trailing_stop_enabled",
+        "trailing_stop_base_stop_ratio",
+        "trailing_stop_ladder",
+        "trailing_pullback_ladder",
+        "trailing_stop_native",
+        "stop_replace_min_ticks",
+        "leverage",
+        "margin_mode",
+    }
+)
+
+
+class ConfigChanges:
+    """两次配置快照之间的字段级差异，按影响的子系统分类。"""
+
+    __slots__ = ("fields", "grid", "risk", "cosmetic")
+
+    def __init__(self, fields: dict):
+        self.fields = dict(fields or {})
+        self.grid = sorted(k for k in self.fields if k in _GRID_FIELDS)
+        self.risk = sorted(k for k in self.fields if k in _RISK_FIELDS)
+        self.cosmetic = sorted(k for k in self.fields if k not in _GRID_FIELDS and k not in _RISK_FIELDS)
+
+    def __bool__(self):
+        return bool(self.fields)
+
+    def summary(self) -> str:
+        parts = []
+        for name, keys in (("网格", self.grid), ("风控", self.risk), ("其它", self.cosmetic)):
+            if keys:
+                parts.append(f"{name}[{','.join(keys)}]")
+        return " ".join(parts) or "无字段变化"
+
+
+class StrategyConfig:
+    """一次配置加载产出的只读快照：字段已完成类型转换，热路径直接读属性，不再访问磁盘。
+
+    止损阶梯预编译为 LadderTable；leverage/margin_mode 来自原始配置的
+    网格.杠杆倍数 与 保证金模式。get(KEY) 兼容按配置键读取。
+    """
+
+    __slots__ = tuple(k.lower() for k, _ in _STRATEGY_FIELDS) + ("leverage", "margin_mode", "version")
+
+    def __init__(self, cfg: dict, raw: dict = None, version: int = 0):
+        for key, conv in _STRATEGY_FIELDS:
+            object.__setattr__(self, key.lower(), conv(cfg.get(key)))
+        raw = raw if isinstance(raw, dict) else {}
+        grid = raw.get("网格") if isinstance(raw.get("网格"), dict) else {}
+        lev = None
+        try:
+            if grid.get("杠杆倍数") is not None:
+                lev = min(125, int(float(grid.get("杠杆倍数"))))
+        except Exception:
+            lev = None
+        object.__setattr__(self, "leverage", lev if (lev is not None and lev > 0) else None)
+        mm = str(raw.get("保证金模式") or "").strip()
+        object.__setattr__(self, "margin_mode", "cross" if mm == "全仓" else "isolated")
+        object.__setattr__(self, "version", int(version))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("StrategyConfig is read-only")
+
+    def get(self, key: str, default=None):
+        return getattr(self, str(key).lower(), default)
+
+    def diff(self, other) -> ConfigChanges:
+        """与另一快照逐字段比较（不含 version），返回 {字段: (旧值, 新值)} 的分类结果"""
+        fields = {}
+        for name in self.__slots__:
+            if name == "version":
+                continue
+            old = getattr(other, name, None) if other is not None else None
+            new = getattr(self, name)
+            if old != new:
+                fields[name] = (old, new)
+        return ConfigChanges(fields)
+
 
 class RiskEngine:
     def __init__(self, bot, config_path: str):
@@ -12,6 +245,8 @@ class RiskEngine:
         self._config = None
         self._config_mtime = None
         self._config_version = 0
+        self._strategy = StrategyConfig(self.default_config())
+        self._last_changes = ConfigChanges({})
         self._last_config_error_ts = 0.0
         self._last_config_error_sig = None
 
@@ -21,6 +256,12 @@ class RiskEngine:
             return cfg
         return self.default_config()
 
+    def get_strategy_config(self) -> StrategyConfig:
+        return self._strategy
+
+    def last_changes(self) -> ConfigChanges:
+        return self._last_changes
+
     def default_config(self) -> dict:
         return {
             "MAKER_ONLY": False,
@@ -31,7 +272,12 @@ class RiskEngine:
             "BASE_POSITION_USDC": 0.0,
             "BASE_GRID_SPACING": 0.0025,
             "BASE_ORDER_SIZE_USDC": 40.0,
+            "GRID_ADD_LEVELS": 1,
+            "GRID_TP_LEVELS": 1,
+            "GRID_LEVEL_SPACING_MODE": "geometric",
+            "GRID_LEVEL_SIZE_MULT": 1.0,
             "REST_SYNC_INTERVAL_SEC": 10.0,
+            "ORDER_AUDIT_INTERVAL_SEC": 60.0,
             "ORDER_FIRST_TIME_SEC": 10.0,
             "GRID_ACTION_COOLDOWN_SEC": 1.2,
             "TP_MAKER_ONLY": False,
@@ -41,6 +287,14 @@ class RiskEngine:
             "SLOW_TREND_MAX_DRIFT_STEPS": 3.0,
             "STATUS_LOG_INTERVAL_SEC": 60.0,
             "RISK_EVAL_MIN_INTERVAL_SEC": 0.8,
+            "TICKER_EVAL_MIN_INTERVAL_SEC": 0.5,
+            "BATCH_ORDERS_ENABLED": True,
+            "AMEND_ORDERS_ENABLED": True,
+            "FILL_FAST_PATH_ENABLED": True,
+            "EVAL_BAND_ENABLED": True,
+            "EVAL_BAND_MAX_SEC": 5.0,
+            "REQUOTE_PRICE_TOLERANCE_TICKS": 0,
+            "REQUOTE_QTY_TOLERANCE_RATIO": 0.0,
             "STOP_ON_HARDSTOP": True,
             "HARD_STOPLOSS_PRICE": 0.0,
             "TAKE_PROFIT_ENABLED": False,
@@ -49,6 +303,8 @@ class RiskEngine:
             "TRAILING_STOP_BASE_STOP_RATIO": 0.0,
             "TRAILING_STOP_LADDER": [],
             "TRAILING_PULLBACK_LADDER": [],
+            "TRAILING_STOP_NATIVE": False,
+            "STOP_REPLACE_MIN_TICKS": 1,
             "PENDING_ENTRY_ENABLED": False,
             "PENDING_ENTRY_PRICE": 0.0,
             "ORDER_CLIENT_ID_PREFIX": "AF",
@@ -74,7 +330,12 @@ class RiskEngine:
             "基础网格间距": "BASE_GRID_SPACING",
             "基础下单金额USDC": "BASE_ORDER_SIZE_USDC",
             "基础下单金额USDT": "BASE_ORDER_SIZE_USDC",
+            "加仓挂单层数": "GRID_ADD_LEVELS",
+            "止盈挂单层数": "GRID_TP_LEVELS",
+            "层间距模式": "GRID_LEVEL_SPACING_MODE",
+            "层金额倍数": "GRID_LEVEL_SIZE_MULT",
             "状态同步间隔秒": "REST_SYNC_INTERVAL_SEC",
+            "挂单对账间隔秒": "ORDER_AUDIT_INTERVAL_SEC",
             "首次下单等待秒": "ORDER_FIRST_TIME_SEC",
             "最小重挂间隔秒": "GRID_ACTION_COOLDOWN_SEC",
             "慢单边追踪重挂": "SLOW_TREND_REQUOTE_ENABLED",
@@ -83,6 +344,14 @@ class RiskEngine:
             "慢单边重挂偏移格数": "SLOW_TREND_MAX_DRIFT_STEPS",
             "状态日志间隔秒": "STATUS_LOG_INTERVAL_SEC",
             "风控最小评估间隔秒": "RISK_EVAL_MIN_INTERVAL_SEC",
+            "行情评估最小间隔秒": "TICKER_EVAL_MIN_INTERVAL_SEC",
+            "批量下单": "BATCH_ORDERS_ENABLED",
+            "改单代替撤挂": "AMEND_ORDERS_ENABLED",
+            "成交快速补单": "FILL_FAST_PATH_ENABLED",
+            "价格带跳过评估": "EVAL_BAND_ENABLED",
+            "价格带最长秒数": "EVAL_BAND_MAX_SEC",
+            "重挂价格容差格数": "REQUOTE_PRICE_TOLERANCE_TICKS",
+            "重挂数量容差比例": "REQUOTE_QTY_TOLERANCE_RATIO",
             "硬止损后停止策略": "STOP_ON_HARDSTOP",
             "硬止损价格": "HARD_STOPLOSS_PRICE",
             "止盈启用": "TAKE_PROFIT_ENABLED",
@@ -91,6 +360,8 @@ class RiskEngine:
             "移动止损初始止损比例": "TRAILING_STOP_BASE_STOP_RATIO",
             "移动止损阶梯": "TRAILING_STOP_LADDER",
             "移动止损回撤阶梯": "TRAILING_PULLBACK_LADDER",
+            "移动止损交易所托管": "TRAILING_STOP_NATIVE",
+            "止损更新最小格数": "STOP_REPLACE_MIN_TICKS",
             "订单ID前缀": "ORDER_CLIENT_ID_PREFIX",
             "启用热加载": "HOT_RELOAD_ENABLED",
             "热加载检查间隔秒": "CONFIG_WATCH_INTERVAL_SEC",
@@ -116,6 +387,14 @@ class RiskEngine:
                 out["BASE_GRID_SPACING"] = grid.get("间距比例")
             if "每格金额" in grid:
                 out["BASE_ORDER_SIZE_USDC"] = grid.get("每格金额")
+            if "加仓层数" in grid:
+                out["GRID_ADD_LEVELS"] = grid.get("加仓层数")
+            if "止盈层数" in grid:
+                out["GRID_TP_LEVELS"] = grid.get("止盈层数")
+            if "层间距模式" in grid:
+                out["GRID_LEVEL_SPACING_MODE"] = grid.get("层间距模式")
+            if "层金额倍数" in grid:
+                out["GRID_LEVEL_SIZE_MULT"] = grid.get("层金额倍数")
             if "只做MAKER" in grid:
                 out["MAKER_ONLY"] = grid.get("只做MAKER")
             if "只做Maker" in grid:
@@ -147,6 +426,24 @@ class RiskEngine:
         if isinstance(sync, dict):
             if "状态同步间隔秒" in sync:
                 out["REST_SYNC_INTERVAL_SEC"] = sync.get("状态同步间隔秒")
+            if "挂单对账间隔秒" in sync:
+                out["ORDER_AUDIT_INTERVAL_SEC"] = sync.get("挂单对账间隔秒")
+            if "行情评估最小间隔秒" in sync:
+                out["TICKER_EVAL_MIN_INTERVAL_SEC"] = sync.get("行情评估最小间隔秒")
+            if "批量下单" in sync:
+                out["BATCH_ORDERS_ENABLED"] = sync.get("批量下单")
+            if "改单代替撤挂" in sync:
+                out["AMEND_ORDERS_ENABLED"] = sync.get("改单代替撤挂")
+            if "成交快速补单" in sync:
+                out["FILL_FAST_PATH_ENABLED"] = sync.get("成交快速补单")
+            if "价格带跳过评估" in sync:
+                out["EVAL_BAND_ENABLED"] = sync.get("价格带跳过评估")
+            if "价格带最长秒数" in sync:
+                out["EVAL_BAND_MAX_SEC"] = sync.get("价格带最长秒数")
+            if "重挂价格容差格数" in sync:
+                out["REQUOTE_PRICE_TOLERANCE_TICKS"] = sync.get("重挂价格容差格数")
+            if "重挂数量容差比例" in sync:
+                out["REQUOTE_QTY_TOLERANCE_RATIO"] = sync.get("重挂数量容差比例")
             if "最小重挂间隔秒" in sync:
                 out["GRID_ACTION_COOLDOWN_SEC"] = sync.get("最小重挂间隔秒")
             if "状态日志间隔秒" in sync:
@@ -183,6 +480,10 @@ class RiskEngine:
                 out["TRAILING_STOP_LADDER"] = trailing.get("阶梯")
             if "回撤阶梯" in trailing:
                 out["TRAILING_PULLBACK_LADDER"] = trailing.get("回撤阶梯")
+            if "交易所托管" in trailing:
+                out["TRAILING_STOP_NATIVE"] = trailing.get("交易所托管")
+            if "更新最小格数" in trailing:
+                out["STOP_REPLACE_MIN_TICKS"] = trailing.get("更新最小格数")
 
         pe = raw.get("挂单")
         if isinstance(pe, dict):
@@ -233,11 +534,55 @@ class RiskEngine:
         if base_size <= 0:
             raise ValueError("BASE_ORDER_SIZE_USDC must be > 0")
 
+        for key in ("GRID_ADD_LEVELS", "GRID_TP_LEVELS"):
+            levels = int(float(cfg.get(key, 1) or 1))
+            if levels < 1 or levels > MAX_GRID_LEVELS:
+                raise ValueError(f"{key} must be in [1, {MAX_GRID_LEVELS}]")
+            cfg[key] = int(levels)
+        mode = str(cfg.get("GRID_LEVEL_SPACING_MODE", "geometric") or "geometric").strip().lower()
+        if mode in {"等比", "geometric", "geo"}:
+            mode = "geometric"
+        elif mode in {"等差", "arithmetic", "arith"}:
+            mode = "arithmetic"
+        else:
+            raise ValueError("GRID_LEVEL_SPACING_MODE must be geometric/arithmetic")
+        cfg["GRID_LEVEL_SPACING_MODE"] = mode
+        size_mult = float(cfg.get("GRID_LEVEL_SIZE_MULT", 1.0) or 0.0)
+        if size_mult <= 0:
+            raise ValueError("GRID_LEVEL_SIZE_MULT must be > 0")
+        cfg["GRID_LEVEL_SIZE_MULT"] = float(size_mult)
+
         rest_sync = float(cfg.get("REST_SYNC_INTERVAL_SEC", 10.0))
         if rest_sync <= 0:
             raise ValueError("REST_SYNC_INTERVAL_SEC must be > 0")
         cfg["REST_SYNC_INTERVAL_SEC"] = float(rest_sync)
 
+        audit_itv = float(cfg.get("ORDER_AUDIT_INTERVAL_SEC", 60.0))
+        if audit_itv <= 0:
+            raise ValueError("ORDER_AUDIT_INTERVAL_SEC must be > 0")
+        cfg["ORDER_AUDIT_INTERVAL_SEC"] = float(audit_itv)
+
+        ticker_itv = float(cfg.get("TICKER_EVAL_MIN_INTERVAL_SEC", 0.5))
+        if ticker_itv < 0:
+            raise ValueError("TICKER_EVAL_MIN_INTERVAL_SEC must be >= 0")
+        cfg["TICKER_EVAL_MIN_INTERVAL_SEC"] = float(ticker_itv)
+        cfg["BATCH_ORDERS_ENABLED"] = bool(cfg.get("BATCH_ORDERS_ENABLED", True))
+        cfg["AMEND_ORDERS_ENABLED"] = bool(cfg.get("AMEND_ORDERS_ENABLED", True))
+        cfg["FILL_FAST_PATH_ENABLED"] = bool(cfg.get("FILL_FAST_PATH_ENABLED", True))
+        cfg["EVAL_BAND_ENABLED"] = bool(cfg.get("EVAL_BAND_ENABLED", True))
+        band_sec = float(cfg.get("EVAL_BAND_MAX_SEC", 5.0) or 0.0)
+        if band_sec < 0:
+            raise ValueError("EVAL_BAND_MAX_SEC must be >= 0")
+        cfg["EVAL_BAND_MAX_SEC"] = float(band_sec)
+        price_tol = int(cfg.get("REQUOTE_PRICE_TOLERANCE_TICKS", 0) or 0)
+        if price_tol < 0:
+            raise ValueError("REQUOTE_PRICE_TOLERANCE_TICKS must be >= 0")
+        cfg["REQUOTE_PRICE_TOLERANCE_TICKS"] = int(price_tol)
+        qty_tol = float(cfg.get("REQUOTE_QTY_TOLERANCE_RATIO", 0.0) or 0.0)
+        if qty_tol < 0:
+            raise ValueError("REQUOTE_QTY_TOLERANCE_RATIO must be >= 0")
+        cfg["REQUOTE_QTY_TOLERANCE_RATIO"] = float(qty_tol)
+
         first_wait = float(cfg.get("ORDER_FIRST_TIME_SEC", 10.0))
         if first_wait < 0:
             raise ValueError("ORDER_FIRST_TIME_SEC must be >= 0")
@@ -331,6 +676,11 @@ class RiskEngine:
             norm_pb.append({"trigger_ratio": float(trig_f), "pullback_ratio": float(pb_f)})
         norm_pb.sort(key=lambda x: float(x["trigger_ratio"]))
         cfg["TRAILING_PULLBACK_LADDER"] = norm_pb
+        cfg["TRAILING_STOP_NATIVE"] = bool(cfg.get("TRAILING_STOP_NATIVE", False))
+        min_ticks = int(float(cfg.get("STOP_REPLACE_MIN_TICKS", 1) or 1))
+        if min_ticks < 1:
+            raise ValueError("STOP_REPLACE_MIN_TICKS must be >= 1")
+        cfg["STOP_REPLACE_MIN_TICKS"] = int(min_ticks)
 
         cfg["PENDING_ENTRY_ENABLED"] = bool(cfg.get("PENDING_ENTRY_ENABLED", False))
         pe_price = float(cfg.get("PENDING_ENTRY_PRICE", 0.0) or 0.0)
@@ -358,6 +708,9 @@ class RiskEngine:
                 self._config = self.default_config()
                 self._config_mtime = None
                 self._config_version += 1
+                strategy = StrategyConfig(self._config, None, self._config_version)
+                self._last_changes = strategy.diff(self._strategy)
+                self._strategy = strategy
                 return True
             return False
 
@@ -368,6 +721,7 @@ class RiskEngine:
             raw = json.load(f)
         if not isinstance(raw, dict):
             raise ValueError("config.json must be a JSON object")
+        source = raw
         nested = self._extract_nested_config(raw)
         if nested:
             raw = dict(raw)
@@ -376,44 +730,68 @@ class RiskEngine:
         cfg = self.default_config()
         cfg.update(raw)
         cfg = self._validate(cfg)
+        strategy = StrategyConfig(cfg, source, self._config_version + 1)
+        changes = strategy.diff(self._strategy)
         self._config = cfg
         self._config_mtime = mtime
+        if not changes and not force:
+            # 仅 mtime 变化（保存未改动、格式调整）：不升版本，不触发重同步
+            return False
         self._config_version += 1
+        self._strategy = strategy
+        self._last_changes = changes
         return True
 
     async def config_watch_loop(self):
         import logging
 
         log = logging.getLogger()
-        while not self.bot.shutdown_event.is_set():
-            try:
-                changed = False
-                async with self.bot.lock:
-                    cfg = self.get_config()
-                    if not bool(cfg.get("HOT_RELOAD_ENABLED", True)):
-                        changed = False
-                    else:
-                        changed = self.reload_config(force=False)
+        # 配置文件变化由文件监视器推送；inotify 不可用时按 CONFIG_WATCH_INTERVAL_SEC 轮询
+        watcher = FileWatcher(float(self.get_config().get("CONFIG_WATCH_INTERVAL_SEC", 1.0)))
+        watcher.watch_file(self.config_path)
+        retry = False
+        try:
+            while not self.bot.shutdown_event.is_set():
+                # 上次加载失败（如文件写到一半）时按检查间隔重试，否则一直等到下一次变化
+                timeout = float(self.get_config().get("CONFIG_WATCH_INTERVAL_SEC", 1.0)) if retry else None
+                changes = await watcher.wait(timeout=timeout, stop_event=self.bot.shutdown_event)
+                if self.bot.shutdown_event.is_set():
+                    break
+                if not changes and not retry:
+                    continue
+                try:
+                    changed = False
+                    async with self.bot.lock.section("config_reload"):
+                        cfg = self.get_config()
+                        if not bool(cfg.get("HOT_RELOAD_ENABLED", True)):
+                            changed = False
+                        else:
+                            changed = self.reload_config(force=False)
+                        if changed:
+                            self.bot._strategy_config_version = int(self._config_version)
+                            self.bot._on_config_changed(self._last_changes)
+                    retry = False
+                    watcher.poll_interval = float(self.get_config().get("CONFIG_WATCH_INTERVAL_SEC", 1.0))
                     if changed:
-                        self.bot._strategy_config_version = int(self._config_version)
-                        self.bot._force_orders_resync = True
-                if changed:
-                    log.info(f"策略配置已热更新: {os.path.basename(self.config_path)} v{self._config_version}")
-            except Exception as e:
-                now = time.time()
-                cooldown = float(self.get_config().get("CONFIG_ERROR_LOG_INTERVAL_SEC", 10.0))
-                sig = f"{type(e).__name__}:{str(e)}"
-                if sig != self._last_config_error_sig or (now - float(self._last_config_error_ts or 0.0)) >= cooldown:
-                    self._last_config_error_sig = sig
-                    self._last_config_error_ts = now
-                    log.error(f"策略配置热更新失败: {e}")
-            await asyncio.sleep(float(self.get_config().get("CONFIG_WATCH_INTERVAL_SEC", 1.0)))
+                        log.info(f"策略配置已热更新: {os.path.basename(self.config_path)} v{self._config_version} {self._last_changes.summary()}")
+                except Exception as e:
+                    retry = True
+                    now = time.time()
+                    cooldown = float(self.get_config().get("CONFIG_ERROR_LOG_INTERVAL_SEC", 10.0))
+                    sig = f"{type(e).__name__}:{str(e)}"
+                    if sig != self._last_config_error_sig or (now - float(self._last_config_error_ts or 0.0)) >= cooldown:
+                        self._last_config_error_sig = sig
+                        self._last_config_error_ts = now
+                        log.error(f"策略配置热更新失败: {e}")
+        finally:
+            watcher.close()
 
     def _client_id(self, side: str, role: str, add_spacing: float, add_usdc: float, tp_spacing: float, tp_usdc: float) -> str:
         prefix = str(self.get_config().get("ORDER_CLIENT_ID_PREFIX", "AF")).strip() or "AF"
         s = str(side or "").strip().lower()
         r = str(role or "").strip().lower()
-        base = f"{self._config_version}|{s}|{r}|{add_spacing:.8f}|{add_usdc:.4f}|{tp_spacing:.8f}|{tp_usdc:.4f}"
+        # 只由网格参数决定：无关字段热更新不会改变 client id，也就不会触发整体重挂
+        base = f"{s}|{r}|{add_spacing:.8f}|{add_usdc:.4f}|{tp_spacing:.8f}|{tp_usdc:.4f}"
         digest = hashlib.md5(base.encode("utf-8")).hexdigest()[:12]
         side_ch = "L" if s == "long" else "S"
         role_ch = "A" if r == "add" else "T"
@@ -438,6 +816,33 @@ class RiskEngine:
         side_ch = "L" if s == "long" else "S"
         return f"{prefix}{side_ch}H{digest}"
 
+    def level_tables(self, side: str, anchor: float, position_amount: float):
+        """持仓时由锚点生成多层加仓/止盈挂单表 {"add": LevelTable, "tp": LevelTable}；
+        加仓与止盈都只有一层时返回 None（沿用单层挂单）。止盈各层合计不超过持仓。
+        """
+        sc = self.get_strategy_config()
+        add_n = int(sc.grid_add_levels or 1)
+        tp_n = int(sc.grid_tp_levels or 1)
+        spec = getattr(self.bot, "market_spec", None)
+        if (add_n <= 1 and tp_n <= 1) or spec is None:
+            return None
+        a = float(anchor or 0.0)
+        pos_lots = spec.qty_to_lots(float(position_amount or 0.0), "down")
+        if a <= 0 or pos_lots <= 0:
+            return None
+        s = str(side or "").strip().lower()
+        spacing = float(sc.base_grid_spacing)
+        usdc = float(sc.base_order_size_usdc)
+        geometric = sc.grid_level_spacing_mode != "arithmetic"
+        mult = float(sc.grid_level_size_mult or 1.0)
+        sign = -1 if s == "long" else 1
+        add_family = self._client_id(s, "add", spacing, usdc, spacing, usdc)
+        tp_family = self._client_id(s, "tp", spacing, usdc, spacing, usdc)
+        return {
+            "add": build_levels(spec, "add", a, spacing, add_n, sign, geometric, usdc, mult, family=add_family),
+            "tp": build_levels(spec, "tp", a, spacing, tp_n, -sign, geometric, usdc, mult, max_lots=pos_lots, family=tp_family),
+        }
+
     def side_plan(self, side: str, price: float, position_amount: float) -> dict:
         cfg = self.get_config()
         p = float(price or 0.0)
@@ -0,0 +1,81 @@
+TRAILING_TYPE = "TRAILING_STOP_MARKET"
+
+
+class StopManager:
+    """按方向维护现存止损单视图，并决定止损价变化是否值得撤旧挂新。
+
+    现存止损完全来自 OrderStore（ALGO_UPDATE / ORDER_TRADE_UPDATE 事件与下单回执），
+    不再为每次更新拉取挂单；与交易所的 REST 全量对账由挂单巡检按 ORDER_AUDIT_INTERVAL_SEC 慢速进行。
+    新止损价只有向有利方向移动至少 min_improve_ticks 格才替换；向不利方向移动（配置变化、
+    均价变化）时总是替换。
+    """
+
+    def __init__(self, order_store, min_improve_ticks: int = 1):
+        self.order_store = order_store
+        self.min_improve_ticks = max(1, int(min_improve_ticks or 1))
+        self.placed = 0
+        self.replaced = 0
+        self.avoided = 0
+        self.cancelled = 0
+
+    @staticmethod
+    def close_side(side: str) -> str:
+        return "sell" if str(side or "").strip().lower() == "long" else "buy"
+
+    def side_stops(self, side: str, hedge: bool = False, trailing: bool = False) -> list:
+        """平 side 方向持仓的现存条件单；trailing 为 True 时只取移动止损单，否则排除移动止损单"""
+        s = str(side or "").strip().lower()
+        o_side = self.close_side(s)
+        required_ps = ("LONG" if s == "long" else "SHORT") if hedge else None
+        out = []
+        for rec in self.order_store.stop_orders():
+            if rec.side != o_side:
+                continue
+            if required_ps is not None and rec.position_side not in {required_ps, None, "BOTH"}:
+                continue
+            if (rec.order_type == TRAILING_TYPE) != bool(trailing):
+                continue
+            out.append(rec)
+        return out
+
+    def decide(self, side: str, desired_tick: int, live: list) -> str:
+        """返回 keep / place / replace：keep 表示现存唯一止损足够接近，无需任何请求。
+
+        这里管理的是 closePosition 止损，与持仓数量无关；带数量的移动止损单由调用方按数量另行比较。
+        """
+        if not live:
+            return "place"
+        if len(live) > 1:
+            return "replace"
+        cur = int(live[0].stop_tick or 0)
+        if cur <= 0:
+            return "replace"
+        diff = int(desired_tick) - cur
+        if str(side or "").strip().lower() != "long":
+            diff = -diff
+        if diff == 0:
+            return "keep"
+        if diff < 0:
+            return "replace"
+        if diff < self.min_improve_ticks:
+            self.avoided += 1
+            return "keep"
+        return "replace"
+
+    def note_placed(self, replaced: bool):
+        if replaced:
+            self.replaced += 1
+        else:
+            self.placed += 1
+
+    def note_cancelled(self, n: int = 1):
+        self.cancelled += int(n)
+
+    def stats(self) -> dict:
+        return {
+            "min_improve_ticks": int(self.min_improve_ticks),
+            "placed": int(self.placed),
+            "replaced": int(self.replaced),
+            "avoided": int(self.avoided),
+            "cancelled": int(self.cancelled),
+        }
@@ -0,0 +1,193 @@
+import json
+import shutil
+import time
+
+import pytest
+
+pytest.importorskip("ccxt")
+pytest.importorskip("websockets")
+
+from grid_Stablize_BN_DB01 import GridTradingBot, _script_dir  # noqa: E402
+
+ETH = {
+    "id": "ETHUSDC",
+    "symbol": "ETH/USDC:USDC",
+    "precision": {"price": 0.01, "amount": 0.001},
+    "limits": {"amount": {"min": 0.001}, "cost": {"min": 5}},
+    "contractSize": 1.0,
+    "info": {
+        "filters": [
+            {"filterType": "PRICE_FILTER", "tickSize": "0.01"},
+            {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001"},
+            {"filterType": "MIN_NOTIONAL", "notional": "5"},
+        ]
+    },
+}
+
+
+class FakeExchange:
+    """只实现构造机器人与批量下单/撤单用到的接口；batch_errors/cancel_errors 按 client id / 订单 id 注入单笔错误"""
+
+    def __init__(self):
+        self.calls = []
+        self.seq = 100
+        self.batch_errors = {}
+        self.cancel_errors = {}
+        self.last_response_headers = {}
+
+    def market(self, symbol):
+        return ETH
+
+    def fetch_markets(self):
+        return [ETH]
+
+    def fetch_positions(self, params=None):
+        return []
+
+    def fetch_open_orders(self, symbol=None, *a, **k):
+        self.calls.append("fetch_open_orders")
+        return []
+
+    def fetch_balance(self, params=None):
+        return {"info": {}}
+
+    def fetch_position_mode(self, symbol=None):
+        return {"hedged": False}
+
+    def set_leverage(self, *a, **k):
+        return {}
+
+    def set_margin_mode(self, *a, **k):
+        return {}
+
+    def cancel_order(self, order_id, symbol=None):
+        self.calls.append(("cancel_order", str(order_id)))
+        return {"id": str(order_id)}
+
+    def fapiPrivatePostBatchOrders(self, params):
+        legs = json.loads(params["batchOrders"])
+        self.calls.append(("batch_place", [leg["newClientOrderId"] for leg in legs]))
+        out = []
+        for leg in legs:
+            cid = leg["newClientOrderId"]
+            if cid in self.batch_errors:
+                code, msg = self.batch_errors[cid]
+                out.append({"code": code, "msg": msg})
+                continue
+            self.seq += 1
+            out.append({
+                "orderId": self.seq,
+                "clientOrderId": cid,
+                "symbol": leg["symbol"],
+                "side": leg["side"],
+                "type": "LIMIT",
+                "price": leg["price"],
+                "origQty": leg["quantity"],
+                "executedQty": "0",
+                "status": "NEW",
+                "reduceOnly": leg.get("reduceOnly") == "true",
+                "positionSide": leg.get("positionSide", "BOTH"),
+                "updateTime": int(time.time() * 1000),
+            })
+        return out
+
+    def fapiPrivateDeleteBatchOrders(self, params):
+        ids = json.loads(params["orderIdList"])
+        self.calls.append(("batch_cancel", [str(x) for x in ids]))
+        out = []
+        for oid in ids:
+            if str(oid) in self.cancel_errors:
+                code, msg = self.cancel_errors[str(oid)]
+                out.append({"code": code, "msg": msg})
+            else:
+                out.append({"orderId": oid, "status": "CANCELED"})
+        return out
+
+    def parse_order(self, r, market=None):
+        return {
+            "id": str(r["orderId"]),
+            "clientOrderId": r["clientOrderId"],
+            "side": r["side"].lower(),
+            "type": "limit",
+            "price": float(r["price"]),
+            "amount": float(r["origQty"]),
+            "remaining": float(r["origQty"]),
+            "filled": 0.0,
+            "status": "open",
+            "reduceOnly": r["reduceOnly"],
+            "timestamp": r["updateTime"],
+            "info": r,
+        }
+
+
+@pytest.fixture
+def bot(tmp_path):
+    cfg = tmp_path / "cfg.json"
+    shutil.copy(f"{_script_dir}/config.json", cfg)
+    fake = FakeExchange()
+    b = GridTradingBot("k", "s", "ETH", "USDC", 0.003, 0.01, 10, "testnet", 10, 0, exchange=fake, strategy_config_path=str(cfg), instance_id="test_batch", external_streams=True)
+    b.best_bid_price = 2000.0
+    b.best_ask_price = 2000.01
+    b.latest_price = 2000.0
+    fake.calls.clear()
+    return b
+
+
+def buy_legs(n):
+    return [
+        {"side": "buy", "price": 1990.0 - i, "quantity": 0.01, "client_order_id": f"leg-{i}"}
+        for i in range(n)
+    ]
+
+
+def test_place_batch_chunks_and_maps_results(bot):
+    fake = bot.exchange
+    fake.batch_errors = {"leg-1": (-2019, "Margin is insufficient."), "leg-6": (-4164, "Order's notional must be no smaller than 5")}
+    legs = buy_legs(7)
+    results = bot.place_orders_batch(legs)
+    assert [c for c in fake.calls if c[0] == "batch_place"] == [
+        ("batch_place", ["leg-0", "leg-1", "leg-2", "leg-3", "leg-4"]),
+        ("batch_place", ["leg-5", "leg-6"]),
+    ]
+    assert [cid for cid, _ in results] == [leg["client_order_id"] for leg in legs]
+    assert [order is not None for _, order in results] == [True, False, True, True, True, True, False]
+    for (cid, order), leg in zip(results, legs):
+        if order is not None:
+            assert order["clientOrderId"] == cid
+            assert float(order["price"]) == leg["price"]
+    stored = sorted(rec.client_id for rec in bot.order_store.grid_orders())
+    assert stored == ["leg-0", "leg-2", "leg-3", "leg-4", "leg-5"]
+    assert "fetch_open_orders" not in fake.calls
+
+
+def test_place_batch_request_failure_only_fails_its_chunk(bot):
+    fake = bot.exchange
+    post = fake.fapiPrivatePostBatchOrders
+    state = {"n": 0}
+
+    def flaky(params):
+        state["n"] += 1
+        if state["n"] == 1:
+            raise RuntimeError("network")
+        return post(params)
+
+    fake.fapiPrivatePostBatchOrders = flaky
+    results = bot.place_orders_batch(buy_legs(6))
+    assert [cid for cid, _ in results] == [f"leg-{i}" for i in range(6)]
+    assert [order is not None for _, order in results] == [False] * 5 + [True]
+    assert sorted(rec.client_id for rec in bot.order_store.grid_orders()) == ["leg-5"]
+
+
+def test_cancel_batch_partial_failure(bot):
+    fake = bot.exchange
+    results = bot.place_orders_batch(buy_legs(12))
+    ids = [order["id"] for _, order in results]
+    assert len(bot.order_store.grid_orders()) == 12
+    fake.calls.clear()
+    # 已成交/已撤（-2011）的单同样从挂单簿移除，其它错误的单保留
+    fake.cancel_errors = {ids[1]: (-2011, "Unknown order sent."), ids[11]: (-1000, "An unknown error occured.")}
+    bot.cancel_orders_batch(ids + [ids[0]])
+    assert [c for c in fake.calls if c[0] == "batch_cancel"] == [("batch_cancel", ids[:10]), ("batch_cancel", ids[10:])]
+    assert [rec.order_id for rec in bot.order_store.grid_orders()] == [ids[11]]
+    assert not [c for c in fake.calls if c[0] == "cancel_order"]
+    assert "fetch_open_orders" not in fake.calls
@@ -0,0 +1,64 @@
+import pytest
+
+from risk_manager import RiskEngine, StrategyConfig
+
+# 改动后需要重挂网格单的字段：决定对账保留哪些挂单、何时重挂
+GRID = [
+    ("GRID_ENABLED", False),
+    ("BASE_GRID_SPACING", 0.004),
+    ("GRID_ADD_LEVELS", 3),
+    ("GRID_ACTION_COOLDOWN_SEC", 5.0),
+    ("ORDER_FIRST_TIME_SEC", 30.0),
+    ("SLOW_TREND_REQUOTE_ENABLED", True),
+    ("SLOW_TREND_REQUOTE_MIN_INTERVAL_SEC", 15.0),
+    ("SLOW_TREND_MAX_ORDER_AGE_SEC", 45.0),
+    ("SLOW_TREND_MAX_DRIFT_STEPS", 5.0),
+    ("REQUOTE_PRICE_TOLERANCE_TICKS", 2),
+    ("REQUOTE_QTY_TOLERANCE_RATIO", 0.05),
+    ("MAKER_ONLY", True),
+]
+RISK = [
+    ("HARD_STOPLOSS_PRICE", 1500.0),
+    ("TAKE_PROFIT_PRICE", 2500.0),
+    ("TRAILING_STOP_BASE_STOP_RATIO", 0.03),
+    ("STOP_REPLACE_MIN_TICKS", 4),
+]
+COSMETIC = [
+    ("STATUS_LOG_INTERVAL_SEC", 10.0),
+    ("TICKER_EVAL_MIN_INTERVAL_SEC", 0.2),
+    ("EVAL_BAND_MAX_SEC", 2.0),
+    ("CONFIG_WATCH_INTERVAL_SEC", 3.0),
+]
+
+
+@pytest.fixture(scope="module")
+def base_cfg():
+    return RiskEngine(None, "").default_config()
+
+
+def _classify(base_cfg, key, value):
+    old = StrategyConfig(base_cfg)
+    cfg = dict(base_cfg)
+    assert cfg.get(key) != value, key
+    cfg[key] = value
+    changes = StrategyConfig(cfg).diff(old)
+    assert list(changes.fields) == [key.lower()]
+    return changes
+
+
+@pytest.mark.parametrize("key,value", GRID)
+def test_grid_fields(base_cfg, key, value):
+    changes = _classify(base_cfg, key, value)
+    assert changes.grid == [key.lower()] and not changes.risk and not changes.cosmetic
+
+
+@pytest.mark.parametrize("key,value", RISK)
+def test_risk_fields(base_cfg, key, value):
+    changes = _classify(base_cfg, key, value)
+    assert changes.risk == [key.lower()] and not changes.grid and not changes.cosmetic
+
+
+@pytest.mark.parametrize("key,value", COSMETIC)
+def test_cosmetic_fields(base_cfg, key, value):
+    changes = _classify(base_cfg, key, value)
+    assert changes.cosmetic == [key.lower()] and not changes.grid and not changes.risk
@@ -0,0 +1,54 @@
+import json
+import os
+import time
+
+import pytest
+
+from file_watcher import FileWatcher
+from grid_instance_manager import FLAG_SUFFIXES, SlotScanner
+
+
+def _atomic_write(path, payload):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_suffix_filter_ignores_status_noise(tmp_path, use_inotify):
+    d = str(tmp_path)
+    w = FileWatcher(0.05, use_inotify=use_inotify)
+    w.watch_dir(d, suffixes=FLAG_SUFFIXES)
+    time.sleep(0.06)
+    w.poll(0)
+    _atomic_write(os.path.join(d, "rest_budget.json"), {"t": time.time()})
+    _atomic_write(os.path.join(d, "slot1.json"), {"t": time.time()})
+    time.sleep(0.06)
+    assert w.poll(0.1) == set()
+    flag = os.path.join(d, "slot1.stop")
+    open(flag, "w").close()
+    time.sleep(0.06)
+    assert w.poll(0.2) == {flag}
+    os.remove(flag)
+    time.sleep(0.06)
+    assert w.poll(0.2) == {flag}
+
+
+def test_slot_scanner_tracks_only_flags(tmp_path):
+    configs = tmp_path / "configs"
+    status = tmp_path / "status"
+    configs.mkdir()
+    status.mkdir()
+    (status / "rest_budget.json").write_text("{}")
+    (status / "slot1.pid").write_text("123")
+    scanner = SlotScanner(str(configs), str(status), True, False, 0.05)
+    assert scanner.has_flag("slot1.pid")
+    assert not scanner.has_flag("rest_budget.json")
+    _atomic_write(str(status / "rest_budget.json"), {"t": time.time()})
+    time.sleep(0.06)
+    assert scanner.poll(0.1) is False
+    (status / "slot1.restart").write_text("")
+    time.sleep(0.06)
+    assert scanner.poll(0.2) is True
+    assert scanner.has_flag("slot1.restart")
@@ -0,0 +1,136 @@
+from types import SimpleNamespace
+
+import pytest
+
+from market_spec import MarketSpec
+from risk_manager import LadderTable
+
+NAN = float("nan")
+
+STOP_LADDERS = [
+    [],
+    [(0.01, 0.003)],
+    [(0.01, 0.003), (0.02, 0.01), (0.04, 0.025)],
+    # 乱序、重复触发比例、后档比例更小
+    [(0.03, 0.005), (0.01, 0.004), (0.02, 0.002), (0.02, 0.006)],
+    # NaN 触发比例永远不满足
+    [(NAN, 0.5), (0.015, 0.007), (0.0, 0.001)],
+    [(-0.01, -0.002), (0.005, 0.001)],
+]
+PULLBACK_LADDERS = [
+    [],
+    [(0.01, 0.02)],
+    [(0.01, 0.02), (0.02, 0.015), (0.03, 0.01)],
+    [(0.02, 0.01), (0.02, 0.03), (0.01, 0.012), (NAN, 0.001)],
+]
+ENTRIES = [round(1500.0 + 37.5 * i, 2) for i in range(17)]
+PEAK_OFFSETS = [-0.03 + 0.0025 * i for i in range(29)]
+
+
+def baseline_fold(pairs, ratio, pick):
+    """改造前的逐档遍历：所有 ratio >= trigger 的档位取 max/min"""
+    best = None
+    for tr, v in pairs:
+        if ratio >= tr:
+            best = v if best is None else pick(best, v)
+    return best
+
+
+def baseline_stop_price(side, ep, peak, base_ratio, ladder, pb_ladder, hs_price, spec):
+    """改造前 _compute_trailing_stop_price 的候选价合并（不含跨调用的棘轮）"""
+    candidates = []
+    if base_ratio > 0:
+        candidates.append(peak * (1.0 - base_ratio) if side == "long" else peak * (1.0 + base_ratio))
+    if ladder:
+        pr = (peak / ep) - 1.0 if side == "long" else (ep / peak) - 1.0
+        best = baseline_fold(ladder, pr, max)
+        if best is not None:
+            candidates.append(ep * (1.0 + best) if side == "long" else ep * (1.0 - best))
+    if pb_ladder:
+        pr = (peak / ep) - 1.0 if side == "long" else (ep / peak) - 1.0
+        best_pb = baseline_fold(pb_ladder, pr, min)
+        if best_pb is not None and best_pb > 0:
+            candidates.append(peak * (1.0 - best_pb) if side == "long" else peak * (1.0 + best_pb))
+    if hs_price > 0:
+        candidates.append(hs_price)
+    if not candidates:
+        return None
+    pos = [x for x in candidates if x > 0]
+    stop_price = max(pos) if side == "long" else min(pos)
+    tick = spec.price_to_ticks(stop_price)
+    if tick <= 0:
+        return None
+    return spec.ticks_to_price(tick)
+
+
+def _ratios(pairs):
+    out = [-0.05 + 0.001 * i for i in range(101)]
+    # 恰好落在触发比例上
+    out.extend(tr for tr, _ in pairs if tr == tr)
+    out.append(NAN)
+    return out
+
+
+@pytest.mark.parametrize("pairs", STOP_LADDERS + PULLBACK_LADDERS)
+@pytest.mark.parametrize("pick", [max, min])
+def test_lookup_matches_linear_fold(pairs, pick):
+    table = LadderTable(pairs, pick)
+    for ratio in _ratios(pairs):
+        assert table.lookup(ratio) == baseline_fold(pairs, ratio, pick), (pairs, ratio)
+
+
+def test_next_trigger():
+    table = LadderTable([(0.02, 0.01), (0.01, 0.003), (0.02, 0.004), (NAN, 1.0)], max)
+    assert table.next_trigger(0.0) == 0.01
+    assert table.next_trigger(0.01) == 0.02
+    assert table.next_trigger(0.02) is None
+    assert LadderTable([], max).next_trigger(0.0) is None
+
+
+@pytest.fixture(scope="module")
+def compute_stop():
+    pytest.importorskip("ccxt")
+    pytest.importorskip("websockets")
+    from grid_Stablize_BN_DB01 import GridTradingBot
+
+    return GridTradingBot._compute_trailing_stop_price
+
+
+def _stub(spec):
+    return SimpleNamespace(market_spec=spec, _safe_float=lambda v: None if v is None else float(v))
+
+
+@pytest.mark.parametrize("side", ["long", "short"])
+@pytest.mark.parametrize("base_ratio", [0.0, 0.02])
+@pytest.mark.parametrize("hs_price", [0.0, 1600.0])
+def test_stop_price_matches_baseline(compute_stop, side, base_ratio, hs_price):
+    spec = MarketSpec(0.01, 0.001)
+    mismatches = []
+    for ladder in STOP_LADDERS:
+        for pb_ladder in PULLBACK_LADDERS:
+            sc = SimpleNamespace(
+                trailing_stop_base_stop_ratio=base_ratio,
+                trailing_stop_ladder=LadderTable(ladder, max),
+                trailing_pullback_ladder=LadderTable(pb_ladder, min),
+                hard_stoploss_price=hs_price,
+            )
+            for ep in ENTRIES:
+                peaks = [ep * (1.0 + off) for off in PEAK_OFFSETS]
+                # 峰值（谷值）恰好落在触发价上
+                peaks.extend(ep * (1.0 + tr) if side == "long" else ep / (1.0 + tr) for tr, _ in ladder + pb_ladder if tr == tr and tr > -1)
+                for peak in peaks:
+                    bot = _stub(spec)
+                    # 锚定入场价与峰值，现价不创新高，止损价只由峰值决定
+                    if side == "long":
+                        bot._trail_anchor_entry_long = ep
+                        bot._trail_peak_price_long = peak
+                        cp = peak * 0.995
+                    else:
+                        bot._trail_anchor_entry_short = ep
+                        bot._trail_trough_price_short = peak
+                        cp = peak * 1.005
+                    got = compute_stop(bot, side, ep, cp, sc)
+                    want = baseline_stop_price(side, ep, peak, base_ratio, ladder, pb_ladder, hs_price, spec)
+                    if got != want and not (got is None and want is None):
+                        mismatches.append((ladder, pb_ladder, ep, peak, got, want))
+    assert not mismatches, mismatches[:5]
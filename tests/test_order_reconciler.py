@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+
+from order_reconciler import DesiredOrder, reconcile
+
+
+def live(order_id, side, price_tick, remaining, client_id=None, reduce_only=False, position_side=None, ts=0.0):
+    return SimpleNamespace(
+        order_id=str(order_id),
+        side=side,
+        price_tick=price_tick,
+        remaining=remaining,
+        client_id=client_id,
+        reduce_only=reduce_only,
+        position_side=position_side,
+        ts=ts,
+    )
+
+
+BOOK = [
+    live(1, "buy", 19900, 0.010, "add-1"),
+    live(2, "sell", 20100, 0.010, "tp-1", reduce_only=True),
+]
+
+
+def add(price_tick, qty=0.010, client_id="add-1"):
+    return DesiredOrder("add", "buy", price_tick=price_tick, qty=qty, client_id=client_id)
+
+
+def tp(price_tick, qty=0.010, client_id="tp-1"):
+    return DesiredOrder("tp", "sell", reduce_only=True, price_tick=price_tick, qty=qty, client_id=client_id)
+
+
+def test_keep_inside_tolerance():
+    res = reconcile([add(19902, qty=0.0104), tp(20099)], BOOK, price_tol_ticks=2, qty_tol_ratio=0.05)
+    assert res.is_noop()
+    assert sorted(res.kept) == [("add", "1"), ("tp", "2")]
+
+
+def test_cancel_and_place_outside_price_tolerance():
+    d = add(19905)
+    res = reconcile([d, tp(20100)], BOOK, price_tol_ticks=2)
+    assert res.cancels == [("add", "1")]
+    assert res.places == [d]
+    assert res.kept == [("tp", "2")]
+    assert res.roles() == {"add"}
+
+
+def test_cancel_and_place_outside_qty_tolerance():
+    d = add(19900, qty=0.012)
+    res = reconcile([d], BOOK, price_tol_ticks=2, qty_tol_ratio=0.05)
+    assert res.cancels == [("add", "1")]
+    assert res.places == [d]
+
+
+def test_client_id_mismatch_replaces():
+    d = add(19900, client_id="add-2")
+    res = reconcile([d], BOOK, price_tol_ticks=2)
+    assert res.cancels == [("add", "1")]
+    assert res.places == [d]
+
+
+def test_force_roles_replace_matching_order():
+    d = add(19900)
+    res = reconcile([d, tp(20100)], BOOK, force_roles={"add"}, allow_amend=True)
+    assert res.cancels == [("add", "1")]
+    assert res.places == [d]
+    assert res.amends == []
+    assert res.kept == [("tp", "2")]
+
+
+def test_allow_amend_moves_price():
+    d = add(19890)
+    res = reconcile([d], BOOK, price_tol_ticks=2, allow_amend=True)
+    assert res.amends == [("1", d)]
+    assert res.cancels == []
+    assert res.places == []
+    res = reconcile([d], BOOK, price_tol_ticks=2, allow_amend=False)
+    assert res.amends == []
+    assert res.cancels == [("add", "1")]
+    assert res.places == [d]
+
+
+def test_amend_requires_qty_inside_tolerance():
+    d = add(19890, qty=0.012)
+    res = reconcile([d], BOOK, price_tol_ticks=2, qty_tol_ratio=0.05, allow_amend=True)
+    assert res.amends == []
+    assert res.cancels == [("add", "1")]
+    assert res.places == [d]
+
+
+def test_duplicates_for_one_slot_cancelled():
+    book = [
+        live(1, "buy", 19900, 0.010, "add-1", ts=1.0),
+        live(3, "buy", 19900, 0.010, "add-1", ts=2.0),
+        live(4, "buy", 19899, 0.010, "add-1", ts=3.0),
+    ]
+    res = reconcile([add(19900)], book, price_tol_ticks=2)
+    # 价格最近、同价时最新的一笔保留
+    assert res.kept == [("add", "3")]
+    assert sorted(res.cancels) == [("add", "1"), ("add", "4")]
+    assert res.places == []
+
+
+def test_unwanted_role_cancels_all():
+    res = reconcile([add(19900, qty=0.0), tp(20100)], BOOK)
+    assert res.cancels == [("add", "1")]
+    assert res.places == []
+    assert res.kept == [("tp", "2")]
+
+
+def test_match_live_filters_side_reduce_only_and_position_side():
+    book = BOOK + [
+        live(5, "buy", 19900, 0.010, "add-1", reduce_only=True),
+        live(6, "buy", 19900, 0.0, "add-1"),
+        live(7, "buy", 19900, 0.010, "add-1", position_side="SHORT"),
+    ]
+    d = DesiredOrder("add", "buy", position_side="long", price_tick=19900, qty=0.010, client_id="add-1")
+    res = reconcile([d], book + [live(8, "buy", 19900, 0.010, "add-1", position_side="LONG")])
+    assert [r.order_id for r in res.matched["add"]] == ["8"]
+    assert res.kept == [("add", "8")]
@@ -0,0 +1,50 @@
+from position_book import PositionBook
+
+
+def account_update(T, pa, ep, ps="BOTH"):
+    return {"e": "ACCOUNT_UPDATE", "T": T, "a": {"P": [{"s": "ETHUSDC", "pa": str(pa), "ep": str(ep), "ps": ps}]}}
+
+
+def test_fills_sharing_trade_time_all_count():
+    # 一笔吃单对两笔挂单成交：两条 ORDER_TRADE_UPDATE 共用 T
+    book = PositionBook("ETHUSDC")
+    assert book.apply_fill("long", 0.01, price=2000.0, trade_ts=1000, trade_key="1:t11")
+    assert book.apply_fill("long", 0.02, price=2001.0, trade_ts=1000, trade_key="1:t12")
+    assert book.amount("long") == 0.03
+    assert abs(book.entry_price("long") - (0.01 * 2000.0 + 0.02 * 2001.0) / 0.03) < 1e-9
+
+
+def test_duplicate_fill_counted_once():
+    book = PositionBook("ETHUSDC")
+    assert book.apply_fill("long", 0.01, price=2000.0, trade_ts=1000, trade_key="1:t11")
+    assert not book.apply_fill("long", 0.01, price=2000.0, trade_ts=1000, trade_key="1:t11")
+    assert book.amount("long") == 0.01
+
+
+def test_account_update_first_covers_fills():
+    book = PositionBook("ETHUSDC")
+    assert book.apply_account_update(account_update(1000, "0.03", "2000.5"))
+    assert not book.apply_fill("long", 0.01, price=2000.0, trade_ts=1000, trade_key="1:t11")
+    assert not book.apply_fill("long", 0.02, price=2001.0, trade_ts=1000, trade_key="1:t12")
+    assert book.amount("long") == 0.03
+    assert book.entry_price("long") == 2000.5
+
+
+def test_account_update_after_fills_is_authority():
+    book = PositionBook("ETHUSDC")
+    book.apply_fill("long", 0.01, price=2000.0, trade_ts=1000, trade_key="1:t11")
+    book.apply_fill("long", 0.02, price=2001.0, trade_ts=1000, trade_key="1:t12")
+    assert book.apply_account_update(account_update(1000, "0.025", "2000.7"))
+    assert book.amount("long") == 0.025
+    assert book.entry_price("long") == 2000.7
+    # 之后的成交照常累加
+    assert book.apply_fill("long", -0.005, price=2010.0, trade_ts=1001, trade_key="2:t13")
+    assert abs(book.amount("long") - 0.02) < 1e-12
+
+
+def test_one_way_account_update_splits_legs():
+    book = PositionBook("ETHUSDC")
+    book.apply_account_update(account_update(1000, "-0.04", "1990"))
+    assert book.amount("short") == 0.04
+    assert book.amount("long") == 0.0
+    assert book.entry_price("long") is None
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+
+class _Section:
+    __slots__ = ("owner", "label", "t_wait", "t_hold")
+
+    def __init__(self, owner, label: str):
+        self.owner = owner
+        self.label = label
+        self.t_wait = 0.0
+        self.t_hold = 0.0
+
+    async def __aenter__(self):
+        self.t_wait = time.perf_counter()
+        await self.owner._lock.acquire()
+        self.t_hold = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        now = time.perf_counter()
+        self.owner._lock.release()
+        self.owner._note(self.label, self.t_hold - self.t_wait, now - self.t_hold)
+        return False
+
+
+class TimedLock:
+    """asyncio.Lock 加按区段统计的等待与持有时长（微秒）。
+
+    async with lock.section("标签") 记入该标签；直接 async with lock 记入 "other"。
+    临界区内只做状态计算，交易所请求在锁外执行，持有时长应在微秒级。
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._stats = {}
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def section(self, label: str) -> _Section:
+        return _Section(self, str(label or "other"))
+
+    async def __aenter__(self):
+        sec = self.section("other")
+        await sec.__aenter__()
+        # 取得锁之后才记下当前区段，排队中的协程不会覆盖持有者的计时
+        self._default = sec
+        return sec
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return await self._default.__aexit__(exc_type, exc, tb)
+
+    def _note(self, label: str, wait_sec: float, hold_sec: float):
+        s = self._stats.get(label)
+        if s is None:
+            s = self._stats[label] = [0, 0.0, 0.0, 0.0, 0.0]
+        hold_us = hold_sec * 1e6
+        wait_us = wait_sec * 1e6
+        s[0] += 1
+        s[1] = hold_us
+        s[2] += hold_us
+        if hold_us > s[3]:
+            s[3] = hold_us
+        if wait_us > s[4]:
+            s[4] = wait_us
+
+    def snapshot(self) -> dict:
+        out = {}
+        for label, (n, last, total, mx, wait_mx) in sorted(self._stats.items()):
+            out[label] = {
+                "count": int(n),
+                "last_us": round(float(last), 1),
+                "avg_us": round(float(total / n), 1) if n else 0.0,
+                "max_us": round(float(mx), 1),
+                "max_wait_us": round(float(wait_mx), 1),
+            }
+        return out
@@ -0,0 +1,130 @@
+import json
+import re
+
+try:
+    import orjson as _orjson
+except Exception:
+    _orjson = None
+
+if _orjson is not None:
+    loads = _orjson.loads
+    JSON_BACKEND = "orjson"
+else:
+    loads = json.loads
+    JSON_BACKEND = "json"
+
+
+class BookTicker:
+    __slots__ = ("symbol", "bid", "bid_qty", "ask", "ask_qty", "update_id", "event_ts", "trans_ts")
+
+    def __init__(self, symbol, bid, bid_qty, ask, ask_qty, update_id=0, event_ts=0, trans_ts=0):
+        self.symbol = symbol
+        self.bid = bid
+        self.bid_qty = bid_qty
+        self.ask = ask
+        self.ask_qty = ask_qty
+        self.update_id = update_id
+        self.event_ts = event_ts
+        self.trans_ts = trans_ts
+
+
+class OrderUpdate:
+    __slots__ = ("symbol", "event_ts", "trans_ts", "o")
+
+    def __init__(self, symbol, event_ts, trans_ts, o):
+        self.symbol = symbol
+        self.event_ts = event_ts
+        self.trans_ts = trans_ts
+        self.o = o
+
+
+class AlgoUpdate:
+    __slots__ = ("symbol", "event_ts", "trans_ts", "o")
+
+    def __init__(self, symbol, event_ts, trans_ts, o):
+        self.symbol = symbol
+        self.event_ts = event_ts
+        self.trans_ts = trans_ts
+        self.o = o
+
+
+class AccountUpdate:
+    __slots__ = ("event_ts", "trans_ts", "data")
+
+    def __init__(self, event_ts, trans_ts, data):
+        self.event_ts = event_ts
+        self.trans_ts = trans_ts
+        self.data = data
+
+
+# Binance 推送字段顺序固定，按线上格式整帧匹配；不匹配时回退到完整 JSON 解析
+_BOOK_TICKER_RE = re.compile(
+    r'\{"e":"bookTicker","u":(\d+),"s":"([^"]*)","b":"([^"]*)","B":"([^"]*)","a":"([^"]*)","A":"([^"]*)","T":(\d+),"E":(\d+)\}'
+)
+
+
+def _int(v) -> int:
+    try:
+        return int(v or 0)
+    except Exception:
+        return 0
+
+
+def parse_book_ticker_fast(frame: str):
+    """bookTicker 零 dict 快速路径：一次正则匹配取出全部字段，失败返回 None。"""
+    m = _BOOK_TICKER_RE.match(frame)
+    if m is None:
+        return None
+    u, sym, b, bq, a, aq, t, e = m.groups()
+    try:
+        return BookTicker(sym, float(b), float(bq), float(a), float(aq), int(u), int(e), int(t))
+    except ValueError:
+        return None
+
+
+def _book_ticker_from_dict(data: dict):
+    b = data.get("b")
+    a = data.get("a")
+    if b is None or a is None:
+        return None
+    try:
+        return BookTicker(
+            data.get("s"),
+            float(b),
+            float(data.get("B") or 0.0),
+            float(a),
+            float(data.get("A") or 0.0),
+            _int(data.get("u")),
+            _int(data.get("E")),
+            _int(data.get("T")),
+        )
+    except Exception:
+        return None
+
+
+def event_from_dict(data: dict):
+    if not isinstance(data, dict):
+        return None
+    e = data.get("e")
+    if e == "bookTicker":
+        return _book_ticker_from_dict(data)
+    if e == "ORDER_TRADE_UPDATE":
+        o = data.get("o") or {}
+        return OrderUpdate(str(o.get("s") or "").strip().upper(), _int(data.get("E")), _int(data.get("T")), o)
+    if e == "ALGO_UPDATE":
+        o = data.get("o") or {}
+        return AlgoUpdate(str(o.get("s") or "").strip().upper(), _int(data.get("E")), _int(data.get("T")), o)
+    if e == "ACCOUNT_UPDATE":
+        return AccountUpdate(_int(data.get("E")), _int(data.get("T")), data)
+    return None
+
+
+def decode_frame(frame):
+    """每帧只解析一次：返回 BookTicker/OrderUpdate/AlgoUpdate/AccountUpdate，其它消息返回 None。"""
+    if isinstance(frame, (bytes, bytearray, memoryview)):
+        frame = bytes(frame).decode("utf-8")
+    if frame.startswith('{"e":"bookTicker"'):
+        ev = parse_book_ticker_fast(frame)
+        if ev is not None:
+            return ev
+    return event_from_dict(loads(frame))
@@ -0,0 +1,268 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import threading
+import time
+
+import websockets
+
+# Binance U 本位合约 WebSocket API（下单/撤单/改单走同一条常驻连接）
+WS_API_URL_REAL = "wss://ws-fapi.binance.com/ws-fapi/v1"
+WS_API_URL_TESTNET = "wss://testnet.binancefuture.com/ws-fapi/v1"
+
+# 共享额度按等价的 REST 接口计费
+_BUDGET_ENDPOINT = {
+    "order.place": ("/fapi/v1/order", "POST"),
+    "order.modify": ("/fapi/v1/order", "PUT"),
+    "order.cancel": ("/fapi/v1/order", "DELETE"),
+}
+
+logger = logging.getLogger()
+
+
+def ws_api_url_for(account_mode: str) -> str:
+    return WS_API_URL_TESTNET if str(account_mode or "").strip().lower() in {"testnet", "paper", "sim"} else WS_API_URL_REAL
+
+
+def sign_params(params: dict, api_secret: str) -> str:
+    """HMAC-SHA256 签名：除 signature 外全部参数按名称排序拼成 k=v&k=v"""
+    payload = "&".join(f"{k}={params[k]}" for k in sorted(params) if k != "signature")
+    return hmac.new(str(api_secret or "").encode("utf-8"), payload.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def limits_as_headers(rate_limits) -> dict:
+    """把应答中的 rateLimits 换成 REST 响应头的形式，供 RestBudget.observe 校正共享计数"""
+    out = {}
+    for r in rate_limits or ():
+        if not isinstance(r, dict):
+            continue
+        kind = str(r.get("rateLimitType") or "").upper()
+        interval = str(r.get("interval") or "").upper()
+        num = int(r.get("intervalNum") or 0)
+        count = r.get("count")
+        if count is None:
+            continue
+        if kind == "REQUEST_WEIGHT" and interval == "MINUTE" and num == 1:
+            out["x-mbx-used-weight-1m"] = count
+        elif kind == "ORDERS" and interval == "SECOND" and num == 10:
+            out["x-mbx-order-count-10s"] = count
+        elif kind == "ORDERS" and interval == "MINUTE" and num == 1:
+            out["x-mbx-order-count-1m"] = count
+    return out
+
+
+class WsApiError(Exception):
+    """交易所明确拒绝（status != 200），与 REST 的业务错误等价，不应退回 REST 重试。"""
+
+    def __init__(self, status, code, msg):
+        super().__init__(f"binance {code} {msg}")
+        self.status = int(status or 0)
+        self.code = code
+        self.msg = msg
+
+
+class WsApiUnavailable(Exception):
+    """请求未发出（通道未连接或发送失败），交易所肯定没有收到；调用方可直接退回 REST。"""
+
+
+class WsApiUnconfirmed(WsApiUnavailable):
+    """请求已发出但未收到应答（超时或发出后断线），交易所可能已经执行。
+
+    下单不能直接经 REST 重发：client id 只在原订单未结束时查重，原订单已成交时会重复开仓，
+    须先按 client id 查询；撤单与改单重发是安全的，可按 WsApiUnavailable 处理。
+    """
+
+
+class WsOrderApi:
+    """经 WebSocket API 常驻连接下单/撤单/改单，按请求 id 对应应答。
+
+    连接任务运行在启动它的事件循环中；线程池里的同步代码通过 call() 提交请求并阻塞等待。
+    每个请求自带 apiKey/timestamp/signature，断线后按退避自动重连，期间 call() 直接抛 WsApiUnavailable。
+    """
+
+    def __init__(self, url: str, api_key: str, api_secret: str, timeout_sec: float = 2.0, clock=None, budget=None):
+        self.url = str(url)
+        self.api_key = str(api_key or "")
+        self.api_secret = str(api_secret or "")
+        self.timeout_sec = float(timeout_sec) if float(timeout_sec or 0.0) > 0 else 2.0
+        self.clock = clock or (lambda: int(time.time() * 1000))
+        self.budget = budget
+        self._loop = None
+        self._loop_thread = None
+        self._task = None
+        self._ws = None
+        self._closed = False
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self.requests = 0
+        self.ok = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.unavailable = 0
+        self.unconfirmed = 0
+        self.reconnects = 0
+        self.last_ms = 0.0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def start(self):
+        """在当前事件循环中启动连接任务；多实例共享同一账户时只启动一次"""
+        if self._task is not None and not self._task.done():
+            return
+        self._closed = False
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._task = self._loop.create_task(self._run())
+
+    def ready(self) -> bool:
+        return self._ws is not None and not self._closed
+
+    async def close(self):
+        self._closed = True
+        ws = self._ws
+        if ws is not None:
+            try:
+                await ws.close()
+            except Exception:
+                pass
+        if self._task is not None:
+            self._task.cancel()
+        self._fail_pending(WsApiUnavailable("WS 下单通道已关闭"))
+
+    async def _run(self):
+        backoff = 1.0
+        while not self._closed:
+            try:
+                async with websockets.connect(self.url, max_size=2 ** 22) as ws:
+                    self._ws = ws
+                    backoff = 1.0
+                    logger.info(f"WS 下单通道已连接: {self.url}")
+                    async for raw in ws:
+                        self._on_message(raw)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                if not self._closed:
+                    logger.warning(f"WS 下单通道断开，{backoff:.0f}s 后重连: {e}")
+            finally:
+                self._ws = None
+                self._fail_pending(WsApiUnavailable("WS 下单通道断开"))
+            if self._closed:
+                break
+            self.reconnects += 1
+            try:
+                await asyncio.sleep(backoff)
+            except asyncio.CancelledError:
+                break
+            backoff = min(30.0, backoff * 2.0)
+
+    def _fail_pending(self, exc: Exception):
+        pending = self._pending
+        self._pending = {}
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_exception(exc)
+
+    def _on_message(self, raw):
+        try:
+            msg = json.loads(raw)
+        except Exception:
+            return
+        if not isinstance(msg, dict):
+            return
+        if self.budget is not None and msg.get("rateLimits"):
+            try:
+                self.budget.observe(msg.get("status"), limits_as_headers(msg.get("rateLimits")))
+            except Exception:
+                pass
+        fut = self._pending.pop(str(msg.get("id")), None)
+        if fut is None or fut.done():
+            return
+        status = int(msg.get("status") or 0)
+        if status == 200:
+            fut.set_result(msg.get("result") if isinstance(msg.get("result"), dict) else {})
+            return
+        err = msg.get("error") if isinstance(msg.get("error"), dict) else {}
+        fut.set_exception(WsApiError(status, err.get("code"), err.get("msg")))
+
+    async def request(self, method: str, params: dict, timeout: float = None) -> dict:
+        """发送一帧请求并等待对应 id 的应答；返回 result"""
+        ws = self._ws
+        if ws is None or self._closed:
+            self.unavailable += 1
+            raise WsApiUnavailable("WS 下单通道未连接")
+        p = {k: v for k, v in (params or {}).items() if v is not None}
+        p["apiKey"] = self.api_key
+        p["timestamp"] = int(self.clock())
+        p["signature"] = sign_params(p, self.api_secret)
+        rid = str(next(self._ids))
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[rid] = fut
+        self.requests += 1
+        t0 = time.perf_counter()
+        try:
+            await ws.send(json.dumps({"id": rid, "method": str(method), "params": p}, separators=(",", ":")))
+        except Exception as e:
+            self._pending.pop(rid, None)
+            self.unavailable += 1
+            raise WsApiUnavailable(f"WS 下单请求发送失败: {e}")
+        # 以下请求已发出：超时或断线都只能说明结果未知
+        try:
+            result = await asyncio.wait_for(fut, float(timeout or self.timeout_sec))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise WsApiUnconfirmed(f"WS 下单请求超时: {method}")
+        except WsApiError:
+            self.rejected += 1
+            raise
+        except Exception as e:
+            self.unconfirmed += 1
+            raise WsApiUnconfirmed(f"WS 下单请求未确认: {method} {e}")
+        finally:
+            self._pending.pop(rid, None)
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.ok += 1
+        self.last_ms = ms
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        return result
+
+    def call(self, method: str, params: dict, timeout: float = None) -> dict:
+        """线程池中调用：请求交给连接所在的事件循环，阻塞等待结果"""
+        loop = self._loop
+        if loop is None or (not self.ready()) or threading.get_ident() == self._loop_thread:
+            self.unavailable += 1
+            raise WsApiUnavailable("WS 下单通道不可用")
+        if self.budget is not None and method in _BUDGET_ENDPOINT:
+            # 与 REST 共用额度；不足时抛 RestBudgetExceeded，与 REST 路径一致
+            self.budget.acquire(*_BUDGET_ENDPOINT[method])
+        wait = float(timeout or self.timeout_sec)
+        fut = asyncio.run_coroutine_threadsafe(self.request(method, params, wait), loop)
+        try:
+            return fut.result(wait + 1.0)
+        except concurrent.futures.TimeoutError:
+            # 无法确定请求是否已写出，按已发出处理
+            fut.cancel()
+            self.timeouts += 1
+            raise WsApiUnconfirmed(f"WS 下单请求超时: {method}")
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "connected": bool(self.ready()),
+            "requests": int(self.requests),
+            "ok": int(self.ok),
+            "rejected": int(self.rejected),
+            "timeouts": int(self.timeouts),
+            "unavailable": int(self.unavailable),
+            "unconfirmed": int(self.unconfirmed),
+            "reconnects": int(self.reconnects),
+            "last_ms": round(float(self.last_ms), 3),
+            "avg_ms": round(float(self.total_ms / self.ok), 3) if self.ok else 0.0,
+            "max_ms": round(float(self.max_ms), 3),
+        }
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+
+import websockets
+
+from ws_order_api import sign_params
+
+# 本地 WS 下单接口替身：离线测试 WsOrderApi 与退回 REST 的路径
+MOCK_WS_API_HOST = "127.0.0.1"
+MOCK_WS_API_PORT = 18766
+
+logger = logging.getLogger("ws_order_api_mock")
+
+
+def mock_addr_from_env():
+    """读取 WS_ORDER_API_MOCK_ADDR（host:port），未配置时用默认地址。"""
+    raw = str(os.getenv("WS_ORDER_API_MOCK_ADDR") or "").strip()
+    host, _, port = raw.rpartition(":")
+    try:
+        return (host or MOCK_WS_API_HOST), int(port)
+    except Exception:
+        return MOCK_WS_API_HOST, MOCK_WS_API_PORT
+
+
+class MockWsOrderApi:
+    """按 Binance 合约 WebSocket API 的报文格式应答 order.place / order.cancel / order.modify。
+
+    订单只保存在内存中，不撮合。api_secret 给出时校验签名；latency_ms 为每个应答的延迟；
+    drop_methods 中的方法只收不回且不执行（请求丢失），mute_methods 中的方法执行但不应答（应答丢失），
+    reject 为 {方法: (code, msg)} 的固定拒绝。
+    """
+
+    def __init__(self, host: str = MOCK_WS_API_HOST, port: int = 0, api_secret: str = None, latency_ms: float = 0.0):
+        self.host = host
+        self.port = int(port)
+        self.api_secret = api_secret
+        self.latency_ms = float(latency_ms or 0.0)
+        self.drop_methods = set()
+        self.mute_methods = set()
+        self.reject = {}
+        self.orders = {}
+        self.requests = []
+        self.stop_event = asyncio.Event()
+        self._server = None
+        self._seq = 1000
+        self._order_count = 0
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        sock = next(iter(self._server.sockets), None)
+        if sock is not None:
+            self.port = int(sock.getsockname()[1])
+        logger.info(f"WS 下单接口替身已启动: {self.url}")
+
+    async def close(self):
+        self.stop_event.set()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.stop_event.wait()
+        finally:
+            await self.close()
+
+    async def _handler(self, ws, *_args):
+        async for raw in ws:
+            try:
+                msg = json.loads(raw)
+            except Exception:
+                continue
+            # 每个请求独立应答，慢请求不阻塞同一连接上的后续请求
+            asyncio.create_task(self._respond(ws, msg))
+
+    async def _respond(self, ws, msg: dict):
+        method = str(msg.get("method") or "")
+        params = dict(msg.get("params") or {})
+        self.requests.append((method, params))
+        if method in self.drop_methods:
+            return
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+        status, body = self.handle(method, params)
+        if method in self.mute_methods:
+            return
+        out = {"id": msg.get("id"), "status": status, "rateLimits": self._rate_limits()}
+        if status == 200:
+            out["result"] = body
+        else:
+            out["error"] = body
+        try:
+            await ws.send(json.dumps(out, separators=(",", ":")))
+        except Exception:
+            pass
+
+    def _rate_limits(self) -> list:
+        return [
+            {"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": 2400, "count": len(self.requests)},
+            {"rateLimitType": "ORDERS", "interval": "SECOND", "intervalNum": 10, "limit": 300, "count": self._order_count},
+            {"rateLimitType": "ORDERS", "interval": "MINUTE", "intervalNum": 1, "limit": 1200, "count": self._order_count},
+        ]
+
+    def handle(self, method: str, params: dict):
+        """返回 (status, result 或 error)"""
+        if self.api_secret is not None and sign_params(params, self.api_secret) != params.get("signature"):
+            return 400, {"code": -1022, "msg": "Signature for this request is not valid."}
+        if method in self.reject:
+            code, msg = self.reject[method]
+            return 400, {"code": code, "msg": msg}
+        if method == "order.place":
+            return self._place(params)
+        if method == "order.cancel":
+            return self._cancel(params)
+        if method == "order.modify":
+            return self._modify(params)
+        return 400, {"code": -1100, "msg": f"Unknown method {method}"}
+
+    def _find(self, params: dict):
+        oid = params.get("orderId")
+        if oid is not None:
+            return self.orders.get(int(oid))
+        cid = params.get("origClientOrderId")
+        for o in self.orders.values():
+            if o["clientOrderId"] == cid:
+                return o
+        return None
+
+    def _place(self, params: dict):
+        cid = str(params.get("newClientOrderId") or f"mock{self._seq + 1}")
+        if any(o["clientOrderId"] == cid for o in self.orders.values()):
+            return 400, {"code": -4116, "msg": "ClientOrderId is duplicated."}
+        self._seq += 1
+        self._order_count += 1
+        now = int(time.time() * 1000)
+        order = {
+            "orderId": self._seq,
+            "symbol": str(params.get("symbol") or ""),
+            "status": "NEW",
+            "clientOrderId": cid,
+            "price": str(params.get("price") or "0"),
+            "avgPrice": "0.00",
+            "origQty": str(params.get("quantity") or "0"),
+            "executedQty": "0",
+            "cumQuote": "0",
+            "timeInForce": str(params.get("timeInForce") or "GTC"),
+            "type": str(params.get("type") or "LIMIT"),
+            "reduceOnly": str(params.get("reduceOnly") or "").lower() == "true",
+            "closePosition": False,
+            "side": str(params.get("side") or ""),
+            "positionSide": str(params.get("positionSide") or "BOTH"),
+            "stopPrice": "0",
+            "origType": str(params.get("type") or "LIMIT"),
+            "updateTime": now,
+        }
+        self.orders[order["orderId"]] = order
+        return 200, dict(order)
+
+    def _cancel(self, params: dict):
+        order = self._find(params)
+        if order is None:
+            return 400, {"code": -2011, "msg": "Unknown order sent."}
+        self.orders.pop(order["orderId"], None)
+        out = dict(order)
+        out["status"] = "CANCELED"
+        out["updateTime"] = int(time.time() * 1000)
+        return 200, out
+
+    def _modify(self, params: dict):
+        order = self._find(params)
+        if order is None:
+            return 400, {"code": -2013, "msg": "Order does not exist."}
+        self._order_count += 1
+        order["price"] = str(params.get("price") or order["price"])
+        order["origQty"] = str(params.get("quantity") or order["origQty"])
+        order["updateTime"] = int(time.time() * 1000)
+        return 200, dict(order)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - [ws_order_api_mock] - %(message)s")
+    host, port = mock_addr_from_env()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    mock = MockWsOrderApi(host, port, latency_ms=float(os.getenv("WS_ORDER_API_MOCK_LATENCY_MS", "0") or 0.0))
+
+    def _stop(*_args):
+        loop.call_soon_threadsafe(mock.stop_event.set)
+
+    for sig in (getattr(signal, "SIGINT", None), getattr(signal, "SIGTERM", None), getattr(signal, "SIGBREAK", None)):
+        if sig is None:
+            continue
+        try:
+            signal.signal(sig, _stop)
+        except Exception:
+            pass
+    try:
+        loop.run_until_complete(mock.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            loop.close()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import time
+
+from ws_events import AccountUpdate, AlgoUpdate, BookTicker, OrderUpdate
+
+# 用户数据事件去重键保留的条数；远大于两条连接之间可能的到达差
+DEDUP_CAPACITY = 4096
+
+
+def event_key(ev):
+    """用户数据事件的去重键：(事件类型, 事件时间, 撮合时间, 订单/成交标识)；缺少事件时间时返回 None（不去重）"""
+    if isinstance(ev, OrderUpdate):
+        if not ev.event_ts:
+            return None
+        o = ev.o
+        return ("ORDER_TRADE_UPDATE", ev.event_ts, ev.trans_ts, o.get("i"), o.get("x"), o.get("X"), o.get("t"))
+    if isinstance(ev, AlgoUpdate):
+        if not ev.event_ts:
+            return None
+        o = ev.o
+        return ("ALGO_UPDATE", ev.event_ts, ev.trans_ts, o.get("aid"), o.get("X"))
+    if isinstance(ev, AccountUpdate):
+        if not ev.event_ts:
+            return None
+        return ("ACCOUNT_UPDATE", ev.event_ts, ev.trans_ts)
+    return None
+
+
+class _LinkStats:
+    __slots__ = ("frames", "first", "dup", "lag_n", "lag_total_ms", "lag_max_ms", "age_n", "age_last_ms", "age_total_ms")
+
+    def __init__(self):
+        self.frames = 0
+        self.first = 0
+        self.dup = 0
+        self.lag_n = 0
+        self.lag_total_ms = 0.0
+        self.lag_max_ms = 0.0
+        self.age_n = 0
+        self.age_last_ms = 0.0
+        self.age_total_ms = 0.0
+
+
+class EventDeduper:
+    """多条相同订阅的连接并行接收，同一事件先到者生效。
+
+    行情按交易对的 update id 单调递增判定，迟到或重复的报价直接丢弃；用户数据按 event_key 判重。
+    每条连接统计先到次数、重复次数、落后于先到连接的时长（lag）和事件时间到本地接收的时长（age）。
+    """
+
+    def __init__(self, capacity: int = DEDUP_CAPACITY):
+        self.capacity = max(16, int(capacity))
+        self._seen = {}
+        self._quote_last = {}
+        self._links = {}
+        self.passed = 0
+        self.dropped = 0
+        self.unkeyed = 0
+
+    def _link(self, link) -> _LinkStats:
+        st = self._links.get(link)
+        if st is None:
+            st = self._links[link] = _LinkStats()
+        return st
+
+    def accept(self, link, ev) -> bool:
+        """该连接收到的事件是否首次到达；重复返回 False"""
+        now = time.perf_counter()
+        st = self._link(link)
+        st.frames += 1
+        ets = int(getattr(ev, "event_ts", 0) or 0)
+        if ets > 0:
+            age = time.time() * 1000.0 - ets
+            st.age_n += 1
+            st.age_last_ms = age
+            st.age_total_ms += age
+        if isinstance(ev, BookTicker):
+            u = int(ev.update_id or 0)
+            if u <= 0:
+                return self._pass(st)
+            last = self._quote_last.get(ev.symbol)
+            if last is None or u > last[0]:
+                self._quote_last[ev.symbol] = (u, now)
+                return self._pass(st)
+            return self._drop(st, now - last[1] if u == last[0] else None)
+        key = event_key(ev)
+        if key is None:
+            self.unkeyed += 1
+            return self._pass(st)
+        first = self._seen.get(key)
+        if first is not None:
+            return self._drop(st, now - first)
+        self._seen[key] = now
+        if len(self._seen) > self.capacity:
+            # dict 按插入顺序迭代，淘汰最早的键
+            self._seen.pop(next(iter(self._seen)))
+        return self._pass(st)
+
+    def _pass(self, st: _LinkStats) -> bool:
+        st.first += 1
+        self.passed += 1
+        return True
+
+    def _drop(self, st: _LinkStats, lag_sec) -> bool:
+        st.dup += 1
+        self.dropped += 1
+        if lag_sec is not None:
+            ms = lag_sec * 1000.0
+            st.lag_n += 1
+            st.lag_total_ms += ms
+            if ms > st.lag_max_ms:
+                st.lag_max_ms = ms
+        return False
+
+    def stats(self) -> dict:
+        links = {}
+        for link, st in sorted(self._links.items()):
+            links[str(link)] = {
+                "frames": int(st.frames),
+                "first": int(st.first),
+                "dup": int(st.dup),
+                "lag_avg_ms": round(float(st.lag_total_ms / st.lag_n), 3) if st.lag_n else 0.0,
+                "lag_max_ms": round(float(st.lag_max_ms), 3),
+                "age_last_ms": round(float(st.age_last_ms), 3),
+                "age_avg_ms": round(float(st.age_total_ms / st.age_n), 3) if st.age_n else 0.0,
+            }
+        return {
+            "passed": int(self.passed),
+            "dropped": int(self.dropped),
+            "unkeyed": int(self.unkeyed),
+            "links": links,
+        }